@@ -1,8 +1,19 @@
+import os
+import sys
+
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
 import seaborn as sns
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+from cdl_common.features import match_features
+from cdl_common.indexed import filter_matches
+from cdl_common.outliers import generate_outlier_score
+
+EXTRA_VARS = ['map_winner', 'is_winner', 'accuracy', 'kills_untraded_perc', 'deaths_traded_perc',
+              'damage_per_kill', 'kd', 'rot_kill_perc', 'fb_perc']
+
 
 def filter_teams_games(dataframe: pd.DataFrame, team_name: str, include_opposition: bool= True) -> pd.DataFrame:
     if include_opposition:
@@ -69,48 +80,25 @@ def all_modes_agg(dataframe: pd.DataFrame, mode: str = 'all') -> pd.DataFrame:
     return df_numeric
 
 def get_outliers(data_1, data_2):
-    d1_mean = data_1.mean()
-    d2_mean = data_2.mean()
-    d1_new = np.array([abs(round(a/b, 2)-1) if b > 0 else 0 for a, b in zip(data_1, [d1_mean for i in data_1])])
-    d2_new = np.array([abs(round(a/b, 2)-1) if b > 0 else 0 for a, b in zip(data_2, [d2_mean for i in data_2])])
-    return (d1_new+d2_new)/2
-    
-
-def assign_extra_vars(df):
-    df['map_winner'] = ["host" if a > b else "guest" for a, b in zip(df['matchGameResult.hostGameScore'], df['matchGameResult.guestGameScore'])]
-
-    df['is_winner'] = ["Y" if a == b else "N" for a, b in zip(df['map_winner'], df['team_type'])]
+    return generate_outlier_score(data_1, data_2, 'mean')
 
-    df['accuracy'] = [(a/+b)*100 for a, b in zip(df['totalShotsHit'], df['totalShotsFired'])]
 
-    df['kills_untraded_perc'] = [(a/b)*100 if b > 0 else 0 for a, b in zip(df['untradedKills'], df['totalKills'])]
+def kept_modes(control: bool, hardpoint: bool, search: bool) -> list:
+    return [mode for mode, keep in (('CDL Control', control), ('CDL Hardpoint', hardpoint), ('CDL SnD', search)) if keep]
 
-    df['deaths_traded_perc'] = [(a/b)*100  if b > 0 else 0 for a, b in zip(df['tradedDeaths'], df['totalDeaths'])]
-
-    df['damage_per_kill'] = [round(a/b, 0) if b > 0 else 0 for a, b in zip(df['totalDamageDealt'], df['totalKills'])]
-
-    df['kd'] = [round((a/b), 2) if b > 0 else a for a, b in zip(df['totalKills'], df['totalDeaths'])]
-
-    df['rot_kill_perc'] = [round((a/b)*100, 2) if b > 0 else 0 for a, b in zip(df['totalRotationKills'], df['totalKills'])]
-
-    df['fb_perc'] = [round((a/b)*100, 2) if b > 0 else 0 for a, b in zip(df['totalFirstBloodKills'], df['totalKills'])]
 
+def assign_extra_vars(df):
+    df[EXTRA_VARS] = match_features(df, EXTRA_VARS)
     return df
 
 def cdl_untraded_kill_traded_deaths(df, host_name, guest_name, host_colour, guest_colour, x_size=7, y_size=8, legend_location="upper left",
                                     control=True, hardpoint=True, search=True, sens=0.3):
-    df_refined = df[['alias', 'gameMode', 'gameMap', 'totalDistanceTraveled', 'totalDamageDealt', 'totalShotsFired', 'totalShotsHit', 
+    df_refined = filter_matches(df, gamemode=kept_modes(control, hardpoint, search))[['alias', 'gameMode', 'gameMap', 'totalDistanceTraveled', 'totalDamageDealt', 'totalShotsFired', 'totalShotsHit', 
         'totalAssists', 'totalDeaths', 'totalKills', 'hillTime', 'percentTimeMoving', 'lethalsUsed', 'tacticalsUsed',
         'tradedDeaths', 'tradedKills', 'untradedDeaths', 'untradedKills', 'team_type', 'totalRotationKills', 
         'matchGameResult.hostGameScore', 'matchGameResult.guestGameScore', 'oppo_abbrev', 'totalFirstBloodKills', 'abbrev'
         ]]
     df_refined = assign_extra_vars(df_refined)
-    if not control:
-        df_refined = df_refined[df_refined['gameMode'] != 'CDL Control']
-    if not hardpoint:
-        df_refined = df_refined[df_refined['gameMode'] != "CDL Hardpoint"]
-    if not search:
-        df_refined = df_refined[df_refined['gameMode'] != "CDL SnD"]
     fig = plt.figure(figsize=(x_size, y_size))
     ax1 = fig.subplots()
     ax1.set_title(f"Traded Deaths % vs Untraded Kills % {host_name} {'vs' if guest_name != '' else ''} {guest_name}")
@@ -126,18 +114,12 @@ def cdl_untraded_kill_traded_deaths(df, host_name, guest_name, host_colour, gues
 
 def cdl_movement(df, host_name, guest_name, host_colour, guest_colour, x_size=7, y_size=8, legend_location="upper left",
                   control=True, hardpoint=True, search=True, sens=0.3):
-    df_refined = df[['alias', 'gameMode', 'gameMap', 'totalDistanceTraveled', 'totalDamageDealt', 'totalShotsFired', 'totalShotsHit', 
+    df_refined = filter_matches(df, gamemode=kept_modes(control, hardpoint, search))[['alias', 'gameMode', 'gameMap', 'totalDistanceTraveled', 'totalDamageDealt', 'totalShotsFired', 'totalShotsHit', 
         'totalAssists', 'totalDeaths', 'totalKills', 'hillTime', 'percentTimeMoving', 'lethalsUsed', 'tacticalsUsed',
         'tradedDeaths', 'tradedKills', 'untradedDeaths', 'untradedKills', 'team_type', 'totalRotationKills', 
         'matchGameResult.hostGameScore', 'matchGameResult.guestGameScore', 'oppo_abbrev','totalFirstBloodKills', 'abbrev'
         ]]
     df_refined = assign_extra_vars(df_refined)
-    if not control:
-        df_refined = df_refined[df_refined['gameMode'] != 'CDL Control']
-    if not hardpoint:
-        df_refined = df_refined[df_refined['gameMode'] != "CDL Hardpoint"]
-    if not search:
-        df_refined = df_refined[df_refined['gameMode'] != "CDL SnD"]
     fig = plt.figure(figsize=(x_size, y_size))
     ax1 = fig.subplots()
     ax1.set_title(f"Amount of Movement (Roughly) - {host_name} {'vs' if guest_name != '' else ''} {guest_name}")
@@ -153,18 +135,12 @@ def cdl_movement(df, host_name, guest_name, host_colour, guest_colour, x_size=7,
 
 def cdl_damage_accuracy(df, host_name, guest_name, host_colour, guest_colour, x_size=7, y_size=8, legend_location="upper left",
                      control=True, hardpoint=True, search=True, sens=0.3):
-    df_refined = df[['alias', 'gameMode', 'gameMap', 'totalDistanceTraveled', 'totalDamageDealt', 'totalShotsFired', 'totalShotsHit', 
+    df_refined = filter_matches(df, gamemode=kept_modes(control, hardpoint, search))[['alias', 'gameMode', 'gameMap', 'totalDistanceTraveled', 'totalDamageDealt', 'totalShotsFired', 'totalShotsHit', 
         'totalAssists', 'totalDeaths', 'totalKills', 'hillTime', 'percentTimeMoving', 'lethalsUsed', 'tacticalsUsed',
         'tradedDeaths', 'tradedKills', 'untradedDeaths', 'untradedKills', 'team_type', 'totalRotationKills', 
         'matchGameResult.hostGameScore', 'matchGameResult.guestGameScore', 'oppo_abbrev', 'totalFirstBloodKills', 'abbrev'
         ]]
     df_refined = assign_extra_vars(df_refined)
-    if not control:
-        df_refined = df_refined[df_refined['gameMode'] != 'CDL Control']
-    if not hardpoint:
-        df_refined = df_refined[df_refined['gameMode'] != "CDL Hardpoint"]
-    if not search:
-        df_refined = df_refined[df_refined['gameMode'] != "CDL SnD"]
     fig = plt.figure(figsize=(x_size, y_size))
     ax1 = fig.subplots()
     ax1.set_title(f"Accuracy vs Damage per Kill - {host_name} {'vs' if guest_name != '' else ''} {guest_name}")
@@ -183,13 +159,12 @@ def cdl_damage_accuracy(df, host_name, guest_name, host_colour, guest_colour, x_
 
 
 def cdl_kd_hill(df, host_name, guest_name, host_colour, guest_colour, x_size=7, y_size=8, legend_location="upper left", sens=0.3):
-    df_refined = df[['alias', 'gameMode', 'gameMap', 'totalDistanceTraveled', 'totalDamageDealt', 'totalShotsFired', 'totalShotsHit', 
+    df_refined = filter_matches(df, gamemode='CDL Hardpoint')[['alias', 'gameMode', 'gameMap', 'totalDistanceTraveled', 'totalDamageDealt', 'totalShotsFired', 'totalShotsHit', 
         'totalAssists', 'totalDeaths', 'totalKills', 'hillTime', 'percentTimeMoving', 'lethalsUsed', 'tacticalsUsed',
         'tradedDeaths', 'tradedKills', 'untradedDeaths', 'untradedKills', 'team_type', 'totalRotationKills', 
         'matchGameResult.hostGameScore', 'matchGameResult.guestGameScore', 'oppo_abbrev',  'totalFirstBloodKills', 'abbrev'
         ]]
     df_refined = assign_extra_vars(df_refined)
-    df_refined = df_refined[df_refined["gameMode"]=="CDL Hardpoint"]
     fig = plt.figure(figsize=(x_size, y_size))
     ax1 = fig.subplots()
     ax1.set_title(f"Hill Time vs KD - {host_name} {'vs' if guest_name != '' else ''} {guest_name}")
@@ -207,13 +182,12 @@ def cdl_kd_hill(df, host_name, guest_name, host_colour, guest_colour, x_size=7,
 
 
 def cdl_rot_kills(df, host_name, guest_name, host_colour, guest_colour, x_size=7, y_size=8, legend_location="upper left", sens=0.3):
-    df_refined = df[['alias', 'gameMode', 'gameMap', 'totalDistanceTraveled', 'totalDamageDealt', 'totalShotsFired', 'totalShotsHit', 
+    df_refined = filter_matches(df, gamemode='CDL Hardpoint')[['alias', 'gameMode', 'gameMap', 'totalDistanceTraveled', 'totalDamageDealt', 'totalShotsFired', 'totalShotsHit', 
         'totalAssists', 'totalDeaths', 'totalKills', 'hillTime', 'percentTimeMoving', 'lethalsUsed', 'tacticalsUsed',
         'tradedDeaths', 'tradedKills', 'untradedDeaths', 'untradedKills', 'team_type', 'totalRotationKills', 
         'matchGameResult.hostGameScore', 'matchGameResult.guestGameScore', 'oppo_abbrev', 'totalFirstBloodKills', 'abbrev'
         ]]
     df_refined = assign_extra_vars(df_refined)
-    df_refined = df_refined[df_refined["gameMode"]=="CDL Hardpoint"]
     fig = plt.figure(figsize=(x_size, y_size))
     ax1 = fig.subplots()
     ax1.set_title(f"Hill Time vs Percent of Kills that are Rotational Kills - {host_name} {'vs' if guest_name != '' else ''} {guest_name}")
@@ -230,13 +204,12 @@ def cdl_rot_kills(df, host_name, guest_name, host_colour, guest_colour, x_size=7
     ax1.set_ylabel("Hill Time")
 
 def cdl_fb_perc(df, host_name, guest_name, host_colour, guest_colour, x_size=7, y_size=8, legend_location="upper left", sens=0.3):
-    df_refined = df[['alias', 'gameMode', 'gameMap', 'totalDistanceTraveled', 'totalDamageDealt', 'totalShotsFired', 'totalShotsHit', 
+    df_refined = filter_matches(df, gamemode='CDL SnD')[['alias', 'gameMode', 'gameMap', 'totalDistanceTraveled', 'totalDamageDealt', 'totalShotsFired', 'totalShotsHit', 
         'totalAssists', 'totalDeaths', 'totalKills', 'hillTime', 'percentTimeMoving', 'lethalsUsed', 'tacticalsUsed',
         'tradedDeaths', 'tradedKills', 'untradedDeaths', 'untradedKills', 'team_type', 'totalRotationKills', 
         'matchGameResult.hostGameScore', 'matchGameResult.guestGameScore', 'oppo_abbrev', 'totalFirstBloodKills', 'deadSilenceTime', 'abbrev'
         ]]
     df_refined = assign_extra_vars(df_refined)
-    df_refined = df_refined[df_refined["gameMode"]=="CDL SnD"]
     df_refined = df_refined[df_refined['totalKills'] > 5]
     fig = plt.figure(figsize=(x_size, y_size))
     ax1 = fig.subplots()
@@ -255,21 +228,15 @@ def cdl_fb_perc(df, host_name, guest_name, host_colour, guest_colour, x_size=7,
 
 def cdl_fair_fights(df, host_name, guest_name, host_colour, guest_colour, x_size=7, y_size=8, legend_location="upper left",
                     control=True, hardpoint=True, search=True, sens=0.3):
-    df_refined = df[['alias', 'gameMode', 'gameMap', 'totalDistanceTraveled', 'totalDamageDealt', 'totalShotsFired', 'totalShotsHit', 
+    df_refined = filter_matches(df, gamemode=kept_modes(control, hardpoint, search))[['alias', 'gameMode', 'gameMap', 'totalDistanceTraveled', 'totalDamageDealt', 'totalShotsFired', 'totalShotsHit', 
         'totalAssists', 'totalDeaths', 'totalKills', 'hillTime', 'percentTimeMoving', 'lethalsUsed', 'tacticalsUsed',
         'tradedDeaths', 'tradedKills', 'untradedDeaths', 'untradedKills', 'team_type', 'totalRotationKills', 
         'matchGameResult.hostGameScore', 'matchGameResult.guestGameScore', 'oppo_abbrev', 'totalFirstBloodKills', 'deadSilenceTime', 'abbrev',
         'totalInVictimFovKills'
         ]]
     df_refined = assign_extra_vars(df_refined)
-    if not control:
-        df_refined = df_refined[df_refined['gameMode'] != 'CDL Control']
-    if not hardpoint:
-        df_refined = df_refined[df_refined['gameMode'] != "CDL Hardpoint"]
-    if not search:
-        df_refined = df_refined[df_refined['gameMode'] != "CDL SnD"]
     df_refined.reset_index(inplace=True)
-    df_refined['fair_fights'] = ((df_refined['totalInVictimFovKills']/df['totalKills'])*100).round(2)
+    df_refined['fair_fights'] = ((df_refined['totalInVictimFovKills']/df_refined['totalKills'])*100).round(2)
     fig = plt.figure(figsize=(x_size, y_size))
     ax1 = fig.subplots()
     ax1.set_title(f"Fair Fight Wins - {host_name} {'vs' if guest_name != '' else ''} {guest_name}")
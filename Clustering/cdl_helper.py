@@ -5,6 +5,15 @@ import numpy as np
 import requests
 import os
 import re
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from cdl_common.features import add_match_features, match_features
+from cdl_common.head_to_head import HeadToHead, head_to_head_base
+from cdl_common.indexed import filter_matches
+# read_in_list, read_in_all_matches, read_number_range and generate_outlier_score used to live here
+from cdl_common.loader import read_in_all_matches, read_in_list, read_number_range
+from cdl_common.outliers import generate_outlier_score, outlier_scores
 
 
 CDL_ROLES = {'Cellium': 'AR',
@@ -81,33 +90,8 @@ CDL_PALETTE = {'NY': 'yellow',
            'LDN': '#800020'}
 
 
-def read_number_range(start: int, end: int) -> pd.DataFrame:
-    not_exist = []
-    dataframes = []
-    for i in range(start, end+1):
-        try:
-            dataframes.append(pd.read_csv(f"../data/cdl_{i}.csv"))
-        except FileNotFoundError:
-            not_exist.append(i)
-    print(f"The following match IDs do not exist {not_exist}")
-    df = pd.concat(dataframes)
-    return df
-
-
-def generate_outlier_score(column1, column2, method: str):
-    col1_scores = (np.array([abs(round(a/b, 2)-1) if b > 0 else 0 for a, b in\
-                         zip(column1, [column1.mean() if method.lower=='mean' else column1.median() for i in column1])]))
-    col2_scores = (np.array([abs(round(a/b, 2)-1) if b > 0 else 0 for a, b in\
-                         zip(column2, [column2.mean() if method.lower=='mean' else column2.median() for i in column2])]))
-    
-    return (col1_scores+col2_scores)/2
-
-
 def declare_winner(df: pd.DataFrame) -> pd.DataFrame:
-    df['map_winner'] = ["host" if a > b else "guest" for a, b in zip(df['matchGameResult.hostGameScore'], df['matchGameResult.guestGameScore'])]
-
-    df['is_winner'] = ["Y" if a == b else "N" for a, b in zip(df['map_winner'], df['team_type'])]
-
+    df[['map_winner', 'is_winner']] = match_features(df, ['map_winner', 'is_winner'])
     return df
 
 
@@ -115,23 +99,14 @@ def compare_stats(df: pd.DataFrame, col1:str , col2: str, title: str = None,
                    sens=None, hue_by="abbrev", gamemode=None, team=None,
                      size=(10, 10), show_winner=False, grid=True,
                      legend=True, outlier_method='mean', map=None,
-                     pal=None, x_gap=0, hidden_spines=None, show_event=False):
+                     pal=None, x_gap=0, hidden_spines=None, show_event=False, outlier_by=None):
     
-    df = declare_winner(df)
+    df = filter_matches(df, gamemode=gamemode or None, team=team or None, map=map or None)
+    df = add_match_features(df, ['map_winner', 'is_winner'])
 
     fig = plt.figure(figsize=size)
     ax1 = fig.subplots(ncols=1)
 
-    if gamemode:
-        df = df[df['gameMode'].isin([gamemode] if type(gamemode) == str else gamemode)]
-    
-    if team:
-        df = df[df['abbrev'].isin([team] if type(team) == str else team)]
-    
-    if map:
-        df = df[df['gameMap'].isin([map] if type(map) == str else map)]
-
-
     chosen_style = None
     if show_winner:
         chosen_style = 'is_winner'
@@ -145,8 +120,8 @@ def compare_stats(df: pd.DataFrame, col1:str , col2: str, title: str = None,
         ax1.grid(True, alpha=0.4)
 
     if sens:
-        outlier_scores = generate_outlier_score(df[col1], df[col2], outlier_method)
-        for x, y, s, op, score in zip(df[col1], df[col2], df['alias'], df['oppo_abbrev'], outlier_scores):
+        scores = outlier_scores(df, [col1, col2], outlier_method, by=outlier_by)
+        for x, y, s, op, score in zip(df[col1], df[col2], df['alias'], df['oppo_abbrev'], scores):
             if score > sens:
                 ax1.text(x+x_gap, y, f"{s} ({op})", color='black', alpha=0.65)
 
@@ -186,59 +161,16 @@ def get_matches(url):
         match_ids.append(match.split(':')[-1])
     return match_ids
 
-def read_in_list(ids):
-    frames = []
-    for idd in ids:
-        frames.append(pd.read_csv(f'../data/cdl_{idd}.csv'))
-    return pd.concat(frames)
-
-        
-def read_in_all_matches() -> pd.DataFrame:
-    matchIDs = pd.read_json('../major_ids.json')
-
-    m1_qual = read_in_list(matchIDs['major1'][0])
-    m2_qual = read_in_list(matchIDs['major2'][0])
-    m2_event = read_in_list(matchIDs['major2'][1])
-    m3_qual = read_in_list(matchIDs['major3'][0])
-    m3_event = read_in_list(matchIDs['major3'][1])
-
-    m1_qual['event'] = ['M1Qual' for i in m1_qual[m1_qual.columns[0]]]
-    m2_qual['event'] = ['M2Qual' for i in m2_qual[m2_qual.columns[0]]]
-    m3_qual['event'] = ['M3Qual' for i in m3_qual[m3_qual.columns[0]]]
-
-    m2_event['event'] = ['M2Event' for i in m2_event[m2_event.columns[0]]]
-    m3_event['event'] = ['M3Event' for i in m3_event[m3_event.columns[0]]]
-
-    m1_qual['setting'] = ['online' for i in m1_qual[m1_qual.columns[0]]]
-    m2_qual['setting'] = ['online' for i in m2_qual[m2_qual.columns[0]]]
-    m3_qual['setting'] = ['online' for i in m3_qual[m3_qual.columns[0]]]
-
-    m2_event['setting'] = ['lan' for i in m2_event[m2_event.columns[0]]]
-    m3_event['setting'] = ['lan' for i in m3_event[m3_event.columns[0]]]
-
-    complete_df = pd.concat([m1_qual, m2_event, m2_qual, m3_qual, m3_event])
-
-    return complete_df
-
-
-def head_to_head(df, main, opposition, compare, title, axes, gamemode=None, map=None):
-    df['accuracy'] = ((df['totalShotsHit']/df['totalShotsFired'])*100).round(2)
-    df['kd'] = (df['totalKills']/df['totalDeaths']).round(2)
-    if gamemode:
-        df = df[df['gameMode'].isin([gamemode] if type(gamemode) == str else [*gamemode])]
-
-    if map:
-        df = df[df['gameMap'].isin([map] if type(map) == str else [*map])]
-
-    df = df[df['abbrev']==main]
-    df_opp = df.copy()[df['oppo_abbrev']==opposition]
-    df_rest = df.copy()[df['oppo_abbrev']!=opposition]
-    df_opp = df_opp[['alias', compare, 'oppo_abbrev', 'abbrev']]
-    df_rest = df_rest[['alias', compare, 'oppo_abbrev', 'abbrev']]
-    op_stats = df_opp.groupby('alias').mean().reset_index().rename(columns={compare:  f'{compare} vs {opposition}'})
-    rest_stats = df_rest.groupby('alias').mean().reset_index().rename(columns={compare:  f'{compare} vs Rest'})
-    joined = rest_stats.merge(op_stats, how='left', on='alias')
-    joined.set_index('alias', inplace=True)
+def head_to_head(df, main, opposition, compare, title, axes, gamemode=None, map=None, h2h=None):
+    """
+    Plots main's players' compare stat against opposition next to against the rest of the league.
+    df can be a frame or an IndexedMatches. Pass h2h from read_head_to_head to plot from its lookups
+    instead of regrouping df (gamemode and map are then ignored, filter when building h2h). df is not changed
+    """
+    if h2h is None:
+        df = filter_matches(df, team=main, gamemode=gamemode or None, map=map or None)
+        h2h = HeadToHead(head_to_head_base(df, [compare]))
+    joined = h2h.players(main, opposition, compare)
     joined.plot(kind='bar', color=['darkblue', CDL_PALETTE[opposition]], ax=axes)
     axes.set_ylabel(compare)
     axes.set_title(title)
@@ -246,14 +178,12 @@ def head_to_head(df, main, opposition, compare, title, axes, gamemode=None, map=
     axes.set_xlabel('')
 
 def assign_map_winner(df):
-    df['map_winner'] = ["host" if a > b else "guest" for a, b in zip(df['matchGameResult.hostGameScore'], df['matchGameResult.guestGameScore'])]
-
-    df['is_winner'] = [1 if a == b else 0 for a, b in zip(df['map_winner'], df['team_type'])]
-
-
+    features = match_features(df, ['map_winner', 'is_winner'])
+    df['map_winner'] = features['map_winner']
+    df['is_winner'] = (features['is_winner'] == 'Y').astype(int)
     return df
 
 def assign_match_winner(df):
-    df['isMatchWinner'] = ['y' if a == b else 'n' for a, b in zip(df['winnerTeamId'], df['team_id'])]
+    df['isMatchWinner'] = match_features(df, ['isMatchWinner'])['isMatchWinner']
     return df
 
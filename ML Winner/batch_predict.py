@@ -0,0 +1,162 @@
+"""
+Scores a whole table of (team1, team2, map, mode) matchups in one model call per mode.
+
+Each team's profile is worked out once from team_map_stats:
+- its mean over the last `recent` maps it played in each mode
+- its mean on each map in each mode
+The matchup table's feature rows are built from these with two indexed lookups per side. A
+side's map profile is used when the team has played that map in that mode at least
+`min_map_maps` times, otherwise its mode form is used. Every matchup is scored in both
+orders, since the models were fitted with team1 as the host. The two orders are averaged,
+as simulate_matchup in winner.ipynb pooled both.
+
+Precompute every pairing before an event, from the ML Winner folder:
+    python batch_predict.py --out predictions.csv
+"""
+import argparse
+import os
+import sys
+from itertools import combinations
+from typing import Dict, List, NamedTuple, Optional
+
+import numpy as np
+import pandas as pd
+
+from model_registry import MODE_SPECS, ModelRegistry
+from reformatter import TEAM_STATS, team_map_stats
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from cdl_common import loader
+
+MATCHUP_COLUMNS = ['team1', 'team2', 'map', 'mode']
+
+
+class TeamProfiles(NamedTuple):
+    # Indexed by (abbrev, gameMode): TEAM_STATS means over each team's last `recent` maps in the mode
+    form: pd.DataFrame
+    # Indexed by (abbrev, gameMode, gameMap): TEAM_STATS means plus 'maps', the number played
+    maps: pd.DataFrame
+
+
+def team_profiles(df: Optional[pd.DataFrame] = None, recent: int = 15) -> TeamProfiles:
+    """
+    Desc: Every team's recent form per mode and record per map, for looking matchups up in
+    Params:
+        df (pandas df) - player-map rows, defaults to every loaded match
+        recent (int) - maps per mode that count towards a team's form
+    """
+    if df is None:
+        df = loader.read_in_all_matches()
+    stats = team_map_stats(df.copy()).sort_values('matchGame.updatedAt', ascending=False, kind='stable')
+    # A map with no deaths or no kills has an infinite or undefined rate, leave it out of the means
+    stats[TEAM_STATS] = stats[TEAM_STATS].replace([np.inf, -np.inf], np.nan)
+    form = stats.groupby(['abbrev', 'gameMode']).head(recent).groupby(['abbrev', 'gameMode'])[TEAM_STATS].mean()
+    grouped = stats.groupby(['abbrev', 'gameMode', 'gameMap'])
+    maps = grouped[TEAM_STATS].mean()
+    maps['maps'] = grouped.size()
+    return TeamProfiles(form, maps)
+
+
+def _side_features(profiles: TeamProfiles, teams: np.ndarray, modes: np.ndarray, maps: np.ndarray,
+                   min_map_maps: int) -> np.ndarray:
+    form = profiles.form.reindex(pd.MultiIndex.from_arrays([teams, modes])).to_numpy()
+    on_map = profiles.maps.reindex(pd.MultiIndex.from_arrays([teams, modes, maps]))
+    use_map = (on_map['maps'].fillna(0).to_numpy() >= min_map_maps)[:, None]
+    return np.where(use_map, on_map[TEAM_STATS].to_numpy(), form)
+
+
+def matchup_features(matchups: pd.DataFrame, profiles: TeamProfiles, min_map_maps: int = 2) -> pd.DataFrame:
+    """
+    Desc: The model feature row of every matchup, {stat}_team1 and {stat}_team2 for each of TEAM_STATS
+    Params:
+        matchups (pandas df) - 'team1', 'team2', 'mode' and optionally 'map' columns
+        profiles (TeamProfiles)
+        min_map_maps (int) - maps a team must have played on the map before its map profile replaces its form
+    """
+    modes = matchups['mode'].to_numpy()
+    maps = matchups['map'].to_numpy() if 'map' in matchups.columns else np.full(len(matchups), None)
+    sides = [_side_features(profiles, matchups[team].to_numpy(), modes, maps, min_map_maps) for team in ('team1', 'team2')]
+    columns = [f"{stat}_{team}" for team in ('team1', 'team2') for stat in TEAM_STATS]
+    return pd.DataFrame(np.hstack(sides), columns=columns, index=matchups.index)
+
+
+def predict_matchups(matchups: pd.DataFrame, profiles: Optional[TeamProfiles] = None,
+                     registry: Optional[ModelRegistry] = None, min_map_maps: int = 2) -> pd.DataFrame:
+    """
+    Desc: Win probabilities for a table of matchups, one model call per mode
+    Params:
+        matchups (pandas df) - 'team1', 'team2', 'mode' and optionally 'map' columns, e.g. from all_pairings()
+        profiles (TeamProfiles) - defaults to team_profiles() over every loaded match
+        registry (ModelRegistry) - defaults to predict_winner's shared registry
+        min_map_maps (int)
+    returns:
+        predictions (pandas df) - the matchups with 'p_team1' and 'p_team2' columns, NaN where either team
+                                  has no maps in the mode or the mode has no model
+    """
+    if registry is None:
+        from predict_winner import registry
+    if profiles is None:
+        profiles = team_profiles()
+    swapped = matchups.rename(columns={'team1': 'team2', 'team2': 'team1'})
+    forward = matchup_features(matchups, profiles, min_map_maps)
+    backward = matchup_features(swapped, profiles, min_map_maps)
+
+    p_team1 = np.full(len(matchups), np.nan)
+    modes = matchups['mode'].to_numpy()
+    for mode in MODE_SPECS:
+        rows = np.flatnonzero(modes == mode)
+        if not len(rows):
+            continue
+        model = registry.get(mode)
+        both = pd.concat([forward.iloc[rows], backward.iloc[rows]])[model.features]
+        scorable = both.notna().all(axis=1).to_numpy()
+        team1_wins = np.full(len(both), np.nan)
+        if scorable.any():
+            team1_wins[scorable] = model.predict_proba(both[scorable])[:, 0]
+        p_team1[rows] = (team1_wins[:len(rows)] + (1 - team1_wins[len(rows):])) / 2
+
+    predictions = matchups.copy()
+    predictions['p_team1'] = p_team1
+    predictions['p_team2'] = 1 - p_team1
+    return predictions
+
+
+def all_pairings(teams: List[str], modes: Optional[List[str]] = None,
+                 maps: Optional[Dict[str, List[str]]] = None) -> pd.DataFrame:
+    """
+    Desc: Every pair of teams on every map of every mode
+    Params:
+        teams (list of str) - team abbreviations
+        modes (list of str) - defaults to every mode with a model
+        maps (dict) - mode to its map pool, defaults to a single mode-level row (map None) per pair
+    returns:
+        matchups (pandas df) - 'team1', 'team2', 'map', 'mode'
+    """
+    modes = list(MODE_SPECS) if modes is None else modes
+    maps = maps or {}
+    rows = [(team1, team2, game_map, mode) for team1, team2 in combinations(sorted(teams), 2)
+            for mode in modes for game_map in maps.get(mode, [None])]
+    return pd.DataFrame(rows, columns=MATCHUP_COLUMNS)
+
+
+def season_map_pools(df: pd.DataFrame) -> Dict[str, List[str]]:
+    """
+    The maps played in each mode with a model
+    """
+    played = df[df['gameMode'].isin(list(MODE_SPECS))]
+    return {mode: sorted(group.unique()) for mode, group in played.groupby('gameMode')['gameMap']}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Predict every pairing of teams on every map")
+    parser.add_argument('--teams', nargs='*', help="team abbreviations, defaults to every team")
+    parser.add_argument('--mode-only', action='store_true', help="one row per pair and mode instead of per map")
+    parser.add_argument('--out', default='predictions.csv')
+    args = parser.parse_args()
+
+    matches = loader.read_in_all_matches()
+    pairings = all_pairings(args.teams or sorted(matches['abbrev'].unique()),
+                            maps=None if args.mode_only else season_map_pools(matches))
+    predictions = predict_matchups(pairings, team_profiles(matches))
+    predictions.to_csv(args.out, index=False)
+    print(f"Wrote {len(predictions)} matchups to {args.out}")
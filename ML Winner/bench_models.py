@@ -0,0 +1,71 @@
+"""
+Benchmarks the model registry against the old refit-per-simulation winner models.
+
+For each mode, times sim_count simulations of one matchup the old way (a new random forest
+fitted for every simulation), then with the registry: a cold call that trains and saves,
+a call in a fresh process that loads the saved model, and a warm call from memory.
+Run from the ML Winner folder:
+    python bench_models.py 100
+"""
+import subprocess
+import sys
+import tempfile
+import time
+
+from sklearn.ensemble import RandomForestClassifier
+
+from model_registry import MODE_SPECS, ModelRegistry, training_data
+from predict_winner import reshape_all
+
+WARM_CALL = """
+import sys, time
+from model_registry import ModelRegistry
+from predict_winner import reshape_all
+from model_registry import training_data
+registry = ModelRegistry(sys.argv[1])
+row = training_data(sys.argv[2], reshape_all())[0].mean().to_frame().T
+start = time.perf_counter()
+registry.predict_proba(sys.argv[2], row)
+print(time.perf_counter() - start)
+"""
+
+
+def legacy_simulations(mode: str, predict_data, sim_count: int) -> list:
+    """
+    The sim_count loop of hardpoint_model, control_model and snd_model before the registry
+    """
+    trainX, trainY = training_data(mode, reshape_all())
+    spec = MODE_SPECS[mode]
+    simulations = []
+    for _ in range(sim_count):
+        rf = RandomForestClassifier(max_depth=spec.max_depth, n_estimators=spec.n_estimators)
+        rf.fit(trainX, trainY)
+        simulations.append(rf.predict(predict_data)[0])
+    return simulations
+
+
+if __name__ == '__main__':
+    sim_count = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    features = reshape_all()
+    with tempfile.TemporaryDirectory() as model_dir:
+        registry = ModelRegistry(model_dir)
+        print(f"{sim_count} simulations of one matchup, seconds")
+        print(f"{'mode':<14} {'refit loop':>10} {'train':>8} {'load':>8} {'warm':>8}  P(team1)")
+        for mode in MODE_SPECS:
+            row = training_data(mode, features)[0].mean().to_frame().T
+
+            start = time.perf_counter()
+            legacy_simulations(mode, row, sim_count)
+            legacy = time.perf_counter() - start
+
+            start = time.perf_counter()
+            registry.predict_proba(mode, row)
+            cold = time.perf_counter() - start
+
+            loaded = float(subprocess.run([sys.executable, '-c', WARM_CALL, model_dir, mode],
+                                          capture_output=True, text=True, check=True).stdout)
+
+            start = time.perf_counter()
+            probabilities = registry.predict_proba(mode, row)
+            warm = time.perf_counter() - start
+            print(f"{mode:<14} {legacy:10.2f} {cold:8.2f} {loaded:8.3f} {warm:8.3f}  {probabilities[0, 0]:.2f}")
@@ -0,0 +1,129 @@
+"""
+A versioned, on-disk copy of reshape_match's per-map team1/team2 feature table.
+
+update_features reshapes only the catalog matches it has not stored yet and appends their
+rows to data/ml_features/. It rebuilds the table when FEATURE_VERSION changes or when a csv it
+already stored has changed. load_features gives the models their training rows from the
+stored table. The table is kept in memory until a csv or the store changes, so repeated
+loads cost a lookup.
+"""
+import json
+import os
+import sys
+from typing import Dict, List, Optional
+
+import pandas as pd
+
+from reformatter import reshape_match
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from cdl_common.catalog import DATA_DIR, read_catalog
+from cdl_common.csv_loader import read_match_frames
+from cdl_common.dataset_cache import freeze
+from cdl_common.loader import cache, catalog_paths
+from cdl_common.match_store import source_mtimes
+
+FEATURE_DIR = os.path.join(DATA_DIR, 'ml_features')
+# Bump whenever reshape_match changes the rows or columns it produces, so stored tables are rebuilt
+FEATURE_VERSION = 1
+MATCH_ID = 'matchGame.matchId'
+
+
+class FeatureStore:
+    """
+    Desc: The reshaped rows of every stored match, with the event each came from
+    Params:
+        table (pandas df) - reshape_match rows plus 'event', indexed by matchGame.matchId
+        sources (dict) - match ID (str) to the mtime of the csv its rows were reshaped from
+        version (int) - FEATURE_VERSION the table was built with
+    """
+    def __init__(self, table: Optional[pd.DataFrame] = None, sources: Optional[Dict[str, float]] = None,
+                 version: int = FEATURE_VERSION) -> None:
+        self.table = table
+        self.sources = sources or {}
+        self.version = version
+
+    def ingest(self, df: pd.DataFrame, sources: Dict[str, float]) -> None:
+        """
+        Desc: Reshapes the player-map rows of new matches and appends them
+        Params:
+            df (pandas df) - rows of the new matches only, with an 'event' column
+            sources (dict) - match ID (str) to csv mtime for those matches
+        """
+        events = df.groupby(MATCH_ID)['event'].first()
+        rows = reshape_match(df.drop(columns=['event']))
+        rows['event'] = events.reindex(rows.index).to_numpy()
+        self.table = rows if self.table is None else pd.concat([self.table, rows])
+        self.sources.update(sources)
+
+    def save(self, feature_dir: str = FEATURE_DIR) -> None:
+        os.makedirs(feature_dir, exist_ok=True)
+        temp_path = os.path.join(feature_dir, '_features.parquet.tmp')
+        self.table.to_parquet(temp_path)
+        os.replace(temp_path, os.path.join(feature_dir, 'features.parquet'))
+        temp_path = os.path.join(feature_dir, '_features.json.tmp')
+        with open(temp_path, 'w') as file:
+            json.dump({'version': self.version, 'sources': self.sources}, file)
+        os.replace(temp_path, os.path.join(feature_dir, '_features.json'))
+
+    @classmethod
+    def load(cls, feature_dir: str = FEATURE_DIR) -> 'FeatureStore':
+        """
+        Returns the saved store, or an empty one if none has been saved or it was built by another FEATURE_VERSION
+        """
+        metadata_path = os.path.join(feature_dir, '_features.json')
+        if not os.path.exists(metadata_path):
+            return cls()
+        with open(metadata_path) as file:
+            metadata = json.load(file)
+        if metadata['version'] != FEATURE_VERSION:
+            return cls()
+        return cls(pd.read_parquet(os.path.join(feature_dir, 'features.parquet')), metadata['sources'])
+
+
+def update_features(feature_dir: str = FEATURE_DIR, data_dir: str = DATA_DIR) -> FeatureStore:
+    """
+    Desc: Loads the saved feature table and brings it up to date with the catalog. New matches are
+          reshaped and appended; if a stored csv changed or left the catalog the table is rebuilt
+    Params:
+        feature_dir (str)
+        data_dir (str)
+    returns:
+        store (FeatureStore)
+    """
+    catalog = read_catalog()
+    current = source_mtimes(catalog, data_dir)
+    store = FeatureStore.load(feature_dir)
+    if any(current.get(match_id) != mtime for match_id, mtime in store.sources.items()):
+        store = FeatureStore()
+    new_entries = [entry for entry in catalog if str(entry.match_id) in current and str(entry.match_id) not in store.sources]
+    if not new_entries:
+        return store
+
+    frames = read_match_frames([entry.match_id for entry in new_entries], data_dir=data_dir)
+    for frame, entry in zip(frames, new_entries):
+        frame['event'] = entry.event
+    store.ingest(pd.concat(frames, ignore_index=True),
+                 {str(entry.match_id): current[str(entry.match_id)] for entry in new_entries})
+    store.save(feature_dir)
+    return store
+
+
+def load_features(events: Optional[List[str]] = None, feature_dir: str = FEATURE_DIR) -> pd.DataFrame:
+    """
+    Desc: The reshape_match rows of every match in events, updating the store first if new matches were scraped
+    Params:
+        events (list of str) - e.g. ['M1Qual', 'M2Qual'], defaults to all
+        feature_dir (str)
+    returns:
+        features (pandas df) - indexed by matchGame.matchId, treat as read-only
+    """
+    def load() -> pd.DataFrame:
+        table = update_features(feature_dir).table
+        if table is None:
+            return pd.DataFrame()
+        if events is not None:
+            table = table[table['event'].isin(events)]
+        return table.drop(columns=['event'])
+
+    return cache.get_or_load(('ml_features', feature_dir, freeze(events)), catalog_paths(), load)
@@ -0,0 +1,224 @@
+"""
+Trains each game mode's winner model once per version of its training data and keeps it on disk.
+
+A model's version is a hash of its training rows, its hyperparameters, MODEL_VERSION and the
+scikit-learn version. ModelRegistry.get returns the model from memory, then from
+data/ml_models/, and only trains when neither has the current version. Each model is one
+random forest fitted on all cores, with a sigmoid calibrator fitted to its out-of-fold
+predictions over CALIBRATION_FOLDS folds. predict_proba therefore gives calibrated win
+probabilities from a single forest's votes.
+
+The forest settings come from MODE_SPECS unless tuning.py has written better ones to the
+registry's tuned.json, which changes the version and so retrains the model.
+"""
+import hashlib
+import json
+import os
+import sys
+from dataclasses import dataclass, field
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+import joblib
+import numpy as np
+import pandas as pd
+import sklearn
+from sklearn.calibration import CalibratedClassifierCV
+from sklearn.ensemble import RandomForestClassifier
+
+from feature_store import load_features
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from cdl_common.catalog import DATA_DIR
+
+MODEL_DIR = os.path.join(DATA_DIR, 'ml_models')
+# Bump whenever training changes in a way the data hash cannot see, so saved models are retrained
+MODEL_VERSION = 1
+CALIBRATION_FOLDS = 5
+TUNED_FILE = 'tuned.json'
+
+# The winner models were tuned on these events only
+MODEL_EVENTS = ['M1Qual', 'M2Qual', 'M2Event', 'M3Qual']
+
+
+class ModeSpec(NamedTuple):
+    drop: List[str]
+    max_depth: int
+    n_estimators: int
+
+
+MODE_SPECS: Dict[str, ModeSpec] = {
+    'CDL Hardpoint': ModeSpec(['fbPerc_team1', 'fbPerc_team2'], 11, 67),
+    'CDL Control': ModeSpec(['fbPerc_team1', 'fbPerc_team2', 'rotationalPercent_team1', 'rotationalPercent_team2'], 4, 306),
+    'CDL SnD': ModeSpec(['rotationalPercent_team1', 'rotationalPercent_team2'], 17, 71),
+}
+
+
+def training_data(mode: str, features: pd.DataFrame) -> Tuple[pd.DataFrame, pd.Series]:
+    """
+    Desc: The feature rows and labels of one mode, labelled 0 when team1 won and 1 when team2 won
+    Params:
+        mode (str) - a key of MODE_SPECS
+        features (pandas df) - e.g. load_features(MODEL_EVENTS)
+    """
+    if mode not in MODE_SPECS:
+        raise ValueError(f"mode must be one of {list(MODE_SPECS)}")
+    rows = features[features['mode'] == mode].drop(columns=MODE_SPECS[mode].drop).dropna(how='any', axis=0)
+    return rows.drop(columns=['winner', 'mode']), (rows['winner'] == 'team2').astype('int64')
+
+
+def data_version(mode: str, trainX: pd.DataFrame, trainY: pd.Series, spec: Optional[ModeSpec] = None) -> str:
+    """
+    Hashes everything a trained model depends on
+    """
+    digest = hashlib.sha256()
+    spec = MODE_SPECS[mode] if spec is None else spec
+    digest.update(json.dumps([MODEL_VERSION, sklearn.__version__, mode, spec, CALIBRATION_FOLDS,
+                              list(trainX.columns)]).encode())
+    digest.update(pd.util.hash_pandas_object(trainX, index=False).to_numpy().tobytes())
+    digest.update(trainY.to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+@dataclass
+class WinnerModel:
+    """
+    A fitted, calibrated model for one mode and the training data version it was fitted on
+    """
+    mode: str
+    version: str
+    features: List[str]
+    model: CalibratedClassifierCV = field(repr=False)
+
+    def predict_proba(self, predict_data: pd.DataFrame) -> np.ndarray:
+        """
+        Desc: Calibrated win probabilities
+        Params:
+            predict_data (pandas df) - one row per matchup with the training feature columns, in any order
+        returns:
+            probabilities (numpy array) - rows x 2, the chance team1 wins then the chance team2 wins
+        """
+        missing = [column for column in self.features if column not in predict_data.columns]
+        if missing:
+            raise KeyError(f"predict_data is missing the {self.mode} features {missing}")
+        return self.model.predict_proba(predict_data[self.features])
+
+
+def build_model(spec: ModeSpec, n_jobs: int = -1, random_state: Optional[int] = 0) -> CalibratedClassifierCV:
+    """
+    An unfitted random forest with spec's settings inside the sigmoid calibrator every served model uses
+    """
+    forest = RandomForestClassifier(max_depth=spec.max_depth, n_estimators=spec.n_estimators, n_jobs=n_jobs,
+                                    random_state=random_state)
+    return CalibratedClassifierCV(forest, method='sigmoid', cv=CALIBRATION_FOLDS, ensemble=False)
+
+
+def train_model(mode: str, features: pd.DataFrame, n_jobs: int = -1, random_state: Optional[int] = 0,
+                spec: Optional[ModeSpec] = None) -> WinnerModel:
+    """
+    Desc: Fits one mode's calibrated random forest on all cores
+    Params:
+        mode (str) - a key of MODE_SPECS
+        features (pandas df) - e.g. load_features(MODEL_EVENTS)
+        n_jobs (int) - cores for the forest, -1 for all
+        random_state (int) - seed of the forest, None for a different forest every time
+        spec (ModeSpec) - forest settings, defaults to MODE_SPECS[mode]
+    """
+    trainX, trainY = training_data(mode, features)
+    spec = MODE_SPECS[mode] if spec is None else spec
+    model = build_model(spec, n_jobs, random_state)
+    model.fit(trainX, trainY)
+    return WinnerModel(mode, data_version(mode, trainX, trainY, spec), list(trainX.columns), model)
+
+
+class ModelRegistry:
+    """
+    Desc: Trained WinnerModels kept in memory and in model_dir, retrained only when their training data changes
+    Params:
+        model_dir (str)
+        events (list of str) - events whose maps the models are trained on
+    """
+    def __init__(self, model_dir: str = MODEL_DIR, events: Optional[List[str]] = None) -> None:
+        self.model_dir = model_dir
+        self.events = MODEL_EVENTS if events is None else events
+        self._models: Dict[str, WinnerModel] = {}
+        self._tuned: Optional[Dict[str, dict]] = None
+
+    def path(self, mode: str, version: str) -> str:
+        return os.path.join(self.model_dir, f"{self._slug(mode)}-{version[:16]}.joblib")
+
+    @staticmethod
+    def _slug(mode: str) -> str:
+        return mode.lower().replace('cdl ', '').replace(' ', '_')
+
+    def tuned(self) -> Dict[str, dict]:
+        """
+        Mode to the forest settings and score tuning.py wrote for it, from model_dir's tuned.json
+        """
+        if self._tuned is None:
+            path = os.path.join(self.model_dir, TUNED_FILE)
+            self._tuned = {}
+            if os.path.exists(path):
+                with open(path) as file:
+                    self._tuned = json.load(file)
+        return self._tuned
+
+    def spec(self, mode: str) -> ModeSpec:
+        """
+        The forest settings the mode's model is trained with, tuned if tuning.py has run
+        """
+        tuned = self.tuned().get(mode)
+        if tuned is None:
+            return MODE_SPECS[mode]
+        return MODE_SPECS[mode]._replace(max_depth=tuned['max_depth'], n_estimators=tuned['n_estimators'])
+
+    def set_spec(self, mode: str, spec: ModeSpec, **details) -> None:
+        """
+        Desc: Records tuned forest settings for a mode; its model is retrained on the next get
+        Params:
+            mode (str)
+            spec (ModeSpec) - only max_depth and n_estimators are kept, the dropped columns stay MODE_SPECS'
+            details - anything else to keep with them, e.g. score=-0.61, scoring='neg_log_loss'
+        """
+        tuned = dict(self.tuned())
+        tuned[mode] = {'max_depth': spec.max_depth, 'n_estimators': spec.n_estimators, **details}
+        os.makedirs(self.model_dir, exist_ok=True)
+        path = os.path.join(self.model_dir, TUNED_FILE)
+        with open(f"{path}.tmp", 'w') as file:
+            json.dump(tuned, file, indent=2)
+        os.replace(f"{path}.tmp", path)
+        self._tuned = tuned
+
+    def get(self, mode: str) -> WinnerModel:
+        """
+        Desc: The mode's model for the current training data, trained and saved if it is not in memory or on disk
+        """
+        features = load_features(self.events)
+        trainX, trainY = training_data(mode, features)
+        spec = self.spec(mode)
+        version = data_version(mode, trainX, trainY, spec)
+        model = self._models.get(mode)
+        if model is not None and model.version == version:
+            return model
+
+        path = self.path(mode, version)
+        if os.path.exists(path):
+            model = joblib.load(path)
+        else:
+            model = train_model(mode, features, spec=spec)
+            self._save(model, path)
+        self._models[mode] = model
+        return model
+
+    def _save(self, model: WinnerModel, path: str) -> None:
+        os.makedirs(self.model_dir, exist_ok=True)
+        temp_path = f"{path}.tmp"
+        joblib.dump(model, temp_path)
+        os.replace(temp_path, path)
+        # Earlier versions of the same mode can never be loaded again
+        prefix = f"{self._slug(model.mode)}-"
+        for name in os.listdir(self.model_dir):
+            if name.startswith(prefix) and name.endswith('.joblib') and os.path.join(self.model_dir, name) != path:
+                os.remove(os.path.join(self.model_dir, name))
+
+    def predict_proba(self, mode: str, predict_data: pd.DataFrame) -> np.ndarray:
+        return self.get(mode).predict_proba(predict_data)
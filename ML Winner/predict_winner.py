@@ -1,93 +1,58 @@
-### THE FOLLLOWING TWO FUNCTIONS ARE FROM CDL_HELPER.PY IN THE ANALYSIS FOLDER
-### THEY SHOULD BE PLACED INTO A COMMON FILE THAT CAN BE ACCESSED IN BOTH DIRECTORIES IN THE FUTURE
+import os
+import sys
 
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
-from reformatter import reshape_match
-from sklearn.ensemble import RandomForestClassifier
+from feature_store import load_features
+from model_registry import MODEL_EVENTS, ModelRegistry
 
-def read_in_list(ids):
-    frames = []
-    for idd in ids:
-        frames.append(pd.read_csv(f'../data/cdl_{idd}.csv'))
-    return pd.concat(frames)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from cdl_common import loader
+from cdl_common.loader import read_in_list
 
-def read_in_all_matches() -> pd.DataFrame:
-    matchIDs = pd.read_json('../major_ids.json')
-
-    m1_qual = read_in_list(matchIDs['major1'][0])
-    m2_qual = read_in_list(matchIDs['major2'][0])
-    m2_event = read_in_list(matchIDs['major2'][1])
-    m3_qual = read_in_list(matchIDs['major3'][0])
-
-    m1_qual['event'] = ['M1Qual' for i in m1_qual[m1_qual.columns[0]]]
-    m2_qual['event'] = ['M2Qual' for i in m2_qual[m2_qual.columns[0]]]
-    m3_qual['event'] = ['M3Qual' for i in m3_qual[m3_qual.columns[0]]]
-    m2_event['event'] = ['M2Event' for i in m2_event[m2_event.columns[0]]]
-
-    m1_qual['setting'] = ['online' for i in m1_qual[m1_qual.columns[0]]]
-    m2_qual['setting'] = ['online' for i in m2_qual[m2_qual.columns[0]]]
-    m3_qual['setting'] = ['online' for i in m3_qual[m3_qual.columns[0]]]
-    m2_event['setting'] = ['lan' for i in m2_event[m2_event.columns[0]]]
-
-    complete_df = pd.concat([m1_qual, m2_event, m2_qual, m3_qual])
-
-    return complete_df
 
-############################################################################################################
+def read_in_all_matches() -> pd.DataFrame:
+    return loader.read_in_all_matches(event=MODEL_EVENTS)
 
-from sklearn.preprocessing import LabelEncoder
 
-label_encoder = LabelEncoder()
+registry = ModelRegistry()
 
 def reshape_all():
-    df = read_in_all_matches()
-    df = reshape_match(df)
-    return df
-
-def hardpoint_model(predict_data, team_map, sim_count=1):
-    dat = reshape_all()
-    hard = dat[dat['mode']=='CDL Hardpoint'].drop(['fbPerc_team1', 'fbPerc_team2'], axis=1)
-    hard.dropna(how='any', axis=0, inplace=True)
-    hard['winner'] = label_encoder.fit_transform(hard['winner'])
-    trainX = hard.drop(['winner', 'mode'], axis=1)
-    trainY = hard['winner']
-    simulations = []
-    for i in range(sim_count):
-        rf = RandomForestClassifier(max_depth=11, n_estimators=67)
-        rf.fit(trainX, trainY)
-        prediction = rf.predict(predict_data)
-        simulations.append(team_map[prediction[0]])
-    return simulations
-
-def control_model(predict_data, team_map, sim_count=1):
-    dat = reshape_all()
-    cnt = dat[dat['mode']=='CDL Control'].drop(['fbPerc_team1', 'fbPerc_team2', 'rotationalPercent_team1', 'rotationalPercent_team2'], axis=1)
-    cnt.dropna(how='any', axis=0, inplace=True)
-    cnt['winner'] = label_encoder.fit_transform(cnt['winner'])
-    trainX = cnt.drop(['winner', 'mode'], axis=1)
-    trainY = cnt['winner']
-    simulations = []
-    for i in range(sim_count):
-        rf = RandomForestClassifier(max_depth=4, n_estimators=306)
-        rf.fit(trainX, trainY)
-        prediction = rf.predict(predict_data)
-        simulations.append(team_map[prediction[0]])
-    return simulations
-
-def snd_model(predict_data, team_map, sim_count=1):
-    dat = reshape_all()
-    snd = dat[dat['mode']=='CDL SnD'].drop(['rotationalPercent_team1', 'rotationalPercent_team2'], axis=1)
-    snd.dropna(how='any', axis=0, inplace=True)
-    snd['winner'] = label_encoder.fit_transform(snd['winner'])
-    trainX = snd.drop(['winner', 'mode'], axis=1)
-    trainY = snd['winner']
-    simulations = []
-    for i in range(sim_count):
-        rf = RandomForestClassifier(max_depth=17, n_estimators=71)
-        rf.fit(trainX, trainY)
-        prediction = rf.predict(predict_data)
-        simulations.append(team_map[prediction[0]])
-    return simulations
-
+    return load_features(MODEL_EVENTS)
+
+def win_probabilities(mode, predict_data):
+    """
+    Desc: Calibrated chance of each side winning, from the mode's registered model
+    Params:
+        mode (str) - 'CDL Hardpoint', 'CDL Control' or 'CDL SnD'
+        predict_data (pandas df) - one row per matchup with the model's feature columns
+    returns:
+        probabilities (numpy array) - rows x 2, the chance team_map[0] wins then the chance team_map[1] wins
+    """
+    return registry.predict_proba(mode, predict_data)
+
+def simulate_winners(mode, predict_data, team_map, sim_count=1, seed=None):
+    """
+    Desc: Draws sim_count winners of the first matchup in predict_data from its win probabilities
+    Params:
+        mode (str)
+        predict_data (pandas df)
+        team_map (dict) - {0: team1, 1: team2}
+        sim_count (int)
+        seed (int) - makes the draws repeatable
+    returns:
+        simulations (list of str) - team names
+    """
+    team2_wins = win_probabilities(mode, predict_data)[0, 1]
+    draws = np.random.default_rng(seed).random(sim_count) < team2_wins
+    return [team_map[int(draw)] for draw in draws]
+
+def hardpoint_model(predict_data, team_map, sim_count=1, seed=None):
+    return simulate_winners('CDL Hardpoint', predict_data, team_map, sim_count, seed)
+
+def control_model(predict_data, team_map, sim_count=1, seed=None):
+    return simulate_winners('CDL Control', predict_data, team_map, sim_count, seed)
+
+def snd_model(predict_data, team_map, sim_count=1, seed=None):
+    return simulate_winners('CDL SnD', predict_data, team_map, sim_count, seed)
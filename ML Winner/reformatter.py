@@ -1,21 +1,31 @@
 """
 The goal of this code is to convert each match into overall statistics for each team, 
 and then combine these stats into one row with 'team1' and 'team2'. This should also contain the outcome of the match.
+Rows are indexed by matchGame.matchId.
 """
+import os
+import sys
+
 import pandas as pd
 import numpy as np
 
-def declare_winner(df: pd.DataFrame) -> pd.DataFrame:
-    df['map_winner'] = ["host" if a > b else "guest" for a, b in zip(df['matchGameResult.hostGameScore'], df['matchGameResult.guestGameScore'])]
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from cdl_common.features import match_features
 
-    df['is_winner'] = ["Y" if a == b else "N" for a, b in zip(df['map_winner'], df['team_type'])]
+TEAM_STATS = ['totalDamageDealt', 'teamKd', 'accuracy', 'rotationalPercent', 'fbPerc']
 
+def declare_winner(df: pd.DataFrame) -> pd.DataFrame:
+    df[['map_winner', 'is_winner']] = match_features(df, ['map_winner', 'is_winner'])
     return df
 
-def reshape_match(data): 
+def team_map_stats(data):
+    """
+    Each team's damage, K/D, accuracy, rotation-kill and first-blood rates on every map it played,
+    one row per team per map, with the map's updatedAt so rows can be put in order
+    """
     data = declare_winner(data)
     grouping = {a: 'sum' for a in ['totalDamageDealt', 'totalKills', 'totalDeaths', 'totalFirstBloodKills', 'totalRotationKills', 'totalShotsHit', 'totalShotsFired']}
-    grouping2 = {b: 'first' for b in ['team_type', 'matchGameResult.guestGameScore', 'matchGameResult.hostGameScore']}
+    grouping2 = {b: 'first' for b in ['team_type', 'matchGameResult.guestGameScore', 'matchGameResult.hostGameScore', 'matchGame.updatedAt']}
     full_group = {**grouping , **grouping2}
     group = data.groupby(['gameMap', 'oppo_abbrev', 'abbrev', 'gameMode', 'map_winner', 'matchGame.matchId']).agg(full_group)
 
@@ -27,7 +37,11 @@ def reshape_match(data):
 
     group.reset_index(inplace=True)
     group.drop(columns=['totalShotsHit', 'totalShotsFired', 'totalKills', 'totalDeaths', 'totalRotationKills', 'matchGameResult.hostGameScore', 
-                        'matchGameResult.guestGameScore', 'totalFirstBloodKills', 'matchGame.matchId'], inplace=True)
+                        'matchGameResult.guestGameScore', 'totalFirstBloodKills'], inplace=True)
+    return group
+
+def reshape_match(data): 
+    group = team_map_stats(data).drop(columns=['matchGame.updatedAt'])
 
     team1 = group[group['team_type']=='host'].copy()
     team1['host_abbrev'] = team1['abbrev']
@@ -42,12 +56,15 @@ def reshape_match(data):
     team1.rename(columns=t1, inplace=True)
     team2.rename(columns=t2, inplace=True)
 
-    merged = pd.merge(team1, team2, left_on=['host_abbrev_team1', 'guest_abbrev_team1', 'gameMap_team1', 'gameMode_team1'], 
-            right_on=['host_abbrev_team2', 'guest_abbrev_team2', 'gameMap_team2', 'gameMode_team2'], how='left')
+    # Matched within a series, so two teams meeting on the same map in different series are not crossed
+    merged = pd.merge(team1, team2, left_on=['matchGame.matchId_team1', 'host_abbrev_team1', 'guest_abbrev_team1', 'gameMap_team1', 'gameMode_team1'], 
+            right_on=['matchGame.matchId_team2', 'host_abbrev_team2', 'guest_abbrev_team2', 'gameMap_team2', 'gameMode_team2'], how='left')
+    merged = merged.set_index('matchGame.matchId_team1').rename_axis('matchGame.matchId')
 
     needed = merged.drop(columns=['gameMap_team1', 'gameMap_team2', 'rounds_team1', 'rounds_team2', 'gameMode_team1',
                                 'abbrev_team1', 'abbrev_team2', 'oppo_abbrev_team1', 'oppo_abbrev_team2',
-                                'host_abbrev_team1', 'host_abbrev_team2', 'guest_abbrev_team1', 'guest_abbrev_team2', 'map_winner_team2'])
+                                'host_abbrev_team1', 'host_abbrev_team2', 'guest_abbrev_team1', 'guest_abbrev_team2', 'map_winner_team2',
+                                'matchGame.matchId_team2'])
 
     needed.rename(columns={'map_winner_team1': 'winner',
                         'gameMode_team2': 'mode'}, inplace=True)
@@ -0,0 +1,231 @@
+"""
+Monte Carlo best-of-5 series and bracket simulation from per-mode map win probabilities.
+
+A series is played in the CDL mode order (SERIES_MODES). One game's chance comes from the
+mode's matrix of map win probabilities, P[i, j] being the chance team i beats team j on a
+map of that mode. Every game of every simulation is drawn at once as an array. The series
+goes to whoever takes three, since playing out the maps after it is decided does not change
+who took three first.
+
+A bracket is a list of BracketMatch, each naming where its two teams come from and the place
+its loser finishes in. simulate_bracket plays every match for all simulations together, in
+chunks. Each chunk has its own random stream spawned from one SeedSequence, so results are
+the same for a seed however many threads run the chunks.
+
+Simulate a major from the ML Winner folder, teams in seed order:
+    python simulator.py TX ATL NY FLA LAT BOS TOR SEA --sims 200000 --seed 1
+"""
+import argparse
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, NamedTuple, Optional
+
+import numpy as np
+import pandas as pd
+
+from model_registry import MODE_SPECS
+
+# CDL best-of-5 mode order
+SERIES_MODES = ['CDL Hardpoint', 'CDL SnD', 'CDL Control', 'CDL Hardpoint', 'CDL SnD']
+CHUNK = 50_000
+
+
+class BracketMatch(NamedTuple):
+    name: str
+    # 'seed:N' (1-based), 'W:match' or 'L:match'
+    team1: str
+    team2: str
+    # Place the loser finishes in, None if they drop to another match
+    loser_place: Optional[int] = None
+
+
+# An 8-team double-elimination major without a grand final reset; the last match decides 1st and 2nd
+DOUBLE_ELIMINATION_8 = [
+    BracketMatch('wb1', 'seed:1', 'seed:8'),
+    BracketMatch('wb2', 'seed:4', 'seed:5'),
+    BracketMatch('wb3', 'seed:2', 'seed:7'),
+    BracketMatch('wb4', 'seed:3', 'seed:6'),
+    BracketMatch('wb_semi1', 'W:wb1', 'W:wb2'),
+    BracketMatch('wb_semi2', 'W:wb3', 'W:wb4'),
+    BracketMatch('wb_final', 'W:wb_semi1', 'W:wb_semi2'),
+    BracketMatch('lb1', 'L:wb1', 'L:wb2', loser_place=7),
+    BracketMatch('lb2', 'L:wb3', 'L:wb4', loser_place=7),
+    # Losers of the winners semis cross over so rematches are delayed
+    BracketMatch('lb3', 'W:lb1', 'L:wb_semi2', loser_place=5),
+    BracketMatch('lb4', 'W:lb2', 'L:wb_semi1', loser_place=5),
+    BracketMatch('lb_semi', 'W:lb3', 'W:lb4', loser_place=4),
+    BracketMatch('lb_final', 'L:wb_final', 'W:lb_semi', loser_place=3),
+    BracketMatch('grand_final', 'W:wb_final', 'W:lb_final', loser_place=2),
+]
+
+
+def series_matrix(matrices: Dict[str, np.ndarray]) -> np.ndarray:
+    """
+    Stacks the per-mode matrices in SERIES_MODES order, games x teams x teams, raising ValueError on
+    a NaN or infinite chance, which would otherwise lose every map it is drawn for
+    """
+    games = np.stack([matrices[mode] for mode in SERIES_MODES])
+    if not np.isfinite(games).all():
+        raise ValueError("map win probabilities must be finite, fill pairs the models could not score first")
+    return games
+
+
+def play_series(games: np.ndarray, team1: np.ndarray, team2: np.ndarray, rng: np.random.Generator) -> np.ndarray:
+    """
+    Desc: Plays one best-of-5 between team1[k] and team2[k] for every simulation k
+    Params:
+        games (numpy array) - series_matrix() of map win probabilities
+        team1, team2 (numpy arrays of int) - team indexes, one per simulation
+        rng (numpy Generator)
+    returns:
+        maps_won (numpy array) - games x simulations, True where team1 took the map
+    """
+    return rng.random((len(SERIES_MODES), len(team1))) < games[:, team1, team2]
+
+
+def series_odds(p_team1: Dict[str, float], n_sims: int = 100_000, seed: Optional[int] = None,
+                missing: float = 0.5) -> pd.Series:
+    """
+    Desc: The scoreline distribution of one best-of-5
+    Params:
+        p_team1 (dict) - mode to the chance team1 wins a map of it, e.g. from predict_matchups
+        n_sims (int)
+        seed (int)
+        missing (float) - chance used for modes the models could not score (NaN), as in mode_matrices
+    returns:
+        odds (pandas series) - chance of each scoreline from team1's side ('3-0' ... '0-3') and of 'team1' winning
+    """
+    p_team1 = {mode: missing if pd.isna(p) else p for mode, p in p_team1.items()}
+    games = series_matrix({mode: np.array([[0.5, p], [1 - p, 0.5]]) for mode, p in p_team1.items()})
+    won = play_series(games, np.zeros(n_sims, dtype='int64'), np.ones(n_sims, dtype='int64'), np.random.default_rng(seed))
+    # The series ends when either side reaches three, so count maps up to that point
+    team1_maps = np.cumsum(won, axis=0)
+    team2_maps = np.cumsum(~won, axis=0)
+    decided = np.argmax((team1_maps == 3) | (team2_maps == 3), axis=0)
+    columns = np.arange(n_sims)
+    scores = pd.Series([f"{a}-{b}" for a, b in zip(team1_maps[decided, columns], team2_maps[decided, columns])])
+    order = ['3-0', '3-1', '3-2', '2-3', '1-3', '0-3']
+    odds = scores.value_counts(normalize=True).reindex(order, fill_value=0.0)
+    odds['team1'] = odds[['3-0', '3-1', '3-2']].sum()
+    return odds
+
+
+def _simulate_chunk(games: np.ndarray, bracket: List[BracketMatch], n_teams: int, n_sims: int,
+                    seed: np.random.SeedSequence) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    places = np.zeros((n_sims, n_teams), dtype='int8')
+    rows = np.arange(n_sims)
+    winners: Dict[str, np.ndarray] = {}
+    losers: Dict[str, np.ndarray] = {}
+
+    def source(slot: str) -> np.ndarray:
+        kind, name = slot.split(':')
+        if kind == 'seed':
+            return np.full(n_sims, int(name) - 1)
+        return winners[name] if kind == 'W' else losers[name]
+
+    for match in bracket:
+        team1, team2 = source(match.team1), source(match.team2)
+        team1_won = play_series(games, team1, team2, rng).sum(axis=0) >= 3
+        winners[match.name] = np.where(team1_won, team1, team2)
+        losers[match.name] = np.where(team1_won, team2, team1)
+        if match.loser_place is not None:
+            places[rows, losers[match.name]] = match.loser_place
+    places[rows, winners[bracket[-1].name]] = 1
+    return places
+
+
+def simulate_bracket(teams: List[str], matrices: Dict[str, np.ndarray], bracket: List[BracketMatch] = DOUBLE_ELIMINATION_8,
+                     n_sims: int = 200_000, seed: Optional[int] = None, max_workers: Optional[int] = None) -> np.ndarray:
+    """
+    Desc: Plays the bracket n_sims times
+    Params:
+        teams (list of str) - in seed order
+        matrices (dict) - mode to a teams x teams matrix of map win probabilities, e.g. from mode_matrices
+        bracket (list of BracketMatch) - in playing order, the last match is the final
+        n_sims (int)
+        seed (int) - the same seed gives the same placements for any max_workers
+        max_workers (int) - threads to play the chunks on, defaults to the number of cores
+    returns:
+        places (numpy array) - n_sims x teams, the place each team finished in
+    """
+    games = series_matrix(matrices)
+    sizes = [min(CHUNK, n_sims - start) for start in range(0, n_sims, CHUNK)]
+    streams = np.random.SeedSequence(seed).spawn(len(sizes))
+    with ThreadPoolExecutor(max_workers=max_workers or os.cpu_count() or 1) as pool:
+        chunks = pool.map(lambda args: _simulate_chunk(games, bracket, len(teams), *args), zip(sizes, streams))
+        return np.concatenate(list(chunks))
+
+
+def placement_table(teams: List[str], places: np.ndarray) -> pd.DataFrame:
+    """
+    Desc: Each team's chance of finishing in each place, best expected finish first
+    Params:
+        teams (list of str)
+        places (numpy array) - from simulate_bracket
+    returns:
+        table (pandas df) - one row per team, one column per place ('1', '2', '5-6', ...) and 'expected'
+    """
+    shared = pd.Series(places[0]).value_counts().sort_index()
+    labels = {place: str(place) if count == 1 else f"{place}-{place + count - 1}" for place, count in shared.items()}
+    table = pd.DataFrame({labels[place]: (places == place).mean(axis=0) for place in shared.index}, index=teams)
+    # A shared place counts as its middle, e.g. 5-6 as 5.5
+    table['expected'] = sum(table[labels[place]] * (place + (count - 1) / 2) for place, count in shared.items())
+    return table.sort_values('expected')
+
+
+def mode_matrices(predictions: pd.DataFrame, teams: List[str], missing: float = 0.5) -> Dict[str, np.ndarray]:
+    """
+    Desc: Per-mode matrices of map win probabilities from a predict_matchups table
+    Params:
+        predictions (pandas df) - 'team1', 'team2', 'mode' and 'p_team1', one row per pair and mode
+        teams (list of str) - the matrix order
+        missing (float) - chance used for pairs the models could not score
+    """
+    position = {team: number for number, team in enumerate(teams)}
+    matrices = {}
+    for mode in MODE_SPECS:
+        matrix = np.full((len(teams), len(teams)), missing)
+        rows = predictions[(predictions['mode'] == mode) & predictions['team1'].isin(position) & predictions['team2'].isin(position)]
+        first = rows['team1'].map(position).to_numpy()
+        second = rows['team2'].map(position).to_numpy()
+        chance = rows['p_team1'].fillna(missing).to_numpy()
+        matrix[first, second] = chance
+        matrix[second, first] = 1 - chance
+        matrices[mode] = matrix
+    return matrices
+
+
+def bracket_odds(teams: List[str], n_sims: int = 200_000, seed: Optional[int] = None,
+                 bracket: List[BracketMatch] = DOUBLE_ELIMINATION_8,
+                 predictions: Optional[pd.DataFrame] = None) -> pd.DataFrame:
+    """
+    Desc: Placement odds of a bracket with map probabilities from the registered models
+    Params:
+        teams (list of str) - in seed order
+        n_sims (int)
+        seed (int)
+        bracket (list of BracketMatch)
+        predictions (pandas df) - mode-level predict_matchups output covering the teams, predicted if not given
+    """
+    if predictions is None:
+        from batch_predict import all_pairings, predict_matchups
+        predictions = predict_matchups(all_pairings(teams))
+    return placement_table(teams, simulate_bracket(teams, mode_matrices(predictions, teams), bracket, n_sims, seed))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Simulate an 8-team double-elimination major")
+    parser.add_argument('teams', nargs=8, help="team abbreviations in seed order")
+    parser.add_argument('--sims', type=int, default=200_000)
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args()
+
+    from batch_predict import all_pairings, predict_matchups
+    predictions = predict_matchups(all_pairings(args.teams))
+    start = time.perf_counter()
+    table = bracket_odds(args.teams, args.sims, args.seed, predictions=predictions)
+    elapsed = time.perf_counter() - start
+    print(table.round(3).to_string())
+    print(f"{args.sims} brackets in {elapsed:.2f}s")
@@ -0,0 +1,209 @@
+"""
+Cross-validated search over each mode's forest settings within a wall-clock budget.
+
+For each mode, the training rows are split into FOLDS folds by match with GroupKFold, so no
+match has maps on both sides of a split. The folds are built once per training data version
+and handed to every worker process once, when the pool starts. Each task scores one
+(max_depth, n_estimators) candidate over all folds, each fold fitting the same calibrated
+forest the registry serves (model_registry.build_model). The registry's current settings go
+first, and are scored however small the budget, and the rest are drawn at random from the
+search space. Each worker holds one candidate at a time and none are started once the budget
+runs out, so a search overruns by at most one candidate. The best candidate per mode is written
+to the model registry, which retrains that mode's model on its next use, unless the registry
+already holds a better score for the same scorer.
+
+Tune every mode for five minutes, from the ML Winner folder:
+    python tuning.py --budget 300
+"""
+import argparse
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from sklearn.metrics import get_scorer
+from sklearn.model_selection import GroupKFold
+
+from feature_store import load_features
+from model_registry import MODE_SPECS, ModeSpec, ModelRegistry, build_model, data_version, training_data
+
+FOLDS = 5
+SCORING = 'neg_log_loss'
+MAX_DEPTHS = range(2, 25)
+N_ESTIMATORS = range(25, 401)
+
+Folds = List[Tuple[np.ndarray, np.ndarray]]
+_fold_cache: Dict[Tuple[str, int], Folds] = {}
+# Set in each worker process by _start_worker
+_worker_data: Optional[Tuple[pd.DataFrame, pd.Series, Folds, str]] = None
+
+
+@dataclass
+class TuningResult:
+    """
+    Desc: The outcome of one mode's search
+    Params:
+        mode (str)
+        best (ModeSpec) - the best scoring settings
+        score (float) - its mean score over the folds, higher is better
+        trials (pandas df) - max_depth, n_estimators, score and seconds of every candidate scored
+        seconds (float) - wall-clock time of the search
+        current (ModeSpec) - the settings the search started from
+        saved (bool) - True if tune wrote best to the registry
+    """
+    mode: str
+    best: ModeSpec
+    score: float
+    trials: pd.DataFrame = field(repr=False)
+    seconds: float
+    current: ModeSpec
+    saved: bool = False
+
+
+def match_folds(mode: str, trainX: pd.DataFrame, trainY: pd.Series, n_splits: int = FOLDS) -> Folds:
+    """
+    Desc: Train and test row positions of each fold, with every map of a match in the same fold.
+          Cached per training data version
+    Params:
+        mode (str)
+        trainX, trainY - from training_data, indexed by matchGame.matchId
+        n_splits (int)
+    """
+    key = (data_version(mode, trainX, trainY), n_splits)
+    if key not in _fold_cache:
+        splitter = GroupKFold(n_splits=n_splits)
+        _fold_cache[key] = list(splitter.split(trainX, trainY, groups=trainX.index.to_numpy()))
+    return _fold_cache[key]
+
+
+def _start_worker(trainX: pd.DataFrame, trainY: pd.Series, folds: Folds, scoring: str) -> None:
+    global _worker_data
+    _worker_data = (trainX, trainY, folds, scoring)
+
+
+def _score_candidate(max_depth: int, n_estimators: int, random_state: int) -> Tuple[float, float]:
+    trainX, trainY, folds, scoring = _worker_data
+    scorer = get_scorer(scoring)
+    spec = ModeSpec([], max_depth, n_estimators)
+    start = time.perf_counter()
+    scores = []
+    for train, test in folds:
+        model = build_model(spec, n_jobs=1, random_state=random_state)
+        model.fit(trainX.iloc[train], trainY.iloc[train])
+        scores.append(scorer(model, trainX.iloc[test], trainY.iloc[test]))
+    return float(np.mean(scores)), time.perf_counter() - start
+
+
+def candidates(current: ModeSpec, rng: np.random.Generator):
+    """
+    Yields (max_depth, n_estimators) pairs, the current settings first, then random unseen ones
+    """
+    seen = set()
+    current = (current.max_depth, current.n_estimators)
+    while len(seen) < len(MAX_DEPTHS) * len(N_ESTIMATORS):
+        pair = current if not seen else (int(rng.choice(MAX_DEPTHS)), int(rng.choice(N_ESTIMATORS)))
+        if pair not in seen:
+            seen.add(pair)
+            yield pair
+
+
+def tune_mode(mode: str, features: pd.DataFrame, budget: float, max_workers: Optional[int] = None,
+              scoring: str = SCORING, seed: Optional[int] = 0, current: Optional[ModeSpec] = None) -> TuningResult:
+    """
+    Desc: Scores candidate settings for one mode across a process pool until the budget runs out
+    Params:
+        mode (str) - a key of MODE_SPECS
+        features (pandas df) - e.g. load_features(MODEL_EVENTS)
+        budget (float) - seconds after which no more candidates are started, the current settings are always scored
+        max_workers (int) - processes, defaults to the number of cores
+        scoring (str) - a scikit-learn scorer name, higher is better
+        seed (int) - seed of the candidate draws and of every forest
+        current (ModeSpec) - the settings to start from, defaults to MODE_SPECS[mode]
+    """
+    if budget <= 0:
+        raise ValueError(f"budget must be positive, got {budget}")
+    current = MODE_SPECS[mode] if current is None else current
+    trainX, trainY = training_data(mode, features)
+    folds = match_folds(mode, trainX, trainY)
+    max_workers = max_workers or os.cpu_count() or 1
+    pending = candidates(current, np.random.default_rng(seed))
+    trials = []
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers, initializer=_start_worker, initargs=(trainX, trainY, folds, scoring)) as pool:
+        running = {}
+
+        def submit() -> None:
+            # One candidate per worker, so at most one per worker runs past the budget. The first,
+            # the current settings, is always started so there is a score to compare against
+            while len(running) < max_workers and (not trials and not running or time.perf_counter() - start < budget):
+                pair = next(pending, None)
+                if pair is None:
+                    return
+                running[pool.submit(_score_candidate, *pair, seed)] = pair
+
+        submit()
+        while running:
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                max_depth, n_estimators = running.pop(future)
+                score, seconds = future.result()
+                trials.append({'max_depth': max_depth, 'n_estimators': n_estimators, 'score': score, 'seconds': seconds})
+            submit()
+
+    trials = pd.DataFrame(trials).sort_values('score', ascending=False, ignore_index=True)
+    best = current._replace(max_depth=int(trials.loc[0, 'max_depth']), n_estimators=int(trials.loc[0, 'n_estimators']))
+    return TuningResult(mode, best, float(trials.loc[0, 'score']), trials, time.perf_counter() - start, current)
+
+
+def tune(modes: Optional[List[str]] = None, budget: float = 300, max_workers: Optional[int] = None,
+         scoring: str = SCORING, registry: Optional[ModelRegistry] = None, seed: Optional[int] = 0) -> Dict[str, TuningResult]:
+    """
+    Desc: Tunes each mode on an equal share of the budget, starting from the registry's settings, and writes
+          the best to the registry unless it already holds a better score for the same scoring
+    Params:
+        modes (list of str) - defaults to every mode in MODE_SPECS
+        budget (float) - seconds for all modes together
+        max_workers (int)
+        scoring (str)
+        registry (ModelRegistry) - defaults to a registry over data/ml_models/
+        seed (int)
+    returns:
+        results (dict) - mode to its TuningResult
+    """
+    modes = list(MODE_SPECS) if modes is None else modes
+    if not modes or budget <= 0:
+        raise ValueError(f"need at least one mode and a positive budget, got {modes} and {budget}")
+    registry = ModelRegistry() if registry is None else registry
+    features = load_features(registry.events)
+    results = {}
+    for mode in modes:
+        result = tune_mode(mode, features, budget / len(modes), max_workers, scoring, seed, registry.spec(mode))
+        stored = registry.tuned().get(mode, {})
+        if stored.get('scoring') != scoring or stored.get('score') is None or result.score > stored['score']:
+            registry.set_spec(mode, result.best, score=result.score, scoring=scoring, trials=len(result.trials))
+            result.saved = True
+        results[mode] = result
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Tune the winner models' forest settings")
+    parser.add_argument('--budget', type=float, default=300, help="seconds for all modes together")
+    parser.add_argument('--modes', nargs='*', choices=list(MODE_SPECS))
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--scoring', default=SCORING)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    results = tune(args.modes, args.budget, args.workers, args.scoring, seed=args.seed)
+    for mode, result in results.items():
+        current = result.current
+        baseline = result.trials[(result.trials['max_depth'] == current.max_depth)
+                                 & (result.trials['n_estimators'] == current.n_estimators)]['score']
+        print(f"{mode}: {len(result.trials)} candidates in {result.seconds:.0f}s, "
+              f"max_depth={result.best.max_depth} n_estimators={result.best.n_estimators} {args.scoring}={result.score:.4f} "
+              f"(was {current.max_depth}/{current.n_estimators} at {baseline.iloc[0]:.4f}), "
+              f"{'saved' if result.saved else 'kept the better stored settings'}")
@@ -0,0 +1,61 @@
+"""
+Renders a batch of figures described in a JSON spec file to image files, across a process pool.
+
+Each spec names one of PLOTS, the keyword arguments to call it with and the rows to draw from, e.g.
+    {"name": "tx_kd_vs_bos", "plot": "head_to_head",
+     "kwargs": {"main": "TX", "opposition": "BOS", "compare": "kd", "title": "OpTic K/D vs Boston"},
+     "filters": {"gamemode": "CDL Hardpoint"}}
+
+Run from the analysis folder:
+    python render_figures.py event_figures.json --out figures --workers 4
+"""
+import argparse
+import os
+import sys
+import time
+
+import matplotlib
+import matplotlib.pyplot as plt
+
+from cdl_helper import compare_stats, head_to_head
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Archive', 'Analaysis'))
+import analysis_utils
+from cdl_common.render import print_render_report, read_specs, render_figures
+from cdl_common.render_cache import RENDER_CACHE_DIR
+
+
+def plot_head_to_head(df, size=(8, 6), **kwargs):
+    fig, axes = plt.subplots(figsize=size)
+    head_to_head(df, axes=axes, **kwargs)
+    return fig
+
+
+PLOTS = {'compare_stats': compare_stats,
+         'head_to_head': plot_head_to_head,
+         'cdl_movement': analysis_utils.cdl_movement,
+         'cdl_damage_accuracy': analysis_utils.cdl_damage_accuracy,
+         'cdl_kd_hill': analysis_utils.cdl_kd_hill,
+         'cdl_rot_kills': analysis_utils.cdl_rot_kills,
+         'cdl_fb_perc': analysis_utils.cdl_fb_perc,
+         'cdl_fair_fights': analysis_utils.cdl_fair_fights,
+         'cdl_untraded_kill_traded_deaths': analysis_utils.cdl_untraded_kill_traded_deaths}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Render a batch of figures to image files")
+    parser.add_argument('spec', help="JSON file listing the figures")
+    parser.add_argument('--out', default='figures', help="directory to write the images to")
+    parser.add_argument('--workers', type=int, default=None, help="processes to render with, defaults to the number of cores")
+    parser.add_argument('--format', default='png')
+    parser.add_argument('--dpi', type=int, default=100)
+    parser.add_argument('--no-cache', action='store_true', help="draw every figure even if an identical one was rendered before")
+    args = parser.parse_args()
+
+    # Only when run as a script, importing PLOTS into a notebook keeps its backend
+    matplotlib.use('Agg')
+    start = time.perf_counter()
+    results = render_figures(read_specs(args.spec), PLOTS, out_dir=args.out, max_workers=args.workers,
+                             fmt=args.format, dpi=args.dpi, cache_dir=None if args.no_cache else RENDER_CACHE_DIR)
+    print_render_report(results, time.perf_counter() - start)
+    sys.exit(1 if any(result.status == 'failed' for result in results) else 0)
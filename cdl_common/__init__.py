@@ -0,0 +1,3 @@
+"""
+Code shared between the analysis, Clustering, ML Winner and images folders.
+"""
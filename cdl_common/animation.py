@@ -0,0 +1,334 @@
+"""
+Season-progression animations drawn from precomputed frames, with blitting and background encoding.
+
+season_frames works out every frame's values in one pass, as a frames x players (or teams)
+array of season-to-date stats. Animators build their bars, labels and lines once. Each
+frame then only moves those artists, so FuncAnimation can blit them over a fixed
+background. save_animation draws the same way off screen, copying the static background
+back in place of a full redraw. It hands each frame's pixels to a background thread that
+encodes the GIF or video while the next frame is drawn.
+"""
+import queue
+import shutil
+import subprocess
+import threading
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from cdl_common.features import match_features, safe_divide
+from cdl_common.rollups import RATIOS, Ratio
+
+TIME_COLUMN = 'matchGame.updatedAt'
+LABEL_COLUMNS = {'player': 'alias', 'team': 'abbrev'}
+
+
+@dataclass
+class AnimationFrames:
+    """
+    Every frame's values, worked out before anything is drawn
+    """
+    stat: str
+    labels: List[str]
+    times: pd.DatetimeIndex
+    # frames x labels, NaN until a label has played min_maps
+    values: np.ndarray
+    teams: List[str]
+
+    def __len__(self) -> int:
+        return len(self.times)
+
+
+def season_frames(df: pd.DataFrame, stat: str = 'kd', by: str = 'team', frames: Optional[int] = None,
+                  min_maps: int = 1, tween: int = 1, time_column: str = TIME_COLUMN) -> AnimationFrames:
+    """
+    Desc: The season-to-date value of stat for every player or team after each map
+    Params:
+        df (pandas df) - player-map rows, e.g. read_in_all_matches()
+        stat (str) - a name from rollups.RATIOS (e.g. 'kd', 'accuracy') or any summable column, averaged per player-map
+        by (str) - 'player' or 'team'
+        frames (int) - evenly spaced frames to keep, defaults to one per distinct time
+        min_maps (int) - maps a player or team must have played before they appear
+        tween (int) - frames to draw per step, interpolated linearly so bars slide between steps
+        time_column (str) - epoch seconds the maps are ordered by
+    returns:
+        frames (AnimationFrames)
+    """
+    if by not in LABEL_COLUMNS:
+        raise ValueError(f"by must be one of {list(LABEL_COLUMNS)}")
+    label = LABEL_COLUMNS[by]
+    numerator, denominator, scale = RATIOS.get(stat, Ratio(stat, 'maps'))
+    df = df.assign(maps=1)
+    if 'map_wins' in (numerator, denominator):
+        df['map_wins'] = (match_features(df, ['is_winner'])['is_winner'] == 'Y').astype('int64')
+
+    grouped = df.groupby([time_column, label], observed=True)
+    totals = grouped[[numerator, denominator]].sum().unstack(label, fill_value=0).sort_index().cumsum()
+    # Each time is one map, so a label's maps played is the number of times it has rows at
+    played = (grouped.size().unstack(label, fill_value=0).sort_index() > 0).cumsum().to_numpy()
+    values = safe_divide(totals[numerator].to_numpy(dtype='float64'),
+                         totals[denominator].to_numpy(dtype='float64'), fill=np.nan) * scale
+    values[played < min_maps] = np.nan
+
+    times = pd.to_datetime(totals.index.to_numpy(), unit='s')
+    if frames and frames < len(times):
+        keep = np.unique(np.linspace(0, len(times) - 1, frames).round().astype('int64'))
+        values, times = values[keep], times[keep]
+    if tween > 1 and len(times) > 1:
+        values, times = _tween(values, times, tween)
+
+    labels = list(totals[numerator].columns)
+    team_of = df.groupby(label, observed=True)['abbrev'].last()
+    return AnimationFrames(stat, labels, times, values, [team_of[name] for name in labels])
+
+
+def _tween(values: np.ndarray, times: pd.DatetimeIndex, tween: int):
+    # Linear steps between consecutive frames. Values that first appear snap in rather than sliding from NaN
+    weights = np.arange(tween) / tween
+    start, end = values[:-1], values[1:]
+    start = np.where(np.isnan(start), end, start)
+    steps = start[:, None, :] + (end - start)[:, None, :] * weights[None, :, None]
+    steps = np.concatenate([steps.reshape(-1, values.shape[1]), values[-1:]])
+    stamps = times.to_numpy().astype('datetime64[ns]').astype('int64')
+    stamp_steps = stamps[:-1, None] + ((stamps[1:] - stamps[:-1])[:, None] * weights[None, :]).astype('int64')
+    return steps, pd.to_datetime(np.append(stamp_steps.ravel(), stamps[-1]), unit='ns')
+
+
+class _Race(ABC):
+    """
+    Shared by the animators: subclasses set fig, frames and artists, and move the artists in update(frame)
+    """
+    fig = None
+    frames: AnimationFrames
+    artists: list
+
+    @abstractmethod
+    def update(self, frame: int) -> list:
+        """
+        Moves the artists to frame and returns the ones that changed
+        """
+
+    def animate(self, interval: int = 100, repeat: bool = False):
+        """
+        A blitted FuncAnimation for notebooks and windows, e.g. HTML(race.animate().to_jshtml())
+        """
+        from matplotlib.animation import FuncAnimation
+
+        return FuncAnimation(self.fig, self.update, frames=len(self.frames), init_func=lambda: self.artists,
+                             interval=interval, blit=True, repeat=repeat)
+
+
+class BarRace(_Race):
+    """
+    Desc: A horizontal bar chart of the top players or teams, re-ranked every frame
+    Params:
+        frames (AnimationFrames)
+        top (int) - bars to show
+        ax (matplotlib axes) - defaults to a new figure
+        palette (dict) - team abbreviation to colour, e.g. CDL_PALETTE
+        title (str)
+        date_format (str) - strftime format of the frame's date label
+    """
+    def __init__(self, frames: AnimationFrames, top: int = 10, ax=None, palette: Optional[Dict[str, str]] = None,
+                 title: Optional[str] = None, date_format: str = '%d %b %Y') -> None:
+        import matplotlib.pyplot as plt
+
+        self.frames = frames
+        self.top = min(top, len(frames.labels))
+        self.date_format = date_format
+        if ax is None:
+            _, ax = plt.subplots(figsize=(10, 0.5 * self.top + 1.5))
+        self.ax = ax
+        self.fig = ax.figure
+
+        # Fixed limits so the background never changes between frames
+        finite = frames.values[np.isfinite(frames.values)]
+        ax.set_xlim(0, finite.max() * 1.1 if len(finite) else 1)
+        ax.set_ylim(-0.6, self.top - 0.4)
+        ax.invert_yaxis()
+        ax.set_yticks([])
+        ax.set_xlabel(frames.stat)
+        ax.set_title(title or f"{frames.stat} through the season")
+
+        palette = palette or {}
+        self.colors = [palette.get(team, 'grey') for team in frames.teams]
+        self.bars = ax.barh(range(self.top), np.zeros(self.top), animated=True)
+        self.names = [ax.text(0, rank, '', ha='right', va='center', animated=True) for rank in range(self.top)]
+        self.scores = [ax.text(0, rank, '', ha='left', va='center', animated=True) for rank in range(self.top)]
+        self.date = ax.text(0.98, 0.04, '', transform=ax.transAxes, ha='right', fontsize=16, alpha=0.6, animated=True)
+
+    @property
+    def artists(self) -> list:
+        return list(self.bars) + self.names + self.scores + [self.date]
+
+    def update(self, frame: int) -> list:
+        """
+        Moves the artists to frame and returns them
+        """
+        values = self.frames.values[frame]
+        ranked = np.argsort(np.where(np.isnan(values), np.inf, -values), kind='stable')[:self.top]
+        pad = self.ax.get_xlim()[1] * 0.01
+        for rank in range(self.top):
+            index = ranked[rank]
+            value = values[index]
+            shown = not np.isnan(value)
+            width = value if shown else 0
+            self.bars[rank].set_width(width)
+            self.bars[rank].set_color(self.colors[index])
+            self.names[rank].set_text(self.frames.labels[index] if shown else '')
+            self.names[rank].set_x(width - pad)
+            self.scores[rank].set_text(f"{value:.2f}" if shown else '')
+            self.scores[rank].set_x(width + pad)
+        self.date.set_text(self.frames.times[frame].strftime(self.date_format))
+        return self.artists
+
+
+class LineRace(_Race):
+    """
+    Desc: One line per player or team, drawn further along every frame
+    Params:
+        frames (AnimationFrames)
+        labels (list of str) - which lines to draw, defaults to all
+        ax (matplotlib axes) - defaults to a new figure
+        palette (dict) - team abbreviation to colour, e.g. CDL_PALETTE
+        title (str)
+        date_format (str) - strftime format of the frame's date label
+    """
+    def __init__(self, frames: AnimationFrames, labels: Optional[List[str]] = None, ax=None,
+                 palette: Optional[Dict[str, str]] = None, title: Optional[str] = None,
+                 date_format: str = '%d %b %Y') -> None:
+        import matplotlib.pyplot as plt
+
+        self.frames = frames
+        self.date_format = date_format
+        self.columns = [frames.labels.index(name) for name in labels] if labels else list(range(len(frames.labels)))
+        if ax is None:
+            _, ax = plt.subplots(figsize=(10, 6))
+        self.ax = ax
+        self.fig = ax.figure
+
+        values = frames.values[:, self.columns]
+        finite = values[np.isfinite(values)]
+        low, high = (finite.min(), finite.max()) if len(finite) else (0, 1)
+        margin = (high - low) * 0.05 or 0.1
+        ax.set_xlim(0, len(frames) - 1)
+        ax.set_ylim(low - margin, high + margin)
+        ax.set_xlabel('frame')
+        ax.set_ylabel(frames.stat)
+        ax.set_title(title or f"{frames.stat} through the season")
+
+        palette = palette or {}
+        self.x = np.arange(len(frames))
+        self.lines = [ax.plot([], [], color=palette.get(frames.teams[column]), label=frames.labels[column],
+                              animated=True)[0] for column in self.columns]
+        if len(self.lines) <= 12:
+            ax.legend(handles=self.lines, loc='upper left', fontsize='small')
+        self.date = ax.text(0.98, 0.04, '', transform=ax.transAxes, ha='right', fontsize=16, alpha=0.6, animated=True)
+
+    @property
+    def artists(self) -> list:
+        return self.lines + [self.date]
+
+    def update(self, frame: int) -> list:
+        """
+        Extends the lines to frame and returns them
+        """
+        for line, column in zip(self.lines, self.columns):
+            line.set_data(self.x[:frame + 1], self.frames.values[:frame + 1, column])
+        self.date.set_text(self.frames.times[frame].strftime(self.date_format))
+        return self.artists
+
+
+class _Encoder(threading.Thread):
+    """
+    Encodes RGBA frames taken from a bounded queue, to a GIF with Pillow or anything else through ffmpeg
+    """
+    def __init__(self, path: str, size: tuple, fps: int, backlog: int = 8) -> None:
+        super().__init__(daemon=True)
+        self.path = path
+        self.size = size
+        self.fps = fps
+        self.frames: queue.Queue = queue.Queue(maxsize=backlog)
+        self.error: Optional[BaseException] = None
+        self.gif = path.lower().endswith('.gif')
+        self.process = None
+        if not self.gif:
+            ffmpeg = shutil.which('ffmpeg')
+            if ffmpeg is None:
+                raise RuntimeError(f"ffmpeg is needed to write {path}, save to a .gif instead")
+            width, height = size
+            self.process = subprocess.Popen(
+                [ffmpeg, '-y', '-loglevel', 'error', '-f', 'rawvideo', '-pix_fmt', 'rgba', '-s', f"{width}x{height}",
+                 '-r', str(fps), '-i', '-', '-pix_fmt', 'yuv420p', '-vf', 'pad=ceil(iw/2)*2:ceil(ih/2)*2', path],
+                stdin=subprocess.PIPE)
+
+    def run(self) -> None:
+        from PIL import Image
+
+        # Pillow 9.1 moved the quantize methods into the Image.Quantize enum, older versions only have the constants
+        fast_octree = Image.Quantize.FASTOCTREE if hasattr(Image, 'Quantize') else Image.FASTOCTREE
+        images = []
+        try:
+            while True:
+                pixels = self.frames.get()
+                if pixels is None:
+                    break
+                if self.gif:
+                    # Palette images hold one byte a pixel, a quarter of the RGBA frames
+                    images.append(Image.fromarray(pixels[..., :3]).quantize(method=fast_octree))
+                else:
+                    self.process.stdin.write(pixels.tobytes())
+            if self.gif and images:
+                images[0].save(self.path, save_all=True, append_images=images[1:],
+                               duration=round(1000 / self.fps), loop=0, optimize=False)
+        except BaseException as error:
+            self.error = error
+            # Keep draining so the drawing thread never blocks on a full queue
+            while self.frames.get() is not None:
+                pass
+        finally:
+            if self.process is not None:
+                self.process.stdin.close()
+                self.process.wait()
+
+
+def save_animation(animator, path: str, fps: int = 10, dpi: int = 100) -> int:
+    """
+    Desc: Draws every frame of a BarRace or LineRace off screen and encodes them to path in a background thread
+    Params:
+        animator (BarRace or LineRace)
+        path (str) - a .gif is written with Pillow, other extensions (e.g. .mp4) with ffmpeg
+        fps (int)
+        dpi (int)
+    returns:
+        frames (int) - frames written
+    """
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+    fig = animator.fig
+    fig.set_dpi(dpi)
+    canvas = FigureCanvasAgg(fig)
+    # Animated artists are left out of a full draw, so this is the background every frame shares
+    canvas.draw()
+    background = canvas.copy_from_bbox(fig.bbox)
+    width, height = canvas.get_width_height()
+
+    encoder = _Encoder(path, (width, height), fps)
+    encoder.start()
+    try:
+        for frame in range(len(animator.frames)):
+            if encoder.error is not None:
+                break
+            canvas.restore_region(background)
+            for artist in animator.update(frame):
+                fig.draw_artist(artist)
+            encoder.frames.put(np.array(canvas.buffer_rgba()))
+    finally:
+        encoder.frames.put(None)
+        encoder.join()
+    if encoder.error is not None:
+        raise encoder.error
+    return len(animator.frames)
@@ -0,0 +1,73 @@
+"""
+Times a season K/D bar race saved to a GIF the old way, re-filtering the matches and redrawing
+the axes every frame, against cdl_common.animation's precomputed, blitted frames. Each run is in
+a fresh process so its peak memory can be reported too.
+
+Run from the repository root:
+    python -m cdl_common.bench_animation
+"""
+import os
+import resource
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+TOP = 10
+
+
+def legacy_race(path: str, frames: int) -> int:
+    """
+    FuncAnimation with an update that filters the matches up to the frame's time and redraws the chart
+    """
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    import numpy as np
+    from matplotlib.animation import FuncAnimation, PillowWriter
+
+    from cdl_common.loader import read_in_all_matches
+
+    data = read_in_all_matches()
+    times = np.unique(data['matchGame.updatedAt'].to_numpy())
+    times = times[np.linspace(0, len(times) - 1, frames).round().astype('int64')]
+    fig, ax = plt.subplots(figsize=(10, 0.5 * TOP + 1.5))
+
+    def update(time):
+        ax.clear()
+        played = data[data['matchGame.updatedAt'] <= time]
+        totals = played.groupby('abbrev')[['totalKills', 'totalDeaths']].sum()
+        kd = (totals['totalKills'] / totals['totalDeaths']).sort_values(ascending=False).head(TOP)
+        ax.barh(kd.index, kd.values)
+        ax.invert_yaxis()
+        ax.set_title('kd through the season')
+
+    FuncAnimation(fig, update, frames=times).save(path, writer=PillowWriter(fps=20))
+    return len(times)
+
+
+def blitted_race(path: str, frames: int) -> int:
+    import matplotlib
+    matplotlib.use('Agg')
+
+    from cdl_common.animation import BarRace, save_animation, season_frames
+    from cdl_common.loader import read_in_all_matches
+
+    return save_animation(BarRace(season_frames(read_in_all_matches(), 'kd', frames=frames), top=TOP), path, fps=20)
+
+
+def _timed(race, path: str, frames: int):
+    start = time.perf_counter()
+    count = race(path, frames)
+    return count, time.perf_counter() - start, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+if __name__ == '__main__':
+    with tempfile.TemporaryDirectory() as folder:
+        for frames in (100, 544):
+            line = []
+            for label, race in (('redraw', legacy_race), ('blitted', blitted_race)):
+                path = os.path.join(folder, f"{label}.gif")
+                with ProcessPoolExecutor(max_workers=1) as pool:
+                    count, seconds, peak_mb = pool.submit(_timed, race, path, frames).result()
+                line.append(f"{label} {seconds:6.2f}s ({1000 * seconds / count:5.1f} ms/frame, peak {peak_mb:5.0f} MB)")
+            print(f"{count} frames: " + "  ->  ".join(line))
@@ -0,0 +1,63 @@
+"""
+Times the old list-comprehension feature helpers against cdl_common.features at one and five
+seasons of rows, and checks that both give the same values.
+
+Run from the repository root:
+    python -m cdl_common.bench_features
+"""
+import time
+
+import numpy as np
+import pandas as pd
+
+from cdl_common.bench_memory import scale
+from cdl_common.features import match_features
+from cdl_common.match_store import load_matches
+
+
+def legacy_features(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    The comprehensions from assign_extra_vars and assign_match_winner before cdl_common.features
+    """
+    df = df.copy()
+    df['map_winner'] = ["host" if a > b else "guest" for a, b in zip(df['matchGameResult.hostGameScore'], df['matchGameResult.guestGameScore'])]
+    df['is_winner'] = ["Y" if a == b else "N" for a, b in zip(df['map_winner'], df['team_type'])]
+    df['isMatchWinner'] = ['y' if a == b else 'n' for a, b in zip(df['winnerTeamId'], df['team_id'])]
+    # The old accuracy had no zero guard and raised ZeroDivisionError on rows with no shots fired
+    df['accuracy'] = [(a/b)*100 if b > 0 else 0 for a, b in zip(df['totalShotsHit'], df['totalShotsFired'])]
+    df['kills_untraded_perc'] = [(a/b)*100 if b > 0 else 0 for a, b in zip(df['untradedKills'], df['totalKills'])]
+    df['deaths_traded_perc'] = [(a/b)*100 if b > 0 else 0 for a, b in zip(df['tradedDeaths'], df['totalDeaths'])]
+    df['damage_per_kill'] = [round(a/b, 0) if b > 0 else 0 for a, b in zip(df['totalDamageDealt'], df['totalKills'])]
+    df['kd'] = [round((a/b), 2) if b > 0 else a for a, b in zip(df['totalKills'], df['totalDeaths'])]
+    df['rot_kill_perc'] = [round((a/b)*100, 2) if b > 0 else 0 for a, b in zip(df['totalRotationKills'], df['totalKills'])]
+    df['fb_perc'] = [round((a/b)*100, 2) if b > 0 else 0 for a, b in zip(df['totalFirstBloodKills'], df['totalKills'])]
+    return df
+
+
+def check_equal(legacy: pd.DataFrame, features: pd.DataFrame) -> None:
+    for name in features.columns:
+        old, new = legacy[name].to_numpy(), features[name].to_numpy()
+        if new.dtype == object:
+            assert (old == new).all(), name
+            continue
+        assert np.allclose(old.astype(float), new, equal_nan=True, atol=0.01), name
+
+
+def best_ms(function, repeats: int = 5) -> float:
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+if __name__ == '__main__':
+    season = load_matches()
+    for label, copies in (('season', 1), ('5 seasons', 5)):
+        df = scale(season, copies)
+        check_equal(legacy_features(df), match_features(df))
+        legacy_ms = best_ms(lambda: legacy_features(df), repeats=3)
+        vector_ms = best_ms(lambda: match_features(df))
+        print(f"{label}: {len(df)} rows  comprehensions {legacy_ms:8.2f} ms  ->  vectorized {vector_ms:6.2f} ms"
+              f"  ({legacy_ms / vector_ms:.1f}x)")
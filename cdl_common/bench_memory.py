@@ -0,0 +1,58 @@
+"""
+Compares the memory of the wide match frame with the normalized fact and dimension tables,
+and the time and peak memory of common groupbys over each.
+
+Run from the repository root:
+    python -m cdl_common.bench_memory
+"""
+import time
+import tracemalloc
+
+import pandas as pd
+
+from cdl_common.dimensions import normalize_matches
+from cdl_common.match_store import load_matches
+
+STATS = ['totalKills', 'totalDeaths', 'totalAssists', 'totalDamageDealt', 'totalShotsHit', 'totalShotsFired']
+GROUPBYS = [['alias', 'abbrev'], ['abbrev', 'gameMode'], ['abbrev', 'oppo_abbrev', 'gameMap', 'gameMode']]
+
+
+def frame_mb(df: pd.DataFrame) -> float:
+    return df.memory_usage(deep=True).sum() / 1024 ** 2
+
+
+def profile_groupby(df: pd.DataFrame, keys: list, repeats: int = 5):
+    """
+    Returns the best time in milliseconds and the peak memory in MB of summing STATS by keys
+    """
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        df.groupby(keys, observed=True)[STATS].sum()
+        best = min(best, time.perf_counter() - start)
+    tracemalloc.start()
+    df.groupby(keys, observed=True)[STATS].sum()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return best * 1000, peak / 1024 ** 2
+
+
+def scale(df: pd.DataFrame, copies: int) -> pd.DataFrame:
+    return pd.concat([df] * copies, ignore_index=True)
+
+
+if __name__ == '__main__':
+    season = load_matches()
+    for label, copies in (('season', 1), ('5 seasons', 5)):
+        wide = scale(season, copies)
+        tables = normalize_matches(wide)
+        dimensions_mb = sum(frame_mb(table) for table in tables[1:])
+        print(f"{label}: {len(wide)} rows")
+        print(f"  wide frame        {frame_mb(wide):8.2f} MB")
+        print(f"  facts             {frame_mb(tables.facts):8.2f} MB")
+        print(f"  dimension tables  {dimensions_mb:8.2f} MB")
+        for keys in GROUPBYS:
+            wide_ms, wide_peak = profile_groupby(wide, keys)
+            facts_ms, facts_peak = profile_groupby(tables.facts, keys)
+            print(f"  groupby {'/'.join(keys):<36} {wide_ms:7.2f} ms {wide_peak:6.2f} MB peak"
+                  f"  ->  {facts_ms:7.2f} ms {facts_peak:6.2f} MB peak")
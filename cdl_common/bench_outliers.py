@@ -0,0 +1,42 @@
+"""
+Times the old per-element outlier comprehension against cdl_common.outliers at one and five
+seasons of rows, and checks that the mean and median scores match.
+
+Run from the repository root:
+    python -m cdl_common.bench_outliers
+"""
+import numpy as np
+import pandas as pd
+
+from cdl_common.bench_features import best_ms
+from cdl_common.bench_memory import scale
+from cdl_common.match_store import load_matches
+from cdl_common.outliers import generate_outlier_score, pair_scores
+
+PAIRS = [('totalKills', 'totalDeaths'), ('totalDamageDealt', 'totalShotsFired'), ('hillTime', 'totalKills')]
+
+
+def legacy_outlier_score(column1: pd.Series, column2: pd.Series, method: str) -> np.ndarray:
+    """
+    generate_outlier_score before cdl_common.outliers, with method.lower() called so mean can be chosen
+    """
+    col1_scores = (np.array([abs(round(a/b, 2)-1) if b > 0 else 0 for a, b in
+                             zip(column1, [column1.mean() if method.lower() == 'mean' else column1.median() for i in column1])]))
+    col2_scores = (np.array([abs(round(a/b, 2)-1) if b > 0 else 0 for a, b in
+                             zip(column2, [column2.mean() if method.lower() == 'mean' else column2.median() for i in column2])]))
+    return (col1_scores+col2_scores)/2
+
+
+if __name__ == '__main__':
+    season = load_matches()
+    for label, copies in (('season', 1), ('5 seasons', 5)):
+        df = scale(season, copies)
+        x, y = df['totalKills'], df['totalDeaths']
+        for method in ('mean', 'median'):
+            assert np.allclose(legacy_outlier_score(x, y, method), generate_outlier_score(x, y, method),
+                               equal_nan=True, atol=0.011), method
+        legacy_ms = best_ms(lambda: legacy_outlier_score(x, y, 'mean'), repeats=1)
+        vector_ms = best_ms(lambda: generate_outlier_score(x, y, 'mean'))
+        grouped_ms = best_ms(lambda: pair_scores(df, PAIRS, 'mad', by=['gameMode']))
+        print(f"{label}: {len(df)} rows  comprehension {legacy_ms:9.2f} ms  ->  vectorized {vector_ms:6.2f} ms"
+              f"  ({legacy_ms / vector_ms:.0f}x), {len(PAIRS)} pairs by gameMode with mad {grouped_ms:6.2f} ms")
@@ -0,0 +1,49 @@
+"""
+Times a full TimeSeriesEngine build against adding the same matches in batches of newly
+scraped IDs from read_in_list, the incremental path a scraper takes, and checks that both give
+the same trajectories.
+
+Run from the repository root:
+    python -m cdl_common.bench_timeseries
+"""
+import time
+
+import numpy as np
+
+from cdl_common.catalog import DEFAULT_EVENTS, read_catalog
+from cdl_common.loader import read_in_all_matches, read_in_list
+from cdl_common.timeseries import build_time_series, TimeSeriesEngine
+
+STATS = ['kd', 'accuracy', 'totalDamageDealt']
+BATCHES = 7
+
+
+def check_equal(full, chunked) -> None:
+    for stat in STATS:
+        for kind in ('expanding', 'rolling', 'ewm'):
+            expected = full.trajectories(stat, kind).sort_index()
+            actual = chunked.trajectories(stat, kind).reindex(expected.index)
+            assert np.allclose(expected.to_numpy(), actual.to_numpy(), equal_nan=True), (stat, kind)
+
+
+if __name__ == '__main__':
+    # Series are ordered by date then match ID, and appends only ever add later series
+    ids = sorted(entry.match_id for entry in read_catalog() if entry.event in DEFAULT_EVENTS)
+    frames = [read_in_list(batch) for batch in np.array_split(ids, BATCHES)]
+    df = read_in_all_matches()
+
+    for by in ('player', 'team'):
+        start = time.perf_counter()
+        full = build_time_series(df, by, STATS)
+        built = time.perf_counter() - start
+
+        start = time.perf_counter()
+        chunked = TimeSeriesEngine(by, STATS)
+        for frame in frames:
+            # read_in_list frames carry no event column
+            assert chunked.append(frame)['event'].isna().all()
+        appended = time.perf_counter() - start
+
+        check_equal(full, chunked)
+        print(f"{by:<7} full build {built * 1000:6.1f} ms, {len(frames)} read_in_list appends {appended * 1000:6.1f} ms, "
+              f"{len(chunked.frame())} rows match")
@@ -0,0 +1,53 @@
+"""
+Every known match ID and the event it belongs to, read from major_ids.json.
+"""
+import json
+import os
+from typing import List, NamedTuple
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA_DIR = os.path.join(REPO_ROOT, 'data')
+MAJOR_IDS_PATH = os.path.join(REPO_ROOT, 'major_ids.json')
+
+# Every match in major_ids.json is from the 2023 (Modern Warfare II) season
+DEFAULT_SEASON = '2023'
+# The events the analysis loaders have always combined; M4Qual is scraped but was never part of
+# the full dataset, pass event=None to read_in_all_matches to include it
+DEFAULT_EVENTS = ['M1Qual', 'M2Event', 'M2Qual', 'M3Qual', 'M3Event']
+
+
+class CatalogEntry(NamedTuple):
+    match_id: int
+    season: str
+    event: str
+    setting: str
+
+
+def event_label(major: str, stage: str) -> str:
+    """
+    Converts a major_ids.json key pair, e.g. ('major2', 'qualifying'), to its event label, e.g. 'M2Qual'
+    """
+    return f"M{major.replace('major', '')}{'Qual' if stage == 'qualifying' else 'Event'}"
+
+
+def read_catalog(ids_path: str = MAJOR_IDS_PATH, season: str = DEFAULT_SEASON) -> List[CatalogEntry]:
+    """
+    Desc: Lists every match in major_ids.json in file order
+    Params:
+        ids_path (str)
+        season (str) - the season the file describes
+    returns:
+        catalog (list of CatalogEntry) - qualifying matches are played online, events on lan
+    """
+    with open(ids_path) as file:
+        majors = json.load(file)
+    catalog = []
+    for major, stages in majors.items():
+        for stage, ids in stages.items():
+            setting = 'online' if stage == 'qualifying' else 'lan'
+            catalog.extend(CatalogEntry(int(match_id), season, event_label(major, stage), setting) for match_id in ids)
+    return catalog
+
+
+def match_csv_path(match_id, data_dir: str = DATA_DIR) -> str:
+    return os.path.join(data_dir, f"cdl_{match_id}.csv")
@@ -0,0 +1,126 @@
+"""
+Reads sets of match csvs from data/, projecting and filtering each file as it is read.
+
+Large sets are parsed across a process pool and concatenated once. Existing files are
+found from a single directory listing rather than by trying to open every ID.
+"""
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import Iterable, List, Optional
+
+import pandas as pd
+
+from cdl_common.catalog import DATA_DIR, match_csv_path, read_catalog
+from cdl_common.filters import apply_filters, columns_to_read, match_filters
+
+
+def read_header(match_id, data_dir: str = DATA_DIR) -> List[str]:
+    """
+    The column names of a match csv, read from its first line
+    """
+    return list(pd.read_csv(match_csv_path(match_id, data_dir), nrows=0).columns)
+
+
+def check_columns(columns: Optional[List[str]], known: Iterable[str]) -> None:
+    """
+    Raises KeyError naming any of columns that is not in known
+    """
+    known = set(known)
+    unknown = [column for column in columns or [] if column not in known]
+    if unknown:
+        raise KeyError(f"Unknown match columns {unknown}")
+
+
+def read_match_csv(match_id, columns: Optional[List[str]] = None, column_filters: Optional[dict] = None,
+                   data_dir: str = DATA_DIR, strict: bool = True) -> pd.DataFrame:
+    """
+    Desc: Reads a single match csv, only parsing the columns that are needed
+    Params:
+        match_id (int)
+        columns (list of str) - columns to keep, defaults to all
+        column_filters (dict) - {column: allowed values} applied before the frame is returned
+        data_dir (str)
+        strict (bool) - raise KeyError for columns or filter columns not in this csv, otherwise columns
+                        it lacks are returned as NaN (read_match_frames checks them against every csv instead)
+    returns:
+        df (pandas df)
+    """
+    column_filters = column_filters or {}
+    if strict:
+        check_columns([*(columns or []), *column_filters], read_header(match_id, data_dir))
+    wanted = columns_to_read(columns, column_filters)
+    usecols = None if wanted is None else (lambda column: column in wanted)
+    df = apply_filters(pd.read_csv(match_csv_path(match_id, data_dir), usecols=usecols), column_filters)
+    return df if columns is None else df.reindex(columns=columns)
+
+
+# Below this many files the cost of starting worker processes outweighs the parallel parse
+PARALLEL_THRESHOLD = 24
+MATCH_CSV_PATTERN = re.compile(r'cdl_(\d+)\.csv$')
+
+
+def list_match_ids(data_dir: str = DATA_DIR) -> List[int]:
+    """
+    Every match ID with a csv in data_dir, in ascending order
+    """
+    match_ids = []
+    with os.scandir(data_dir) as entries:
+        for entry in entries:
+            found = MATCH_CSV_PATTERN.match(entry.name)
+            if found and entry.is_file():
+                match_ids.append(int(found.group(1)))
+    return sorted(match_ids)
+
+
+def read_match_frames(match_ids: List, columns: Optional[List[str]] = None, column_filters: Optional[dict] = None,
+                      data_dir: str = DATA_DIR, max_workers: Optional[int] = None) -> List[pd.DataFrame]:
+    """
+    Desc: Reads one frame per match, across a process pool when there are enough files to be worth it.
+          Raises KeyError for columns that are in none of the csvs
+    Params:
+        match_ids (list of int)
+        columns (list of str) - columns to keep, defaults to all
+        column_filters (dict) - {column: allowed values}
+        data_dir (str)
+        max_workers (int) - processes to use, defaults to the number of cores, 1 reads in this process
+    returns:
+        frames (list of pandas df) - in the same order as match_ids
+    """
+    if columns is not None or column_filters:
+        # Some stats were only recorded in some matches, so a column only has to exist in one of the csvs
+        check_columns([*(columns or []), *(column_filters or {})],
+                      {column for match_id in match_ids for column in read_header(match_id, data_dir)})
+    read = partial(read_match_csv, columns=columns, column_filters=column_filters, data_dir=data_dir, strict=False)
+    max_workers = max_workers or os.cpu_count() or 1
+    if max_workers == 1 or len(match_ids) < PARALLEL_THRESHOLD:
+        return [read(match_id) for match_id in match_ids]
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        return list(pool.map(read, match_ids, chunksize=max(1, len(match_ids) // (max_workers * 4))))
+
+
+def read_match_csvs(match_ids: Iterable, columns: Optional[List[str]] = None, data_dir: str = DATA_DIR,
+                    max_workers: Optional[int] = None, **filters) -> pd.DataFrame:
+    """
+    Desc: Reads and concatenates the csvs for match_ids
+    Params:
+        match_ids (list of int)
+        columns (list of str) - columns to keep, defaults to all
+        data_dir (str)
+        max_workers (int) - processes to parse with, defaults to the number of cores
+        event, setting, gamemode, map, team, player (str or list of str) - row filters, event and
+            setting are answered from the catalog so other matches are never opened
+    returns:
+        df (pandas df)
+    """
+    column_filters = match_filters(**filters)
+    catalog_filters = {column: column_filters.pop(column) for column in ('event', 'setting') if column in column_filters}
+    if catalog_filters:
+        allowed = {entry.match_id for entry in read_catalog()
+                   if all(getattr(entry, column) in values for column, values in catalog_filters.items())}
+        match_ids = [match_id for match_id in match_ids if int(match_id) in allowed]
+    frames = read_match_frames(list(match_ids), columns, column_filters, data_dir, max_workers)
+    if not frames:
+        return pd.DataFrame(columns=columns)
+    return pd.concat(frames)
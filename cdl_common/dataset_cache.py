@@ -0,0 +1,101 @@
+"""
+An in-process cache of loaded frames, keyed on the call that produced them and the
+state of the files they were read from.
+"""
+import os
+import threading
+from collections import OrderedDict
+from typing import Callable, Hashable, Iterable, Tuple
+
+import pandas as pd
+
+# Frames are kept until the cache holds this many bytes, then the least recently used go first
+DEFAULT_MAX_BYTES = 1024 ** 3
+
+
+def file_signature(paths: Iterable[str]) -> Tuple:
+    """
+    The modification time and size of every path, or None for paths that do not exist
+    """
+    signature = []
+    for path in paths:
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            signature.append((path, None))
+            continue
+        signature.append((path, stat.st_mtime_ns, stat.st_size))
+    return tuple(signature)
+
+
+def freeze(value) -> Hashable:
+    """
+    Turns loader arguments (lists, dicts, None) into something that can be part of a cache key
+    """
+    if isinstance(value, dict):
+        return tuple(sorted((key, freeze(item)) for key, item in value.items()))
+    if isinstance(value, (list, tuple, set)):
+        return tuple(freeze(item) for item in value)
+    return value
+
+
+class DatasetCache:
+    """
+    Desc: A memory-bounded LRU cache of data frames
+    Params:
+        max_bytes (int) - memory budget for all cached frames together
+    """
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES) -> None:
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _evict(self, key: Hashable) -> None:
+        _, _, size = self._entries.pop(key)
+        self._bytes -= size
+
+    def get_or_load(self, key: Hashable, paths: Iterable[str], load: Callable[[], pd.DataFrame]) -> pd.DataFrame:
+        """
+        Desc: Returns a copy of the cached frame for key, calling load if it is missing or any of
+              paths has changed since it was cached
+        Params:
+            key (hashable) - identifies the call, e.g. the function name and its arguments
+            paths (list of str) - every file the frame was built from
+            load (callable) - builds the frame
+        returns:
+            df (pandas df) - a copy, so callers can add columns without changing the cached frame
+        """
+        signature = file_signature(paths)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == signature:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1].copy()
+            if entry is not None:
+                self._evict(key)
+            self.misses += 1
+
+        df = load()
+        size = int(df.memory_usage(deep=True).sum())
+        with self._lock:
+            if key in self._entries:
+                self._evict(key)
+            if size <= self.max_bytes:
+                self._entries[key] = (signature, df, size)
+                self._bytes += size
+                while self._bytes > self.max_bytes:
+                    self._evict(next(iter(self._entries)))
+        return df.copy()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def info(self) -> dict:
+        return {'entries': len(self._entries), 'bytes': self._bytes, 'max_bytes': self.max_bytes,
+                'hits': self.hits, 'misses': self.misses}
@@ -0,0 +1,102 @@
+"""
+Splits the wide player-map frame into a slim fact table and map, player, team and match
+dimension tables joined by integer keys.
+
+Every row of the loaded frame repeats the map's image URLs and descriptions, the player's
+names, headshot and social handles, and the series result. normalize_matches stores each
+of those once, turns the remaining low-cardinality text columns into categoricals and
+downcasts the integer columns. denormalize joins the dimensions back on when the wide
+columns are needed.
+"""
+from typing import List, NamedTuple, Optional
+
+import pandas as pd
+
+MAP_PREFIX = 'matchGame.gameMap.'
+PLAYER_COLUMNS = ['programId', 'firstName', 'lastName', 'headshot', 'socialNetworkHandles']
+TEAM_COLUMNS = ['abbrev']
+MATCH_COLUMNS = ['homeTeamGamesWon', 'awayTeamGamesWon', 'winnerTeamId', 'loserTeamId', 'matchDate']
+
+MAP_KEY = 'map_key'
+PLAYER_KEY = 'id'
+TEAM_KEY = 'team_id'
+MATCH_KEY = 'matchGame.matchId'
+
+# Text columns with fewer distinct values than this share of the rows become categoricals
+CATEGORY_RATIO = 0.5
+
+
+class MatchTables(NamedTuple):
+    facts: pd.DataFrame
+    maps: pd.DataFrame
+    players: pd.DataFrame
+    teams: pd.DataFrame
+    matches: pd.DataFrame
+
+
+def _dimension(df: pd.DataFrame, key: str, columns: List[str]) -> pd.DataFrame:
+    columns = [column for column in columns if column in df.columns and column != key]
+    return df[[key] + columns].drop_duplicates(subset=key).set_index(key).sort_index()
+
+
+def compact_dtypes(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Desc: Stores low-cardinality text columns as categoricals and integer columns in the smallest type
+    Params:
+        df (pandas df)
+    returns:
+        df (pandas df) - a new frame, df is not changed
+    """
+    df = df.copy()
+    for column in df.columns:
+        values = df[column]
+        if pd.api.types.is_integer_dtype(values) and not pd.api.types.is_bool_dtype(values):
+            df[column] = pd.to_numeric(values, downcast='integer')
+        elif (pd.api.types.is_object_dtype(values) or pd.api.types.is_string_dtype(values)) \
+                and values.nunique(dropna=True) < CATEGORY_RATIO * len(values):
+            df[column] = values.astype('category')
+    return df
+
+
+def normalize_matches(df: pd.DataFrame) -> MatchTables:
+    """
+    Desc: Splits a frame from read_in_all_matches into a fact table and its dimension tables
+    Params:
+        df (pandas df)
+    returns:
+        tables (MatchTables) - facts keeps one row per player per map with map_key, id, team_id
+                               and matchGame.matchId as integer keys into maps, players, teams and matches
+    """
+    df = df.reset_index(drop=True)
+    map_columns = [column for column in df.columns if column.startswith(MAP_PREFIX)]
+    codes, _ = pd.factorize(df['gameMap'])
+    df[MAP_KEY] = codes
+
+    maps = _dimension(df, MAP_KEY, ['gameMap'] + map_columns)
+    players = _dimension(df, PLAYER_KEY, ['alias'] + PLAYER_COLUMNS)
+    teams = _dimension(df, TEAM_KEY, TEAM_COLUMNS)
+    matches = _dimension(df, MATCH_KEY, MATCH_COLUMNS)
+
+    moved = set(map_columns) | set(PLAYER_COLUMNS) | set(MATCH_COLUMNS)
+    facts = compact_dtypes(df[[column for column in df.columns if column not in moved]])
+    return MatchTables(facts, compact_dtypes(maps), compact_dtypes(players), compact_dtypes(teams),
+                       compact_dtypes(matches))
+
+
+def denormalize(tables: MatchTables, columns: Optional[List[str]] = None) -> pd.DataFrame:
+    """
+    Desc: Joins dimension columns back onto the fact table
+    Params:
+        tables (MatchTables)
+        columns (list of str) - dimension columns to add, defaults to every one
+    returns:
+        df (pandas df)
+    """
+    df = tables.facts
+    for key, dimension in ((MAP_KEY, tables.maps), (PLAYER_KEY, tables.players),
+                           (TEAM_KEY, tables.teams), (MATCH_KEY, tables.matches)):
+        wanted = [column for column in dimension.columns
+                  if column not in df.columns and (columns is None or column in columns)]
+        if wanted:
+            df = df.join(dimension[wanted], on=key)
+    return df
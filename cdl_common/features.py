@@ -0,0 +1,101 @@
+"""
+Derived per-row columns (map winner, accuracy, kd, trade and first blood percentages, ...)
+computed in one vectorized pass.
+
+Each feature is built from whole NumPy arrays instead of zipping Python values row by row.
+Ratios go through safe_divide, which gives the fill value wherever the denominator is zero
+or missing, matching the old `a/b if b > 0 else 0` comprehensions. Load with
+read_in_all_matches(features=True) to have the features cached alongside the dataset.
+"""
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+import numpy as np
+import pandas as pd
+
+HOST_SCORE = 'matchGameResult.hostGameScore'
+GUEST_SCORE = 'matchGameResult.guestGameScore'
+
+
+class Feature(NamedTuple):
+    sources: List[str]
+    compute: Callable[[pd.DataFrame], np.ndarray]
+
+
+def safe_divide(numerator, denominator, fill=0.0) -> np.ndarray:
+    """
+    Desc: Divides element-wise, giving fill wherever the denominator is not positive or is missing
+    Params:
+        numerator, denominator (array-like)
+        fill (float or array-like) - value for rows that cannot be divided
+    """
+    numerator = np.asarray(numerator, dtype='float64')
+    denominator = np.asarray(denominator, dtype='float64')
+    valid = denominator > 0
+    out = np.where(valid, numerator, 0.0) / np.where(valid, denominator, 1.0)
+    return np.where(valid, out, fill)
+
+
+def _map_winner(df: pd.DataFrame) -> np.ndarray:
+    return np.where(df[HOST_SCORE].to_numpy() > df[GUEST_SCORE].to_numpy(), 'host', 'guest')
+
+
+def _is_winner(df: pd.DataFrame) -> np.ndarray:
+    return np.where(_map_winner(df) == df['team_type'].to_numpy(dtype=object), 'Y', 'N')
+
+
+def _is_match_winner(df: pd.DataFrame) -> np.ndarray:
+    return np.where(df['winnerTeamId'].to_numpy() == df['team_id'].to_numpy(), 'y', 'n')
+
+
+def _percent(numerator: str, denominator: str, decimals: Optional[int] = None) -> Callable[[pd.DataFrame], np.ndarray]:
+    def compute(df: pd.DataFrame) -> np.ndarray:
+        values = safe_divide(df[numerator], df[denominator]) * 100
+        return values if decimals is None else values.round(decimals)
+    return compute
+
+
+def _damage_per_kill(df: pd.DataFrame) -> np.ndarray:
+    return safe_divide(df['totalDamageDealt'], df['totalKills']).round(0)
+
+
+def _kd(df: pd.DataFrame) -> np.ndarray:
+    kills = df['totalKills'].to_numpy(dtype='float64')
+    return safe_divide(kills, df['totalDeaths'], fill=kills).round(2)
+
+
+FEATURES: Dict[str, Feature] = {
+    'map_winner': Feature([HOST_SCORE, GUEST_SCORE], _map_winner),
+    'is_winner': Feature([HOST_SCORE, GUEST_SCORE, 'team_type'], _is_winner),
+    'isMatchWinner': Feature(['winnerTeamId', 'team_id'], _is_match_winner),
+    'accuracy': Feature(['totalShotsHit', 'totalShotsFired'], _percent('totalShotsHit', 'totalShotsFired')),
+    'kills_untraded_perc': Feature(['untradedKills', 'totalKills'], _percent('untradedKills', 'totalKills')),
+    'deaths_traded_perc': Feature(['tradedDeaths', 'totalDeaths'], _percent('tradedDeaths', 'totalDeaths')),
+    'damage_per_kill': Feature(['totalDamageDealt', 'totalKills'], _damage_per_kill),
+    'kd': Feature(['totalKills', 'totalDeaths'], _kd),
+    'rot_kill_perc': Feature(['totalRotationKills', 'totalKills'], _percent('totalRotationKills', 'totalKills', 2)),
+    'fb_perc': Feature(['totalFirstBloodKills', 'totalKills'], _percent('totalFirstBloodKills', 'totalKills', 2)),
+}
+
+
+def match_features(df: pd.DataFrame, features: Optional[List[str]] = None) -> pd.DataFrame:
+    """
+    Desc: Computes derived columns for every row of a match frame
+    Params:
+        df (pandas df) - from read_in_all_matches or read_in_list
+        features (list of str) - names from FEATURES, defaults to every feature whose source columns are in df
+    returns:
+        features (pandas df) - one column per feature, on df's index
+    """
+    if features is None:
+        features = [name for name, feature in FEATURES.items() if set(feature.sources) <= set(df.columns)]
+    unknown = [name for name in features if name not in FEATURES]
+    if unknown:
+        raise ValueError(f"Unknown features {unknown}, choose from {list(FEATURES)}")
+    return pd.DataFrame({name: FEATURES[name].compute(df) for name in features}, index=df.index)
+
+
+def add_match_features(df: pd.DataFrame, features: Optional[List[str]] = None) -> pd.DataFrame:
+    """
+    Desc: Returns a copy of df with the match_features columns added (replacing any existing ones)
+    """
+    return df.assign(**match_features(df, features))
@@ -0,0 +1,55 @@
+"""
+The row filters shared by every match loader.
+
+Each filter takes a single value or a list of values, the same as the gamemode/team/map
+arguments of compare_stats, and maps to the column it is applied to.
+"""
+from typing import Dict, List, Optional
+
+import pandas as pd
+
+FILTER_COLUMNS = {'event': 'event',
+                  'setting': 'setting',
+                  'gamemode': 'gameMode',
+                  'map': 'gameMap',
+                  'team': 'abbrev',
+                  'player': 'alias',
+                  'opponent': 'oppo_abbrev'}
+
+
+def match_filters(**filters) -> Dict[str, List]:
+    """
+    Desc: Converts loader filter arguments to {column: allowed values}, ignoring any left as None
+    Params:
+        event, setting, gamemode, map, team, player, opponent (str or list of str)
+    returns:
+        column_filters (dict)
+    """
+    column_filters = {}
+    for name, value in filters.items():
+        if name not in FILTER_COLUMNS:
+            raise TypeError(f"Unknown filter '{name}', expected one of {list(FILTER_COLUMNS)}")
+        if value is not None:
+            column_filters[FILTER_COLUMNS[name]] = [value] if type(value) == str else list(value)
+    return column_filters
+
+
+def apply_filters(df: pd.DataFrame, column_filters: Dict[str, List]) -> pd.DataFrame:
+    """
+    Keeps the rows of df that pass every column filter
+    """
+    if not column_filters:
+        return df
+    mask = pd.Series(True, index=df.index)
+    for column, values in column_filters.items():
+        mask &= df[column].isin(values)
+    return df[mask]
+
+
+def columns_to_read(columns: Optional[List[str]], column_filters: Dict[str, List]) -> Optional[List[str]]:
+    """
+    The requested columns plus any the filters need, or None for every column
+    """
+    if columns is None:
+        return None
+    return list(dict.fromkeys([*columns, *column_filters]))
@@ -0,0 +1,102 @@
+"""
+"Against this opponent" versus "against everyone else" comparisons for every team pair and
+player at once.
+
+head_to_head_base makes one grouped pass summing and counting each stat per team, player
+and opponent. The comparison against the rest of the league is then the player's totals
+minus the opponent's share, so every pair falls out of the same sums. HeadToHead turns
+them into team-by-opponent-by-stat arrays, which answer any head-to-head with a lookup.
+Means are per player-map, as head_to_head has always plotted them.
+"""
+from typing import List
+
+import numpy as np
+import pandas as pd
+
+from cdl_common.features import FEATURES, add_match_features, safe_divide
+
+KEYS = ['abbrev', 'alias', 'oppo_abbrev']
+DEFAULT_STATS = ['kd', 'accuracy', 'totalKills', 'totalDeaths', 'totalDamageDealt', 'hillTime']
+
+
+def head_to_head_base(df: pd.DataFrame, stats: List[str]) -> pd.DataFrame:
+    """
+    Desc: Sums and counts each stat per team, player and opponent
+    Params:
+        df (pandas df) - player-map rows, stats named in cdl_common.features are computed if missing
+        stats (list of str)
+    returns:
+        base (pandas df) - indexed by abbrev, alias and oppo_abbrev, with ('sum', stat), ('count', stat)
+                           and ('size', 'maps') columns
+    """
+    missing = [stat for stat in stats if stat not in df.columns and stat in FEATURES]
+    if missing:
+        df = add_match_features(df, missing)
+    grouped = df.groupby(KEYS, observed=True)
+    base = pd.concat({'sum': grouped[stats].sum(), 'count': grouped[stats].count()}, axis=1)
+    base[('size', 'maps')] = grouped.size()
+    return base
+
+
+def _mean(frame: pd.DataFrame, stat: str) -> pd.Series:
+    return pd.Series(safe_divide(frame[('sum', stat)], frame[('count', stat)], fill=np.nan), index=frame.index)
+
+
+class HeadToHead:
+    """
+    Desc: Head-to-head lookups built from head_to_head_base
+    Params:
+        base (pandas df)
+    Attributes:
+        teams (list of str), stats (list of str)
+        vs (numpy array) - [team, opponent, stat] mean against that opponent, NaN if they never met
+        rest (numpy array) - [team, opponent, stat] mean against every other opponent
+    """
+    def __init__(self, base: pd.DataFrame) -> None:
+        self.base = base
+        self.stats = list(base['sum'].columns)
+        self.teams = sorted(set(base.index.get_level_values('abbrev')) | set(base.index.get_level_values('oppo_abbrev')))
+
+        pairs = pd.MultiIndex.from_product([self.teams, self.teams], names=['abbrev', 'oppo_abbrev'])
+        sums = base['sum'].groupby(level=['abbrev', 'oppo_abbrev']).sum().reindex(pairs, fill_value=0)
+        counts = base['count'].groupby(level=['abbrev', 'oppo_abbrev']).sum().reindex(pairs, fill_value=0)
+        shape = (len(self.teams), len(self.teams), len(self.stats))
+        sums, counts = sums.to_numpy(dtype='float64').reshape(shape), counts.to_numpy(dtype='float64').reshape(shape)
+        total_sums, total_counts = sums.sum(axis=1, keepdims=True), counts.sum(axis=1, keepdims=True)
+        self.vs = safe_divide(sums, counts, fill=np.nan)
+        self.rest = safe_divide(total_sums - sums, total_counts - counts, fill=np.nan)
+
+    def team(self, main: str, opposition: str) -> pd.DataFrame:
+        """
+        Desc: Every stat for main against opposition and against the rest of the league
+        returns:
+            comparison (pandas df) - indexed by stat, columns 'vs {opposition}' and 'vs Rest'
+        """
+        i, j = self.teams.index(main), self.teams.index(opposition)
+        return pd.DataFrame({f'vs {opposition}': self.vs[i, j], 'vs Rest': self.rest[i, j]}, index=self.stats)
+
+    def matrix(self, stat: str, rest: bool = False) -> pd.DataFrame:
+        """
+        Desc: A teams-by-opponents table of one stat, against that opponent or (rest=True) everyone else
+        """
+        values = (self.rest if rest else self.vs)[:, :, self.stats.index(stat)]
+        return pd.DataFrame(values, index=pd.Index(self.teams, name='abbrev'),
+                            columns=pd.Index(self.teams, name='oppo_abbrev'))
+
+    def players(self, main: str, opposition: str, stat: str) -> pd.DataFrame:
+        """
+        Desc: Each of main's players' stat against the rest of the league and against opposition
+        returns:
+            comparison (pandas df) - indexed by alias, columns '{stat} vs Rest' and '{stat} vs {opposition}',
+                                     for players who have played someone other than opposition
+        """
+        team = self.base.xs(main, level='abbrev')
+        totals = team.groupby(level='alias').sum()
+        if opposition in team.index.get_level_values('oppo_abbrev'):
+            against = team.xs(opposition, level='oppo_abbrev').reindex(totals.index, fill_value=0)
+        else:
+            against = totals * 0
+        rest = totals - against
+        rest = rest[rest[('size', 'maps')] > 0]
+        against = against.reindex(rest.index)
+        return pd.DataFrame({f'{stat} vs Rest': _mean(rest, stat), f'{stat} vs {opposition}': _mean(against, stat)})
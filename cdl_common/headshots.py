@@ -0,0 +1,147 @@
+"""
+Player headshots packed into one sprite atlas.
+
+build_atlas shrinks every images/{alias}_headshot.png to one tile size and packs the tiles into
+images/headshots_atlas.png, with an alias-to-offset index next to it. Charts then read a single
+image, and each player's face is a view into it, however many faces a chart has. The atlas is
+generated, not committed: load_atlas builds it the first time it is needed and again whenever a
+headshot is newer than it.
+"""
+import json
+import math
+import os
+from functools import lru_cache
+from typing import Dict, List
+
+import numpy as np
+
+from cdl_common.catalog import REPO_ROOT
+
+HEADSHOT_DIR = os.path.join(REPO_ROOT, 'images')
+ATLAS_FILE = 'headshots_atlas.png'
+ATLAS_INDEX_FILE = 'headshots_atlas.json'
+SUFFIX = '_headshot.png'
+# A quarter of the 600px downloads, still more than the ~50px the charts draw them at
+TILE = 150
+
+
+def headshot_path(alias: str, folder: str = HEADSHOT_DIR) -> str:
+    return os.path.join(folder, f"{alias}{SUFFIX}")
+
+
+def headshot_aliases(folder: str = HEADSHOT_DIR) -> List[str]:
+    """
+    Every alias with a downloaded headshot, sorted
+    """
+    return sorted(name[:-len(SUFFIX)] for name in os.listdir(folder) if name.endswith(SUFFIX))
+
+
+def atlas_paths(folder: str = HEADSHOT_DIR):
+    """
+    The atlas image and its index, kept alongside the headshots
+    """
+    return os.path.join(folder, ATLAS_FILE), os.path.join(folder, ATLAS_INDEX_FILE)
+
+
+def build_atlas(folder: str = HEADSHOT_DIR, tile: int = TILE) -> int:
+    """
+    Desc: Packs every headshot in folder into one RGBA image and writes it and the alias-to-offset index to folder
+    Params:
+        folder (str) - where the {alias}_headshot.png files are
+        tile (int) - width and height of every sprite, in pixels
+    returns:
+        sprites (int) - headshots packed
+    """
+    from PIL import Image
+
+    atlas_path, index_path = atlas_paths(folder)
+    aliases = headshot_aliases(folder)
+    columns = max(1, math.ceil(math.sqrt(len(aliases))))
+    rows = max(1, math.ceil(len(aliases) / columns))
+    atlas = Image.new('RGBA', (columns * tile, rows * tile))
+    sprites: Dict[str, List[int]] = {}
+    source = 0
+    for number, alias in enumerate(aliases):
+        with Image.open(headshot_path(alias, folder)) as image:
+            source = max(source, *image.size)
+            sprite = image.convert('RGBA').resize((tile, tile), Image.Resampling.LANCZOS)
+        x, y = (number % columns) * tile, (number // columns) * tile
+        atlas.paste(sprite, (x, y))
+        sprites[alias] = [x, y]
+
+    temp_path = f"{atlas_path}.tmp"
+    atlas.save(temp_path, format='PNG', optimize=True)
+    os.replace(temp_path, atlas_path)
+    temp_path = f"{index_path}.tmp"
+    with open(temp_path, 'w') as file:
+        json.dump({'tile': tile, 'source': source, 'sprites': sprites}, file, indent=1, sort_keys=True)
+    os.replace(temp_path, index_path)
+    return len(sprites)
+
+
+class HeadshotAtlas:
+    """
+    Desc: The packed headshots, read once, with each sprite as a view into the same pixels
+    Params:
+        pixels (numpy array) - rows x columns x 4 RGBA floats, as matplotlib.image.imread gives
+        index (dict) - the atlas json: tile, source size and alias -> [x, y]
+    """
+    def __init__(self, pixels: np.ndarray, index: dict) -> None:
+        self.pixels = pixels
+        self.tile = index['tile']
+        self.source = index['source']
+        self.sprites: Dict[str, List[int]] = index['sprites']
+
+    def __contains__(self, alias: str) -> bool:
+        return alias in self.sprites
+
+    def image(self, alias: str) -> np.ndarray:
+        """
+        The alias's headshot, raising KeyError if it has none
+        """
+        x, y = self.sprites[alias]
+        return self.pixels[y:y + self.tile, x:x + self.tile]
+
+    def offset_image(self, alias: str, zoom: float = 0.055, **kwargs):
+        """
+        Desc: An OffsetImage of the alias's headshot, to place with AnnotationBbox
+        Params:
+            alias (str)
+            zoom (float) - relative to the full-size download, so the same zoom as OffsetImage(imread(...)) gives
+                           the same size
+            kwargs - passed to OffsetImage
+        """
+        from matplotlib.offsetbox import OffsetImage
+
+        return OffsetImage(self.image(alias), zoom=zoom * self.source / self.tile, **kwargs)
+
+
+@lru_cache(maxsize=4)
+def _read_atlas(atlas_path: str, index_path: str, modified: float) -> HeadshotAtlas:
+    import matplotlib.image as image
+
+    with open(index_path) as file:
+        index = json.load(file)
+    return HeadshotAtlas(image.imread(atlas_path), index)
+
+
+def atlas_is_current(folder: str = HEADSHOT_DIR) -> bool:
+    """
+    True if the atlas and its index exist and no headshot in folder is newer than them
+    """
+    atlas_path, index_path = atlas_paths(folder)
+    if not (os.path.exists(atlas_path) and os.path.exists(index_path)):
+        return False
+    built = min(os.path.getmtime(atlas_path), os.path.getmtime(index_path))
+    return all(os.path.getmtime(headshot_path(alias, folder)) <= built for alias in headshot_aliases(folder))
+
+
+def load_atlas(folder: str = HEADSHOT_DIR) -> HeadshotAtlas:
+    """
+    Desc: The headshot atlas in folder, built first if it is missing or out of date, read from disk once per
+          process and again only after it is rebuilt
+    """
+    if not atlas_is_current(folder):
+        build_atlas(folder)
+    atlas_path, index_path = atlas_paths(folder)
+    return _read_atlas(atlas_path, index_path, max(os.path.getmtime(atlas_path), os.path.getmtime(index_path)))
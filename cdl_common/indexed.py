@@ -0,0 +1,83 @@
+"""
+A match frame with precomputed row-position indexes on its filter columns.
+
+IndexedMatches sorts the rows by game mode and team, and records where every value of each
+filter column sits. A filter looks up the positions of each requested value and
+intersects them across columns, with no pass over the frame. Filters that select one
+contiguous block of the sorted rows (a mode, or a mode and a team) come back as slices
+of the frame instead of copies.
+"""
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+from cdl_common.filters import FILTER_COLUMNS, apply_filters, match_filters
+
+CLUSTER_COLUMNS = ['gameMode', 'abbrev']
+EMPTY = np.zeros(0, dtype='int64')
+
+
+class IndexedMatches:
+    """
+    Desc: Wraps a match frame with an index of row positions for every filter column it has
+    Params:
+        df (pandas df) - e.g. read_in_all_matches(), rows keep their index labels but are sorted by cluster_by
+        cluster_by (list of str) - columns to sort by, filters on a prefix of them return slices
+    """
+    def __init__(self, df: pd.DataFrame, cluster_by: List[str] = CLUSTER_COLUMNS) -> None:
+        cluster_by = [column for column in cluster_by if column in df.columns]
+        self.df = df.sort_values(cluster_by, kind='stable') if cluster_by else df
+        self.indexes: Dict[str, Dict] = {
+            column: self.df.groupby(column, observed=True, sort=False).indices
+            for column in FILTER_COLUMNS.values() if column in self.df.columns
+        }
+
+    def __len__(self) -> int:
+        return len(self.df)
+
+    def positions(self, **filters) -> np.ndarray:
+        """
+        Desc: Sorted row positions that pass every filter, using the indexes only
+        Params:
+            event, setting, gamemode, map, team, player, opponent (str or list of str)
+        """
+        matches = []
+        for column, values in match_filters(**filters).items():
+            if column not in self.indexes:
+                raise KeyError(f"The frame has no '{column}' column to filter on")
+            index = self.indexes[column]
+            found = [index.get(value, EMPTY) for value in values]
+            matches.append(found[0] if len(found) == 1 else np.sort(np.concatenate(found)))
+        if not matches:
+            return np.arange(len(self.df))
+        matches.sort(key=len)
+        result = matches[0]
+        for other in matches[1:]:
+            result = np.intersect1d(result, other, assume_unique=True)
+        return result
+
+    def filter(self, **filters) -> pd.DataFrame:
+        """
+        Desc: The rows that pass every filter, as a slice of the frame when they are contiguous
+        Params:
+            event, setting, gamemode, map, team, player, opponent (str or list of str)
+        returns:
+            df (pandas df) - treat as read-only, copy before adding columns
+        """
+        positions = self.positions(**filters)
+        if len(positions) and positions[-1] - positions[0] + 1 == len(positions):
+            return self.df.iloc[positions[0]:positions[-1] + 1]
+        return self.df.take(positions)
+
+
+def filter_matches(df, **filters) -> pd.DataFrame:
+    """
+    Desc: Applies loader-style filters to either an IndexedMatches or a plain frame
+    Params:
+        df (IndexedMatches or pandas df)
+        event, setting, gamemode, map, team, player, opponent (str or list of str)
+    """
+    if isinstance(df, IndexedMatches):
+        return df.filter(**filters)
+    return apply_filters(df, match_filters(**filters))
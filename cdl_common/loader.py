@@ -0,0 +1,126 @@
+"""
+The match loaders used by the analysis, Clustering, ML Winner and images folders.
+
+Every loader is memoized in one in-process DatasetCache, keyed on its arguments and on the
+modification times of the files it reads, so repeat loads in a session are instant and a
+changed or newly scraped csv is always picked up.
+"""
+import pandas as pd
+
+from cdl_common.catalog import DEFAULT_EVENTS, MAJOR_IDS_PATH, match_csv_path, read_catalog
+from cdl_common.csv_loader import list_match_ids, read_match_csvs
+from cdl_common.dataset_cache import DatasetCache, freeze
+from cdl_common.dimensions import MatchTables, compact_dtypes, normalize_matches
+from cdl_common.features import add_match_features
+from cdl_common.head_to_head import DEFAULT_STATS, HeadToHead, head_to_head_base
+from cdl_common.indexed import IndexedMatches
+from cdl_common.match_store import load_matches
+
+cache = DatasetCache()
+
+
+def read_in_list(ids, columns=None, **filters) -> pd.DataFrame:
+    """
+    Desc: Reads the csvs for a list of match IDs
+    Params:
+        ids (list of int)
+        columns (list of str) - only parse these columns, defaults to all
+        event, setting, gamemode, map, team, player (str or list of str) - row filters,
+            e.g. read_in_list(ids, columns=['alias', 'totalKills'], gamemode='CDL SnD')
+    """
+    ids = [int(idd) for idd in ids]
+    return cache.get_or_load(('read_in_list', tuple(ids), freeze(columns), freeze(filters)),
+                             [match_csv_path(idd) for idd in ids],
+                             lambda: read_match_csvs(ids, columns=columns, **filters))
+
+
+def catalog_paths() -> list:
+    """
+    major_ids.json and every catalog csv, the files a cached full-dataset read depends on
+    """
+    return [MAJOR_IDS_PATH] + [match_csv_path(entry.match_id) for entry in read_catalog()]
+
+
+def read_in_all_matches(columns=None, compact: bool = False, features: bool = False, event=DEFAULT_EVENTS,
+                        **filters) -> pd.DataFrame:
+    """
+    Desc: Loads the matches of the default events, with their event and setting, from the columnar match store.
+          Rows are in DEFAULT_EVENTS order, then major_ids.json order, with a 0..n-1 index
+    Params:
+        columns (list of str) - only load these columns, defaults to all
+        compact (bool) - return only the fact table from read_match_tables, with categorical text
+                         columns and without the map, player and series columns (a fraction of the memory,
+                         pass observed=True when grouping by its categoricals)
+        features (bool) - add the cdl_common.features columns (map_winner, kd, accuracy, ...) that the
+                          loaded columns allow, cached with the dataset
+        event (str or list of str) - events to load, defaults to catalog.DEFAULT_EVENTS, None for every event
+            in major_ids.json
+        setting, gamemode, map, team, player (str or list of str) - row filters pushed into the read,
+            e.g. read_in_all_matches(columns=['alias', 'abbrev', 'totalKills', 'totalDeaths'], gamemode='CDL SnD')
+    """
+    filters['event'] = event
+    def load() -> pd.DataFrame:
+        # Events in the order the analysis loaders always concatenated them
+        df = load_matches(columns=columns, event_order=DEFAULT_EVENTS, **filters)
+        if features:
+            df = add_match_features(df)
+        if not compact:
+            return df
+        return compact_dtypes(df) if columns else normalize_matches(df).facts
+
+    return cache.get_or_load(('read_in_all_matches', freeze(columns), compact, features, freeze(filters)),
+                             catalog_paths(), load)
+
+
+def read_indexed_matches(columns=None, **filters) -> IndexedMatches:
+    """
+    Desc: read_in_all_matches wrapped with row-position indexes on its filter columns, for repeated filtering
+    Params:
+        columns (list of str) - only load these columns, defaults to all
+        event, setting, gamemode, map, team, player (str or list of str) - row filters
+    returns:
+        matches (IndexedMatches) - e.g. read_indexed_matches().filter(gamemode='CDL SnD', team='TX'),
+                                   or pass it to compare_stats and head_to_head in place of df
+    """
+    return IndexedMatches(read_in_all_matches(columns=columns, **filters))
+
+
+def read_match_tables(**filters) -> MatchTables:
+    """
+    Desc: Loads every match split into a fact table plus map, player, team and match dimension tables
+    Params:
+        event, setting, gamemode, map, team, player (str or list of str) - row filters
+    returns:
+        tables (MatchTables) - see cdl_common.dimensions.denormalize to join them back together
+    """
+    return normalize_matches(read_in_all_matches(**filters))
+
+
+def read_head_to_head(stats=None, **filters) -> HeadToHead:
+    """
+    Desc: Head-to-head lookups for every team pair and player, built in one grouped pass and cached
+    Params:
+        stats (list of str) - stats to compare, defaults to cdl_common.head_to_head.DEFAULT_STATS
+        event, setting, gamemode, map, team, player (str or list of str) - row filters
+    returns:
+        h2h (HeadToHead) - e.g. read_head_to_head(gamemode='CDL Hardpoint').players('TX', 'BOS', 'hillTime')
+    """
+    stats = list(stats or DEFAULT_STATS)
+    return HeadToHead(cache.get_or_load(('read_head_to_head', tuple(stats), freeze(filters)), catalog_paths(),
+                                        lambda: head_to_head_base(read_in_all_matches(**filters), stats)))
+
+
+def read_number_range(start: int, end: int, columns=None, **filters) -> pd.DataFrame:
+    """
+    Desc: Reads every match csv with an ID between start and end (inclusive)
+    Params:
+        start, end (int)
+        columns (list of str) - only parse these columns, defaults to all
+        event, setting, gamemode, map, team, player (str or list of str) - row filters
+    """
+    existing = [i for i in list_match_ids() if start <= i <= end]
+    not_exist = sorted(set(range(start, end+1)) - set(existing))
+    print(f"The following match IDs do not exist {not_exist}")
+    return cache.get_or_load(('read_number_range', tuple(existing), freeze(columns), freeze(filters)),
+                             [match_csv_path(idd) for idd in existing],
+                             lambda: read_match_csvs(existing, columns=columns, **filters))
@@ -0,0 +1,134 @@
+"""
+A typed, compressed Parquet copy of the data/ csvs, partitioned by season, event and game mode.
+
+compact_matches reads every csv in the catalog once and writes data/store/. load_matches
+reads it back with a single bulk read, rebuilding it first whenever a csv has changed.
+"""
+import json
+import os
+import shutil
+import warnings
+from typing import List, Optional
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+
+from cdl_common.catalog import DATA_DIR, match_csv_path, read_catalog
+from cdl_common.csv_loader import list_match_ids, read_match_frames
+from cdl_common.filters import match_filters
+
+STORE_DIR = os.path.join(DATA_DIR, 'store')
+PARTITION_COLUMNS = ['season', 'event', 'gameMode']
+PARTITIONING = ds.partitioning(pa.schema([(column, pa.string()) for column in PARTITION_COLUMNS]), flavor='hive')
+
+# Catalog position of each row, used to give rows back in the same order as the csvs
+ORDER_COLUMN = '_order'
+
+
+def _metadata_path(store_dir: str) -> str:
+    return os.path.join(store_dir, '_store.json')
+
+
+def source_mtimes(catalog, data_dir: str) -> dict:
+    """
+    Maps each catalog match ID (as a string) to the modification time of its csv, skipping missing csvs
+    """
+    mtimes = {}
+    for entry in catalog:
+        path = match_csv_path(entry.match_id, data_dir)
+        if os.path.exists(path):
+            mtimes[str(entry.match_id)] = os.path.getmtime(path)
+    return mtimes
+
+
+def _make_arrow_safe(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Columns that hold both numbers and strings across matches are stored as strings
+    """
+    for column in df.columns[df.dtypes == object]:
+        values = df[column].dropna()
+        if values.map(type).nunique() > 1:
+            df[column] = df[column].where(df[column].isna(), df[column].astype(str))
+    return df
+
+
+def store_is_current(store_dir: str = STORE_DIR, data_dir: str = DATA_DIR) -> bool:
+    """
+    True if the store exists and was built from exactly the csvs that are on disk now
+    """
+    if not os.path.exists(_metadata_path(store_dir)):
+        return False
+    with open(_metadata_path(store_dir)) as file:
+        metadata = json.load(file)
+    return metadata['sources'] == source_mtimes(read_catalog(), data_dir)
+
+
+def compact_matches(store_dir: str = STORE_DIR, data_dir: str = DATA_DIR) -> None:
+    """
+    Desc: Rebuilds the store from every csv in the catalog, warning about matches with no csv
+    Params:
+        store_dir (str)
+        data_dir (str)
+    """
+    existing = set(list_match_ids(data_dir))
+    catalog = [entry for entry in read_catalog() if entry.match_id in existing]
+    missing = [entry.match_id for entry in read_catalog() if entry.match_id not in existing]
+    frames = read_match_frames([entry.match_id for entry in catalog], data_dir=data_dir)
+    for frame, entry in zip(frames, catalog):
+        frame['event'] = entry.event
+        frame['setting'] = entry.setting
+        frame['season'] = entry.season
+    if missing:
+        warnings.warn(f"The following match IDs have no csv and were left out of the store {missing}")
+    df = _make_arrow_safe(pd.concat(frames, ignore_index=True))
+    columns = [column for column in df.columns if column != 'season']
+    df[ORDER_COLUMN] = pd.RangeIndex(len(df), dtype='int32')
+
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    if os.path.exists(store_dir):
+        shutil.rmtree(store_dir)
+    # One row group per partition file, the default flushes a tiny row group for every batch
+    ds.write_dataset(table, store_dir, format='parquet', partitioning=PARTITIONING,
+                     min_rows_per_group=len(df), max_rows_per_group=max(len(df), 1),
+                     file_options=ds.ParquetFileFormat().make_write_options(compression='zstd'))
+    with open(_metadata_path(store_dir), 'w') as file:
+        json.dump({'columns': columns, 'sources': source_mtimes(catalog, data_dir)}, file)
+
+
+def load_matches(columns: Optional[List[str]] = None, store_dir: str = STORE_DIR,
+                 data_dir: str = DATA_DIR, event_order: Optional[List[str]] = None, **filters) -> pd.DataFrame:
+    """
+    Desc: Loads matches from the store in one read, compacting the csvs first if they have changed.
+          Filters on event, setting and gamemode prune whole partitions, the rest are pushed
+          down into the Parquet reads, and only the requested columns are decoded
+    Params:
+        columns (list of str) - columns to load, defaults to all
+        store_dir (str)
+        data_dir (str)
+        event_order (list of str) - events whose rows come first, in this order, the rest follow in catalog order
+        event, setting, gamemode, map, team, player (str or list of str) - row filters
+    returns:
+        df (pandas df) - the csv columns plus event and setting, in catalog order within each event
+    """
+    column_filters = match_filters(**filters)
+    if not store_is_current(store_dir, data_dir):
+        compact_matches(store_dir, data_dir)
+    if columns is None:
+        with open(_metadata_path(store_dir)) as file:
+            columns = json.load(file)['columns']
+
+    row_filter = None
+    for column, values in column_filters.items():
+        condition = ds.field(column).isin(values)
+        row_filter = condition if row_filter is None else row_filter & condition
+    dataset = ds.dataset(store_dir, format='parquet', partitioning=PARTITIONING)
+    read = list(dict.fromkeys(list(columns) + ([] if event_order is None else ['event']))) + [ORDER_COLUMN]
+    df = dataset.to_table(columns=read, filter=row_filter).to_pandas()
+    order = [ORDER_COLUMN]
+    if event_order is not None:
+        ranks = {event: rank for rank, event in enumerate(event_order)}
+        df['_event_rank'] = df['event'].map(ranks).fillna(len(ranks)).astype('int64')
+        order = ['_event_rank', ORDER_COLUMN]
+    df = df.sort_values(order).reset_index(drop=True)
+    return df[list(columns)]
@@ -0,0 +1,111 @@
+"""
+Outlier scores for labelling scatter plots, computed for whole columns at once.
+
+Every method gives 0 for a typical point and grows the further a point sits from its
+column's centre:
+    mean, median - |round(x / centre, 2) - 1|, the score compare_stats has always used
+    zscore       - |x - mean| / standard deviation
+    mad          - |x - median| / (1.4826 * median absolute deviation), a z-score that
+                   a few extreme points cannot drag around
+Passing groups (or by) scores each point against its own group, e.g. its game mode or
+event, with one groupby for all of the columns.
+"""
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from cdl_common.features import safe_divide
+
+METHODS = ('mean', 'median', 'zscore', 'mad')
+
+# Scales the median absolute deviation to the standard deviation of normally distributed data
+MAD_SCALE = 1.4826
+
+
+def _broadcast(frame: pd.DataFrame, stat: str, groups) -> np.ndarray:
+    if groups is None:
+        return np.broadcast_to(frame.agg(stat).to_numpy(dtype='float64'), frame.shape)
+    return frame.groupby(groups, observed=True, sort=False).transform(stat).to_numpy(dtype='float64')
+
+
+def column_scores(frame: pd.DataFrame, method: str = 'mean', groups=None) -> pd.DataFrame:
+    """
+    Desc: Scores every value of every column in frame
+    Params:
+        frame (pandas df) - numeric columns to score
+        method (str) - one of METHODS
+        groups (array-like or list of array-like) - group keys aligned with frame, scores are relative to each group
+    returns:
+        scores (pandas df) - same shape as frame, NaN where the value is missing
+    """
+    method = method.lower()
+    if method not in METHODS:
+        raise ValueError(f"Unknown outlier method '{method}', choose from {METHODS}")
+    frame = frame.astype('float64')
+    values = frame.to_numpy()
+    if method in ('mean', 'median'):
+        centre = _broadcast(frame, method, groups)
+        scores = np.abs(np.round(safe_divide(values, centre, fill=1.0), 2) - 1)
+    elif method == 'zscore':
+        scores = np.abs(safe_divide(values - _broadcast(frame, 'mean', groups), _broadcast(frame, 'std', groups)))
+    else:
+        median = _broadcast(frame, 'median', groups)
+        deviation = pd.DataFrame(np.abs(values - median), index=frame.index, columns=frame.columns)
+        scores = np.abs(safe_divide(values - median, MAD_SCALE * _broadcast(deviation, 'median', groups)))
+    scores[np.isnan(values)] = np.nan
+    return pd.DataFrame(scores, index=frame.index, columns=frame.columns)
+
+
+def _group_keys(df: pd.DataFrame, by):
+    if by is None:
+        return None
+    return [df[column] for column in ([by] if isinstance(by, str) else by)]
+
+
+def outlier_scores(df: pd.DataFrame, columns: List[str], method: str = 'mean', by=None) -> pd.Series:
+    """
+    Desc: Averages the scores of several columns into one score per row
+    Params:
+        df (pandas df)
+        columns (list of str) - e.g. the x and y of a scatter
+        method (str) - one of METHODS
+        by (str or list of str) - score within these groups, e.g. 'gameMode' or ['event', 'gameMode']
+    returns:
+        scores (pandas series) - on df's index
+    """
+    frame = df[list(dict.fromkeys(columns))]
+    return column_scores(frame, method, _group_keys(df, by)).mean(axis=1, skipna=False)
+
+
+def pair_scores(df: pd.DataFrame, pairs: Sequence[Tuple[str, str]], method: str = 'mean', by=None) -> pd.DataFrame:
+    """
+    Desc: Scores many column pairs with a single pass over their columns
+    Params:
+        df (pandas df)
+        pairs (list of (str, str)) - e.g. [('accuracy', 'damage_per_kill'), ('kd', 'hillTime')]
+        method (str) - one of METHODS
+        by (str or list of str) - score within these groups
+    returns:
+        scores (pandas df) - one column per pair, named 'x vs y'
+    """
+    columns = list(dict.fromkeys(column for pair in pairs for column in pair))
+    scores = column_scores(df[columns], method, _group_keys(df, by))
+    return pd.DataFrame({f"{x} vs {y}": (scores[x] + scores[y]) / 2 for x, y in pairs}, index=df.index)
+
+
+def generate_outlier_score(column1: pd.Series, column2: pd.Series, method: str = 'mean',
+                           groups=None) -> np.ndarray:
+    """
+    Desc: Averages the outlier scores of two columns, as used to pick which scatter points get labelled
+    Params:
+        column1, column2 (pandas series)
+        method (str) - one of METHODS
+        groups (array-like or list of array-like) - group keys aligned with the columns
+    returns:
+        scores (numpy array)
+    """
+    frame = pd.concat([column1.reset_index(drop=True), column2.reset_index(drop=True)], axis=1, keys=[0, 1])
+    if groups is not None:
+        groups = [pd.Series(np.asarray(key)) for key in (groups if isinstance(groups, list) else [groups])]
+    return column_scores(frame, method, groups).mean(axis=1, skipna=False).to_numpy()
@@ -0,0 +1,130 @@
+"""
+Renders many figures headlessly across a process pool and writes them to image files.
+
+Each pool worker switches matplotlib to the Agg backend and loads the matches once, when it starts.
+Rendering in the calling process (one worker) leaves its backend and open figures alone.
+Every figure it is then given is drawn from that copy, filtered by the figure's own filters.
+The dataset is warmed in the parent first, so on platforms that fork the workers start from
+the parent's cached copy. Figures whose function, arguments and data slice are unchanged
+are copied from the render cache instead of being drawn.
+"""
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from functools import partial
+from typing import Callable, Dict, List, Optional
+
+from cdl_common.indexed import filter_matches
+from cdl_common.loader import read_in_all_matches, read_indexed_matches
+from cdl_common.render_cache import RENDER_CACHE_DIR, RenderCache, render_cached, save_figure
+
+# Per-process state set up by _load_worker: the plot functions and the indexed matches
+_worker = {}
+
+
+@dataclass
+class FigureSpec:
+    """
+    One figure to render: plots[plot](matches filtered by filters, **kwargs), saved as name
+    """
+    name: str
+    plot: str
+    kwargs: dict = field(default_factory=dict)
+    filters: dict = field(default_factory=dict)
+
+
+@dataclass
+class RenderResult:
+    """
+    The outcome of rendering a single figure
+    """
+    name: str
+    status: str
+    seconds: float
+    path: str = ""
+    error: str = ""
+
+
+def read_specs(path: str) -> List[FigureSpec]:
+    """
+    Reads a JSON list of {"name", "plot", "kwargs", "filters"} objects
+    """
+    with open(path) as file:
+        return [FigureSpec(**spec) for spec in json.load(file)]
+
+
+def _load_worker(plots: Dict[str, Callable], dataset_filters: dict) -> None:
+    _worker['plots'] = plots
+    _worker['matches'] = read_indexed_matches(**dataset_filters)
+
+
+def _init_pool_worker(plots: Dict[str, Callable], dataset_filters: dict) -> None:
+    import matplotlib
+    matplotlib.use('Agg')
+    _load_worker(plots, dataset_filters)
+
+
+def _render(spec: FigureSpec, out_dir: str, fmt: str, dpi: int, cache_dir: Optional[str]) -> RenderResult:
+    start = time.perf_counter()
+    path = os.path.join(out_dir, f"{spec.name}.{fmt}")
+    try:
+        matches = _worker['matches']
+        df = filter_matches(matches, **spec.filters) if spec.filters else matches.df
+        plot = _worker['plots'][spec.plot]
+        if cache_dir:
+            cached = render_cached(plot, df, path, dpi=dpi, cache=RenderCache(cache_dir), **spec.kwargs)
+        else:
+            cached = False
+            save_figure(plot, df, path, dpi, **spec.kwargs)
+    except Exception as error:
+        return RenderResult(spec.name, 'failed', time.perf_counter() - start, error=f"{type(error).__name__}: {error}")
+    return RenderResult(spec.name, 'cached' if cached else 'ok', time.perf_counter() - start, path=path)
+
+
+def render_figures(specs: List[FigureSpec], plots: Dict[str, Callable], out_dir: str = 'figures',
+                   max_workers: Optional[int] = None, fmt: str = 'png', dpi: int = 100,
+                   cache_dir: Optional[str] = RENDER_CACHE_DIR, **dataset_filters) -> List[RenderResult]:
+    """
+    Desc: Renders every spec to out_dir
+    Params:
+        specs (list of FigureSpec)
+        plots (dict) - plot name to a module-level function taking (matches, **kwargs) that returns
+                       its figure, or draws on the current one and returns None
+        out_dir (str)
+        max_workers (int) - processes to render with, defaults to the number of cores
+        fmt (str) - image format, e.g. 'png' or 'svg'
+        dpi (int)
+        cache_dir (str) - render cache to reuse unchanged figures from, None to always draw
+        event, setting, gamemode, map, team, player, opponent (str or list of str) - rows every worker loads
+    returns:
+        results (list of RenderResult) - one per spec, in the same order
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    render = partial(_render, out_dir=out_dir, fmt=fmt, dpi=dpi, cache_dir=cache_dir)
+    workers = min(max_workers or os.cpu_count() or 1, len(specs))
+    if workers <= 1:
+        _load_worker(plots, dataset_filters)
+        return [render(spec) for spec in specs]
+    read_in_all_matches(**dataset_filters)
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_pool_worker,
+                             initargs=(plots, dataset_filters)) as pool:
+        return list(pool.map(render, specs))
+
+
+def print_render_report(results: List[RenderResult], wall_seconds: Optional[float] = None) -> None:
+    """
+    Prints one line per figure, slowest first, followed by a summary
+    """
+    for result in sorted(results, key=lambda result: result.seconds, reverse=True):
+        line = f"{result.name:<40} {result.status:<7} {result.seconds:6.2f}s"
+        if result.error:
+            line += f"  {result.error}"
+        print(line)
+    counts = {status: sum(result.status == status for result in results) for status in ('ok', 'cached', 'failed')}
+    summary = f"{len(results)} figures: {counts['ok']} rendered, {counts['cached']} from cache, {counts['failed']} failed, " \
+              f"{sum(result.seconds for result in results):.2f}s of rendering"
+    if wall_seconds is not None:
+        summary += f" in {wall_seconds:.2f}s"
+    print(summary)
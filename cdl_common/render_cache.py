@@ -0,0 +1,194 @@
+"""
+A content-addressed cache of rendered charts.
+
+A chart's key is a hash of the plotting function's source, its keyword arguments, the exact
+rows and columns it is drawn from, and the output format. The source is every repository file
+reachable through imports from the function's module, so editing a helper it calls, such as
+cdl_helper.head_to_head or shared cdl_common code, also re-renders it. If a chart with that key
+has been rendered before, the image is copied from data/render_cache/ instead of being
+drawn again. Output files whose bytes would not change are left untouched. A data refresh
+therefore re-renders only the charts whose slice of the data changed.
+"""
+import hashlib
+import inspect
+import json
+import os
+import shutil
+import sys
+from functools import lru_cache
+from types import ModuleType
+from typing import Callable, List, Optional
+
+import pandas as pd
+
+from cdl_common.catalog import DATA_DIR, REPO_ROOT
+
+RENDER_CACHE_DIR = os.path.join(DATA_DIR, 'render_cache')
+
+# Bump to invalidate every cached chart, e.g. after upgrading matplotlib
+CACHE_VERSION = 1
+
+
+def _repo_source(module: ModuleType) -> Optional[str]:
+    path = getattr(module, '__file__', None)
+    if not path or not path.endswith('.py'):
+        return None
+    path = os.path.abspath(path)
+    if not path.startswith(REPO_ROOT + os.sep) or 'site-packages' in path:
+        return None
+    return path
+
+
+@lru_cache(maxsize=None)
+def _module_sources(module_name: str) -> List[str]:
+    """
+    The source files of a module and of every repository module it reaches through its globals
+    """
+    sources = {}
+    pending = [sys.modules[module_name]]
+    while pending:
+        module = pending.pop()
+        path = _repo_source(module)
+        if path is None or path in sources:
+            continue
+        sources[path] = module
+        for value in list(vars(module).values()):
+            if inspect.ismodule(value):
+                pending.append(value)
+            elif inspect.isfunction(value) or inspect.isclass(value):
+                owner = sys.modules.get(getattr(value, '__module__', None) or '')
+                if owner is not None:
+                    pending.append(owner)
+    return sorted(sources)
+
+
+def function_fingerprint(function: Callable) -> str:
+    """
+    Hashes the name of function (unwrapping functools.partial) and the source of every repository module
+    it can reach, so editing the function or anything it calls re-renders
+    """
+    digest = hashlib.sha256()
+    while hasattr(function, 'func'):
+        digest.update(repr((function.args, sorted(function.keywords.items()))).encode())
+        function = function.func
+    digest.update(f"{function.__module__}.{function.__qualname__}".encode())
+    sources = _module_sources(function.__module__) if function.__module__ in sys.modules else []
+    for path in sources:
+        digest.update(os.path.relpath(path, REPO_ROOT).encode())
+        with open(path, 'rb') as file:
+            digest.update(file.read())
+    return digest.hexdigest()
+
+
+def frame_fingerprint(df: pd.DataFrame) -> str:
+    """
+    Hashes the values, column names and dtypes of df, ignoring its index
+    """
+    digest = hashlib.sha256()
+    digest.update(json.dumps([[str(column), str(dtype)] for column, dtype in df.dtypes.items()]).encode())
+    try:
+        rows = pd.util.hash_pandas_object(df, index=False)
+    except TypeError:
+        rows = pd.util.hash_pandas_object(df.astype(str), index=False)
+    digest.update(rows.to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def render_key(function: Callable, kwargs: dict, df: pd.DataFrame, fmt: str, dpi: int) -> str:
+    """
+    Desc: The cache key of one chart
+    Params:
+        function (callable) - the plotting function
+        kwargs (dict) - the keyword arguments it is called with
+        df (pandas df) - the rows it draws from
+        fmt (str), dpi (int) - output settings
+    """
+    digest = hashlib.sha256()
+    digest.update(json.dumps([CACHE_VERSION, fmt, dpi, function_fingerprint(function), frame_fingerprint(df),
+                              json.dumps(kwargs, sort_keys=True, default=repr)]).encode())
+    return digest.hexdigest()
+
+
+def _same_file(path_a: str, path_b: str) -> bool:
+    if not os.path.exists(path_b) or os.path.getsize(path_a) != os.path.getsize(path_b):
+        return False
+    with open(path_a, 'rb') as file_a, open(path_b, 'rb') as file_b:
+        return file_a.read() == file_b.read()
+
+
+class RenderCache:
+    """
+    Desc: Rendered images stored by key under root
+    Params:
+        root (str)
+    """
+    def __init__(self, root: str = RENDER_CACHE_DIR) -> None:
+        self.root = root
+
+    def path(self, key: str, fmt: str) -> str:
+        return os.path.join(self.root, key[:2], f"{key}.{fmt}")
+
+    def fetch(self, key: str, fmt: str, out_path: str) -> bool:
+        """
+        Copies the cached image for key to out_path, returning False if there is none
+        """
+        cached = self.path(key, fmt)
+        if not os.path.exists(cached):
+            return False
+        if not _same_file(cached, out_path):
+            shutil.copyfile(cached, out_path)
+        return True
+
+    def store(self, key: str, fmt: str, rendered_path: str) -> None:
+        cached = self.path(key, fmt)
+        os.makedirs(os.path.dirname(cached), exist_ok=True)
+        temp_path = f"{cached}.tmp{os.getpid()}"
+        shutil.copyfile(rendered_path, temp_path)
+        os.replace(temp_path, cached)
+
+
+def save_figure(plot: Callable, df: pd.DataFrame, out_path: str, dpi: int = 100, **kwargs) -> None:
+    """
+    Desc: Draws plot(df, **kwargs) and saves it to out_path, closing only the figures it opened, so the
+          caller's backend and open figures (e.g. in a notebook) are left as they were
+    Params:
+        plot (callable) - returns its figure, or draws on the current one and returns None
+        df (pandas df)
+        out_path (str)
+        dpi (int)
+    """
+    import matplotlib.pyplot as plt
+
+    before = set(plt.get_fignums())
+    try:
+        with plt.ioff():
+            # A fresh current figure, so a plot that draws on the current one never draws on the caller's
+            plt.figure()
+            fig = plot(df, **kwargs) or plt.gcf()
+            fig.savefig(out_path, dpi=dpi, bbox_inches='tight')
+    finally:
+        for number in set(plt.get_fignums()) - before:
+            plt.close(number)
+
+
+def render_cached(plot: Callable, df: pd.DataFrame, out_path: str, dpi: int = 100,
+                  cache: Optional[RenderCache] = None, **kwargs) -> bool:
+    """
+    Desc: Saves plot(df, **kwargs) to out_path, from the cache when the same chart has been rendered before
+    Params:
+        plot (callable) - returns its figure, or draws on the current one and returns None
+        df (pandas df) - the rows to draw
+        out_path (str) - the image format is taken from its extension
+        dpi (int)
+        cache (RenderCache) - defaults to data/render_cache/
+    returns:
+        cached (bool) - True if the image came from the cache
+    """
+    cache = cache or RenderCache()
+    fmt = os.path.splitext(out_path)[1].lstrip('.') or 'png'
+    key = render_key(plot, kwargs, df, fmt, dpi)
+    if cache.fetch(key, fmt, out_path):
+        return True
+    save_figure(plot, df, out_path, dpi, **kwargs)
+    cache.store(key, fmt, out_path)
+    return False
@@ -0,0 +1,166 @@
+"""
+A materialized cube of stat totals keyed by player, team, opponent, map, mode, event and setting.
+
+Each cell holds the sums of STATS plus the player-maps played and won for one combination of
+DIMENSIONS. Any rollup over a subset of the dimensions, and any ratio of sums such as K/D or
+accuracy, is answered from the cells without reading the player-map rows again. The cube
+is kept in data/rollups/ and update_rollups folds in newly scraped matches incrementally,
+rebuilding only when a csv it already counted has changed.
+"""
+import json
+import os
+from typing import Dict, List, NamedTuple, Optional
+
+import pandas as pd
+
+from cdl_common.catalog import DATA_DIR, read_catalog
+from cdl_common.csv_loader import read_match_frames
+from cdl_common.features import match_features, safe_divide
+from cdl_common.filters import match_filters
+from cdl_common.match_store import source_mtimes
+
+CUBE_DIR = os.path.join(DATA_DIR, 'rollups')
+
+DIMENSIONS = ['alias', 'abbrev', 'oppo_abbrev', 'gameMap', 'gameMode', 'event', 'setting']
+STATS = ['totalKills', 'totalDeaths', 'totalAssists', 'totalDamageDealt', 'totalShotsHit', 'totalShotsFired',
+         'tradedKills', 'untradedKills', 'tradedDeaths', 'untradedDeaths', 'totalRotationKills',
+         'totalFirstBloodKills', 'hillTime']
+# Player-map rows, so a team's 'maps' is four times the maps it played
+COUNTS = ['maps', 'map_wins']
+
+
+class Ratio(NamedTuple):
+    numerator: str
+    denominator: str
+    scale: float = 1.0
+
+
+RATIOS: Dict[str, Ratio] = {
+    'kd': Ratio('totalKills', 'totalDeaths'),
+    'accuracy': Ratio('totalShotsHit', 'totalShotsFired', 100),
+    'damage_per_kill': Ratio('totalDamageDealt', 'totalKills'),
+    'kills_untraded_perc': Ratio('untradedKills', 'totalKills', 100),
+    'deaths_traded_perc': Ratio('tradedDeaths', 'totalDeaths', 100),
+    'rot_kill_perc': Ratio('totalRotationKills', 'totalKills', 100),
+    'fb_perc': Ratio('totalFirstBloodKills', 'totalKills', 100),
+    'kills_per_map': Ratio('totalKills', 'maps'),
+    'damage_per_map': Ratio('totalDamageDealt', 'maps'),
+    'win_perc': Ratio('map_wins', 'maps', 100),
+}
+
+
+def rollup_cells(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Desc: Sums player-map rows into cube cells
+    Params:
+        df (pandas df) - match rows with the DIMENSIONS, STATS and map score columns
+    returns:
+        cells (pandas df) - one row per combination of DIMENSIONS
+    """
+    df = df.assign(maps=1, map_wins=(match_features(df, ['is_winner'])['is_winner'] == 'Y').astype('int64'))
+    return df.groupby(DIMENSIONS, observed=True, dropna=False)[STATS + COUNTS].sum().reset_index()
+
+
+class RollupCube:
+    """
+    Desc: Cube cells plus the csv modification time of every match counted in them
+    Params:
+        cells (pandas df) - from rollup_cells
+        sources (dict) - match ID (str) to csv mtime, as from match_store.source_mtimes
+    """
+    def __init__(self, cells: Optional[pd.DataFrame] = None, sources: Optional[dict] = None) -> None:
+        self.cells = cells if cells is not None else pd.DataFrame(columns=DIMENSIONS + STATS + COUNTS)
+        self.sources = sources or {}
+
+    def ingest(self, df: pd.DataFrame, sources: dict) -> None:
+        """
+        Adds the rows of matches that are not in the cube yet, recording their csv mtimes in sources
+        """
+        new_cells = rollup_cells(df)
+        cells = new_cells if self.cells.empty else pd.concat([self.cells, new_cells], ignore_index=True)
+        self.cells = cells.groupby(DIMENSIONS, observed=True, dropna=False)[STATS + COUNTS].sum().reset_index()
+        self.sources.update(sources)
+
+    def query(self, by=None, stats: Optional[List[str]] = None, ratios: Optional[List[str]] = None,
+              **filters) -> pd.DataFrame:
+        """
+        Desc: Rolls the cube up to the by dimensions
+        Params:
+            by (str or list of str) - dimensions to keep, e.g. ['alias', 'abbrev'], defaults to one grand total
+            stats (list of str) - STATS and COUNTS to return, defaults to all
+            ratios (list of str) - RATIOS to compute from the summed stats, defaults to all
+            event, setting, gamemode, map, team, player (str or list of str) - cells to include,
+                e.g. cube.query('abbrev', ratios=['kd'], gamemode='CDL Hardpoint', event='M3Event')
+        returns:
+            rollup (pandas df) - one row per by group, ratios are NaN where the denominator is 0
+        """
+        by = [by] if isinstance(by, str) else list(by or [])
+        unknown = [name for name in by if name not in DIMENSIONS] + \
+                  [name for name in (ratios or []) if name not in RATIOS]
+        if unknown:
+            raise ValueError(f"Unknown dimensions or ratios {unknown}, choose from {DIMENSIONS} and {list(RATIOS)}")
+        stats = STATS + COUNTS if stats is None else list(stats)
+        ratios = list(RATIOS) if ratios is None else list(ratios)
+
+        cells = self.cells
+        for column, values in match_filters(**filters).items():
+            cells = cells[cells[column].isin(values)]
+        needed = list(dict.fromkeys(stats + [column for name in ratios for column in RATIOS[name][:2]]))
+        if by:
+            totals = cells.groupby(by, dropna=False)[needed].sum().reset_index()
+        else:
+            totals = cells[needed].sum().to_frame().T
+        for name in ratios:
+            numerator, denominator, scale = RATIOS[name]
+            totals[name] = safe_divide(totals[numerator], totals[denominator], fill=float('nan')) * scale
+        return totals[by + stats + ratios]
+
+    def save(self, cube_dir: str = CUBE_DIR) -> None:
+        os.makedirs(cube_dir, exist_ok=True)
+        self.cells.to_parquet(os.path.join(cube_dir, 'cube.parquet'), index=False)
+        temp_path = os.path.join(cube_dir, '_cube.json.tmp')
+        with open(temp_path, 'w') as file:
+            json.dump({'sources': self.sources}, file)
+        os.replace(temp_path, os.path.join(cube_dir, '_cube.json'))
+
+    @classmethod
+    def load(cls, cube_dir: str = CUBE_DIR) -> 'RollupCube':
+        """
+        Returns the saved cube, or an empty one if none has been saved
+        """
+        metadata_path = os.path.join(cube_dir, '_cube.json')
+        if not os.path.exists(metadata_path):
+            return cls()
+        with open(metadata_path) as file:
+            sources = json.load(file)['sources']
+        return cls(pd.read_parquet(os.path.join(cube_dir, 'cube.parquet')), sources)
+
+
+def update_rollups(cube_dir: str = CUBE_DIR, data_dir: str = DATA_DIR) -> RollupCube:
+    """
+    Desc: Loads the saved cube and brings it up to date with the catalog. New matches are read
+          and added to the existing cells; if a counted csv changed or left the catalog the
+          cube is rebuilt from scratch
+    Params:
+        cube_dir (str)
+        data_dir (str)
+    returns:
+        cube (RollupCube)
+    """
+    catalog = read_catalog()
+    current = source_mtimes(catalog, data_dir)
+    cube = RollupCube.load(cube_dir)
+    if any(current.get(match_id) != mtime for match_id, mtime in cube.sources.items()):
+        cube = RollupCube()
+    new_entries = [entry for entry in catalog if str(entry.match_id) in current and str(entry.match_id) not in cube.sources]
+    if not new_entries:
+        return cube
+
+    frames = read_match_frames([entry.match_id for entry in new_entries], data_dir=data_dir)
+    for frame, entry in zip(frames, new_entries):
+        frame['event'] = entry.event
+        frame['setting'] = entry.setting
+    cube.ingest(pd.concat(frames, ignore_index=True),
+                {str(entry.match_id): current[str(entry.match_id)] for entry in new_entries})
+    cube.save(cube_dir)
+    return cube
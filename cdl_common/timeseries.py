@@ -0,0 +1,157 @@
+"""
+Running, rolling-window and exponentially weighted stats per player or team, series by series
+through the season.
+
+Each player's (or team's) maps in a series are summed into one step, and steps are ordered by
+matchDate and then match ID. The engine keeps running sums, a ring buffer of the last `window`
+steps and exponentially decayed sums for every player. append only walks the new steps, so
+adding a match costs its own rows. Updates are vectorized across players, one pass per step
+position, so the whole league's trajectories come out of the same few array operations.
+Ratios such as kd are ratios of the summed stats, plain stats are means per series.
+"""
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from cdl_common.features import match_features, safe_divide
+from cdl_common.rollups import RATIOS, Ratio
+
+ENTITY_KEYS = {'player': ['abbrev', 'alias'], 'team': ['abbrev']}
+SERIES_KEY = 'matchGame.matchId'
+KINDS = ('expanding', 'rolling', 'ewm')
+# Carried from each series' first row; 'event' is only in loaded frames, not in read_in_list csvs
+SERIES_COLUMNS = ['matchDate', 'event', 'oppo_abbrev']
+
+
+class TimeSeriesEngine:
+    """
+    Desc: Per-series trajectories of stats for every player or team
+    Params:
+        by (str) - 'player' or 'team'
+        stats (list of str) - names from rollups.RATIOS (e.g. 'kd', 'accuracy') or any summable column
+        window (int) - series in the rolling window
+        alpha (float) - smoothing factor of the exponentially weighted stats, larger reacts faster
+    """
+    def __init__(self, by: str = 'player', stats: Optional[List[str]] = None, window: int = 5,
+                 alpha: float = 0.3) -> None:
+        if by not in ENTITY_KEYS:
+            raise ValueError(f"by must be one of {list(ENTITY_KEYS)}")
+        self.keys = ENTITY_KEYS[by]
+        self.stats = list(stats or ['kd'])
+        self.window = window
+        self.alpha = alpha
+        self.ratios: Dict[str, Ratio] = {stat: RATIOS.get(stat, Ratio(stat, 'series')) for stat in self.stats}
+        self.columns = list(dict.fromkeys(column for ratio in self.ratios.values() for column in ratio[:2]))
+
+        self.entities: Dict[tuple, int] = {}
+        self.steps = np.zeros(0, dtype='int64')
+        self.running = np.zeros((0, len(self.columns)))
+        self.decayed = np.zeros((0, len(self.columns)))
+        self.ring = np.zeros((0, window, len(self.columns)))
+        self.seen = set()
+        self._frames: List[pd.DataFrame] = []
+
+    def _grow(self, count: int) -> None:
+        width = len(self.columns)
+        self.steps = np.concatenate([self.steps, np.zeros(count, dtype='int64')])
+        self.running = np.vstack([self.running, np.zeros((count, width))])
+        self.decayed = np.vstack([self.decayed, np.zeros((count, width))])
+        self.ring = np.concatenate([self.ring, np.zeros((count, self.window, width))])
+
+    def _series(self, df: pd.DataFrame) -> pd.DataFrame:
+        df = df.assign(series=1, maps=1)
+        if 'map_wins' in self.columns:
+            df['map_wins'] = (match_features(df, ['is_winner'])['is_winner'] == 'Y').astype('int64')
+        keys = self.keys + [SERIES_KEY]
+        summed = [column for column in self.columns if column != 'series']
+        grouped = df.groupby(keys, observed=True, sort=False)
+        series = grouped[summed].sum()
+        series['series'] = 1
+        carried = [column for column in SERIES_COLUMNS if column in df.columns]
+        series[carried] = grouped[carried].first()
+        series = series.reset_index()
+        series = series[[(tuple(key), match_id) not in self.seen for key, match_id in
+                         zip(series[self.keys].itertuples(index=False), series[SERIES_KEY])]]
+        return series.sort_values(['matchDate', SERIES_KEY], kind='stable').reset_index(drop=True)
+
+    def append(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Desc: Adds the series in df that have not been seen yet and returns their new trajectory rows
+        Params:
+            df (pandas df) - player-map rows, e.g. from read_in_list(new_ids)
+        returns:
+            rows (pandas df) - one row per player (or team) per new series, with '{stat}', '{stat}_rolling'
+                               and '{stat}_ewm' columns, and 'event' NaN if df has no event column
+        """
+        series = self._series(df)
+        if series.empty:
+            return series
+        entity_keys = [tuple(key) for key in series[self.keys].itertuples(index=False)]
+        new = [key for key in dict.fromkeys(entity_keys) if key not in self.entities]
+        for key in new:
+            self.entities[key] = len(self.entities)
+        self._grow(len(new))
+        entity = np.array([self.entities[key] for key in entity_keys])
+        position = series.groupby(entity).cumcount().to_numpy()
+        values = series[self.columns].to_numpy(dtype='float64')
+
+        running = np.empty_like(values)
+        rolling = np.empty_like(values)
+        decayed = np.empty_like(values)
+        steps = np.empty(len(series), dtype='int64')
+        for step in range(position.max() + 1):
+            rows = np.flatnonzero(position == step)
+            idx = entity[rows]
+            self.running[idx] += values[rows]
+            self.decayed[idx] = (1 - self.alpha) * self.decayed[idx] + values[rows]
+            self.ring[idx, self.steps[idx] % self.window] = values[rows]
+            self.steps[idx] += 1
+            steps[rows] = self.steps[idx]
+            running[rows] = self.running[idx]
+            decayed[rows] = self.decayed[idx]
+            rolling[rows] = self.ring[idx].sum(axis=1)
+
+        out = series.reindex(columns=self.keys + [SERIES_KEY] + SERIES_COLUMNS)
+        out['step'] = steps
+        for stat, (numerator, denominator, scale) in self.ratios.items():
+            n, d = self.columns.index(numerator), self.columns.index(denominator)
+            for suffix, sums in (('', running), ('_rolling', rolling), ('_ewm', decayed)):
+                out[stat + suffix] = safe_divide(sums[:, n], sums[:, d], fill=np.nan) * scale
+        self.seen.update(zip(entity_keys, series[SERIES_KEY]))
+        self._frames.append(out)
+        return out
+
+    def frame(self) -> pd.DataFrame:
+        """
+        Every trajectory row appended so far, in the order the series were played
+        """
+        if not self._frames:
+            return pd.DataFrame()
+        self._frames = [pd.concat(self._frames, ignore_index=True)]
+        return self._frames[0]
+
+    def trajectories(self, stat: str, kind: str = 'expanding') -> pd.DataFrame:
+        """
+        Desc: Every player's (or team's) trajectory of one stat as one table
+        Params:
+            stat (str)
+            kind (str) - 'expanding' (season to date), 'rolling' or 'ewm'
+        returns:
+            trajectories (pandas df) - one row per player or team, one column per series they played
+                                       (1, 2, ...), NaN after their last series. Plot with .T.plot()
+        """
+        if kind not in KINDS:
+            raise ValueError(f"kind must be one of {KINDS}")
+        column = stat if kind == 'expanding' else f"{stat}_{kind}"
+        return self.frame().pivot(index=self.keys, columns='step', values=column)
+
+
+def build_time_series(df: pd.DataFrame, by: str = 'player', stats: Optional[List[str]] = None,
+                      window: int = 5, alpha: float = 0.3) -> TimeSeriesEngine:
+    """
+    Desc: Builds an engine from a full match frame, e.g. read_in_all_matches()
+    """
+    engine = TimeSeriesEngine(by, stats, window, alpha)
+    engine.append(df)
+    return engine
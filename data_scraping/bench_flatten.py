@@ -0,0 +1,88 @@
+"""
+Benchmarks flatten_match against the old per-player DataFrame/concat parser.
+
+Runs over every response in the raw response store (see response_store.py), checks
+both parsers give the same frame and prints the per-match parse time of each.
+Run from the repository root after at least one online scrape:
+    python data_scraping/bench_flatten.py
+"""
+import statistics
+import sys
+import time
+
+import pandas as pd
+
+from cdl_scraper import parse_match_response
+from response_store import ResponseStore
+
+
+def legacy_parse_player(data: pd.DataFrame, player_num: str, team_type: str, abbrev: str, team_abbrev: str, team_id: str) -> pd.DataFrame:
+    if not data.shape[1]:
+        return pd.DataFrame()
+    parsed_stats = pd.DataFrame(data['stats'][player_num], index=[0])
+    parsed_stats["team_type"] = [team_type]
+    parsed_stats["oppo_abbrev"]= [abbrev]
+    parsed_stats["abbrev"]= [team_abbrev]
+    parsed_stats['team_id'] = [team_id]
+    full_team_map = data.merge(parsed_stats, on='id', how='inner').drop("stats", axis=1)
+    return full_team_map
+
+
+def legacy_parse_match_response(response: dict) -> pd.DataFrame:
+    """
+    The parser as it was before flatten_match, kept only for this benchmark
+    """
+    complete_match_df = pd.DataFrame()
+    host_abrv = response['data']['matchData']['matchExtended']['homeTeamCard']['abbreviation']
+    guest_abrv = response['data']['matchData']['matchExtended']['awayTeamCard']['abbreviation']
+    home_id = response['data']['matchData']['matchExtended']['homeTeamCard']['id']
+    guest_id = response['data']['matchData']['matchExtended']['awayTeamCard']['id']
+    date = response['data']['updatedAt']
+    for i in range(len(response['data']['matchData']['matchStats']['matches']['hostTeam'])):
+        host_md = pd.DataFrame(response['data']['matchData']['matchStats']['matches']['hostTeam'][i])
+        guest_md = pd.DataFrame(response['data']['matchData']['matchStats']['matches']['guestTeam'][i])
+        for player in range(4):
+            complete_match_df = pd.concat([complete_match_df, legacy_parse_player(host_md, player_num=player, team_type="host", abbrev=guest_abrv, team_abbrev=host_abrv, team_id = home_id)])
+            complete_match_df = pd.concat([complete_match_df, legacy_parse_player(guest_md, player_num=player, team_type="guest",abbrev=host_abrv, team_abbrev=guest_abrv, team_id = guest_id)])
+    match_info = pd.json_normalize(response['data']['matchData']['matchGamesExtended'])
+    match_info.rename(columns={"matchGame.mode": "gameMode",
+                                "matchGame.map": "gameMap"}, inplace=True)
+    joined = complete_match_df.merge(match_info, how='left', on=["gameMode", "gameMap"])
+    for i in response['data']['matchData']['matchExtended']['result']:
+         joined[i] = response['data']['matchData']['matchExtended']['result'][i]
+    joined['matchDate'] = date
+    return joined
+
+
+def time_parser(parser, responses: list, repeats: int) -> list:
+    """
+    Returns the best of repeats timings for each response, in milliseconds
+    """
+    timings = []
+    for response in responses:
+        best = float('inf')
+        for _ in range(repeats):
+            start = time.perf_counter()
+            parser(response)
+            best = min(best, time.perf_counter() - start)
+        timings.append(best * 1000)
+    return timings
+
+
+if __name__ == '__main__':
+    store = ResponseStore(sys.argv[1] if len(sys.argv) > 1 else 'data/raw')
+    responses = [store.get(match_id) for match_id in store.match_ids()]
+    if not responses:
+        sys.exit("The response store is empty, run cdl_scraper.py first")
+
+    for response in responses:
+        pd.testing.assert_frame_equal(legacy_parse_match_response(response), parse_match_response(response),
+                                      check_dtype=False, check_like=True)
+
+    legacy = time_parser(legacy_parse_match_response, responses, repeats=3)
+    new = time_parser(parse_match_response, responses, repeats=3)
+    print(f"{len(responses)} matches, per-match parse time (ms)")
+    print(f"{'':>8} {'mean':>9} {'median':>9} {'total':>10}")
+    for name, timings in (('before', legacy), ('after', new)):
+        print(f"{name:>8} {statistics.mean(timings):9.2f} {statistics.median(timings):9.2f} {sum(timings):10.1f}")
+    print(f"speedup: {sum(legacy) / sum(new):.1f}x")
@@ -1,36 +1,19 @@
-import requests
+import argparse
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Tuple
+
 import pandas as pd
-import os
-
-def parse_player(data: pd.DataFrame, player_num: str, team_type: str, abbrev: str, team_abbrev: str, team_id: str) -> pd.DataFrame:
-        """
-        Desc: A function to parse each player from a map/series
-        Params:
-            data (df)
-            player_num (str)
-            team_type (str) - host or guest team
-            abbrev (str) - the opposing teams abbreviation
-            team_abbrev (str) - the player's teams abbreviation
-        returns:
-            full_team_map (df)
-        """
-        if not data.shape[1]:
-            return pd.DataFrame()
-        parsed_stats = pd.DataFrame(data['stats'][player_num], index=[0])
-        parsed_stats["team_type"] = [team_type]
-        parsed_stats["oppo_abbrev"]= [abbrev]
-        parsed_stats["abbrev"]= [team_abbrev]
-        parsed_stats['team_id'] = [team_id]
-        full_team_map = data.merge(parsed_stats, on='id', how='inner').drop("stats", axis=1)
-        return full_team_map
-
-
-def parse_cdl_website(matchID, save: bool =True):
-
-    url = 'https://cdl-other-services.abe-arsfutura.com/production/v2/content-types/match-detail/bltd79e337aca601012?options={"id":' + str(matchID) + '}'
-
-    # Dummy headers must be created to simulate the CDL website
-    cdl_headers = {
+
+from manifest import ScrapeManifest
+from response_store import ResponseStore
+from scrape_engine import ScrapeClient, ScrapeResult, print_report, scrape_matches
+
+MATCH_DETAIL_URL = 'https://cdl-other-services.abe-arsfutura.com/production/v2/content-types/match-detail/bltd79e337aca601012?options={"id":%s}'
+
+# Dummy headers must be created to simulate the CDL website
+cdl_headers = {
     "Host": "cdl-other-services.abe-arsfutura.com",
     "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:109.0) Gecko/20100101 Firefox/110.0",
     "Accept": "*/*",
@@ -45,37 +28,247 @@ def parse_cdl_website(matchID, save: bool =True):
     "Sec-Fetch-Site": "cross-site",
     "TE": "trailers"}
 
-    response = requests.get(url, headers=cdl_headers).json()
-    complete_match_df = pd.DataFrame()
-    host_abrv = response['data']['matchData']['matchExtended']['homeTeamCard']['abbreviation']
-    guest_abrv = response['data']['matchData']['matchExtended']['awayTeamCard']['abbreviation']
-    home_id = response['data']['matchData']['matchExtended']['homeTeamCard']['id']
-    guest_id = response['data']['matchData']['matchExtended']['awayTeamCard']['id']
+def flatten_dict(data: dict, prefix: str = '') -> dict:
+    """
+    Flattens nested dicts into one level with '.' separated keys, the same way pd.json_normalize does
+    """
+    flat = {}
+    for key, value in data.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten_dict(value, f"{name}."))
+        else:
+            flat[name] = value
+    return flat
+
+
+def flatten_player(player: dict, team_type: str, abbrev: str, team_abbrev: str, team_id) -> dict:
+    """
+    Desc: Flattens one player from a map into a single record
+    Params:
+        player (dict) - the player's entry in hostTeam/guestTeam, including its stats
+        team_type (str) - host or guest team
+        abbrev (str) - the opposing teams abbreviation
+        team_abbrev (str) - the player's teams abbreviation
+        team_id (int)
+    returns:
+        record (dict)
+    """
+    record = {key: value for key, value in player.items() if key != 'stats'}
+    for key, value in player['stats'].items():
+        if key != 'id':
+            record[key] = value
+    record['team_type'] = team_type
+    record['oppo_abbrev'] = abbrev
+    record['abbrev'] = team_abbrev
+    record['team_id'] = team_id
+    return record
+
+
+def flatten_match(response: dict) -> Tuple[List[dict], List[str]]:
+    """
+    Desc: Walks matchStats.matches.hostTeam/guestTeam and emits one record per player per map,
+          joined with that map's game info and the series result
+    Params:
+        response (dict) - a match-detail response
+    returns:
+        records (list of dict)
+        columns (list of str) - player columns, then game columns, then the result, in first-seen order
+    """
+    match_data = response['data']['matchData']
+    extended = match_data['matchExtended']
+    host_abrv = extended['homeTeamCard']['abbreviation']
+    guest_abrv = extended['awayTeamCard']['abbreviation']
+    home_id = extended['homeTeamCard']['id']
+    guest_id = extended['awayTeamCard']['id']
+    result = extended['result'] or {}
     date = response['data']['updatedAt']
-    for i in range(len(response['data']['matchData']['matchStats']['matches']['hostTeam'])):
-        host_md = pd.DataFrame(response['data']['matchData']['matchStats']['matches']['hostTeam'][i])
-        guest_md = pd.DataFrame(response['data']['matchData']['matchStats']['matches']['guestTeam'][i])
-        for player in range(4):
-            complete_match_df = pd.concat([complete_match_df, parse_player(host_md, player_num=player, team_type="host", abbrev=guest_abrv, team_abbrev=host_abrv, team_id = home_id)])
-            complete_match_df = pd.concat([complete_match_df, parse_player(guest_md, player_num=player, team_type="guest",abbrev=host_abrv, team_abbrev=guest_abrv, team_id = guest_id)])
-    match_info = pd.json_normalize(response['data']['matchData']['matchGamesExtended'])
-    match_info.rename(columns={"matchGame.mode": "gameMode",
-                                "matchGame.map": "gameMap"}, inplace=True)
-    joined = complete_match_df.merge(match_info, how='left', on=["gameMode", "gameMap"])
-    for i in response['data']['matchData']['matchExtended']['result']:
-         joined[i] = response['data']['matchData']['matchExtended']['result'][i]
-    joined['matchDate'] = date
+
+    games = {}
+    game_columns = {}
+    for game in match_data['matchGamesExtended']:
+        game_info = flatten_dict(game)
+        key = (game_info.pop('matchGame.mode', None), game_info.pop('matchGame.map', None))
+        games.setdefault(key, []).append(game_info)
+        game_columns.update(dict.fromkeys(game_info))
+
+    players = []
+    player_columns = {}
+    for host_team, guest_team in zip(match_data['matchStats']['matches']['hostTeam'],
+                                     match_data['matchStats']['matches']['guestTeam']):
+        for player in range(max(len(host_team), len(guest_team))):
+            if player < len(host_team):
+                players.append(flatten_player(host_team[player], "host", guest_abrv, host_abrv, home_id))
+                player_columns.update(dict.fromkeys(players[-1]))
+            if player < len(guest_team):
+                players.append(flatten_player(guest_team[player], "guest", host_abrv, guest_abrv, guest_id))
+                player_columns.update(dict.fromkeys(players[-1]))
+
+    records = []
+    for record in players:
+        for game_info in games.get((record.get('gameMode'), record.get('gameMap')), [{}]):
+            row = {**record, **game_info, **result}
+            row['matchDate'] = date
+            records.append(row)
+    columns = {**player_columns, **game_columns, **dict.fromkeys(result), 'matchDate': None}
+    return records, list(columns)
+
+
+def match_csv_path(matchID) -> str:
+    return f"data/cdl_{matchID}.csv"
+
+
+def fetch_match(matchID, client: Optional[ScrapeClient] = None) -> dict:
+    """
+    Desc: Downloads the raw match-detail json for a match from the CDL website
+    Params:
+        matchID (int)
+        client (ScrapeClient) - shared session to make the request with, a new one is made if not given
+    returns:
+        response (dict)
+    """
+    client = client or ScrapeClient(max_connections=1)
+    return client.get_json(MATCH_DETAIL_URL % matchID, headers=cdl_headers)
+
+
+def parse_match_response(response: dict) -> pd.DataFrame:
+    """
+    Desc: Flattens a match-detail response to one row per player per map
+    Params:
+        response (dict)
+    returns:
+        joined (df)
+    """
+    records, columns = flatten_match(response)
+    return pd.DataFrame(records, columns=columns)
+
+
+def parse_cdl_website(matchID, save: bool =True, client: Optional[ScrapeClient] = None,
+                      offline: bool = False, store: Optional[ResponseStore] = None) -> pd.DataFrame:
+    """
+    Desc: Downloads a match from the CDL website and flattens it to one row per player per map
+    Params:
+        matchID (int)
+        save (bool) - write the result to data/cdl_{matchID}.csv
+        client (ScrapeClient) - shared session to make the request with, a new one is made if not given
+        offline (bool) - read the raw response from the store instead of the network
+        store (ResponseStore) - where raw responses are kept, online responses are added to it if given
+    returns:
+        joined (df)
+    """
+    if offline:
+        response = (store or ResponseStore()).get(matchID)
+    else:
+        response = fetch_match(matchID, client)
+        if store is not None:
+            store.put(matchID, response)
+    joined = parse_match_response(response)
     if save:
-        joined.to_csv(f"data/cdl_{matchID}.csv", index=False)
+        joined.to_csv(match_csv_path(matchID), index=False)
     return joined
 
 
-df = pd.read_json('major_ids.json')
-for i in df.keys():
-    for j in df[i].keys():
-        for id in df[i][j]:
-            try:
-                parse_cdl_website(int(id))
-            except:
-             pass
+def scrape_match(matchID, client: ScrapeClient, manifest: ScrapeManifest, store: ResponseStore,
+                 force: bool = False) -> Optional[int]:
+    """
+    Desc: Scrapes a single match unless the manifest shows there is nothing new to fetch
+    Params:
+        matchID (int)
+        client (ScrapeClient)
+        manifest (ScrapeManifest)
+        store (ResponseStore) - every fetched response is kept here
+        force (bool) - fetch and rewrite the match even if it is complete and unchanged
+    returns:
+        rows (int) - rows written, or None if the match was skipped
+    """
+    if not force and manifest.should_skip(matchID):
+        return None
+    response = fetch_match(matchID, client)
+    store.put(matchID, response)
+    if not force and manifest.is_unchanged(matchID, response):
+        manifest.record(matchID, response, match_csv_path(matchID))
+        return None
+    joined = parse_match_response(response)
+    joined.to_csv(match_csv_path(matchID), index=False)
+    manifest.record(matchID, response, match_csv_path(matchID))
+    return len(joined)
+
+
+def read_major_ids(path: str = 'major_ids.json') -> List[int]:
+    """
+    Returns every match ID in major_ids.json, in file order and without duplicates
+    """
+    df = pd.read_json(path)
+    ids = []
+    for i in df.keys():
+        for j in df[i].keys():
+            ids.extend(int(id) for id in df[i][j])
+    return list(dict.fromkeys(ids))
+
+
+def scrape_all(match_ids: List[int], max_workers: int = 8, rate_per_host: float = 8.0,
+               manifest_path: str = 'data/scrape_manifest.json', store_root: str = 'data/raw',
+               force: bool = False) -> list:
+    """
+    Desc: Scrapes and saves every new or in-progress match concurrently over one pooled session
+    Params:
+        match_ids (list of int)
+        max_workers (int) - threads and pooled connections to use
+        rate_per_host (float) - requests per second sent to the CDL API
+        manifest_path (str) - where the record of previously scraped matches is kept
+        store_root (str) - where raw responses are kept for offline rebuilds
+        force (bool) - re-scrape every match regardless of the manifest
+    returns:
+        results (list of ScrapeResult)
+    """
+    client = ScrapeClient(max_connections=max_workers, rate_per_host=rate_per_host)
+    manifest = ScrapeManifest(manifest_path)
+    store = ResponseStore(store_root)
+    try:
+        return scrape_matches(match_ids, lambda match_id: scrape_match(match_id, client, manifest, store, force),
+                              max_workers=max_workers)
+    finally:
+        store.save()
+        manifest.save()
+
+
+def _rebuild_match(job) -> ScrapeResult:
+    store_root, matchID = job
+    start = time.perf_counter()
+    try:
+        joined = parse_cdl_website(matchID, offline=True, store=ResponseStore(store_root))
+    except Exception as error:
+        return ScrapeResult(matchID, 'failed', time.perf_counter() - start, error=f"{type(error).__name__}: {error}")
+    return ScrapeResult(matchID, 'ok', time.perf_counter() - start, rows=len(joined))
+
+
+def rebuild_from_store(match_ids: Optional[List[int]] = None, store_root: str = 'data/raw',
+                       max_workers: Optional[int] = None) -> list:
+    """
+    Desc: Rewrites the data/ csvs from stored raw responses, with no network access
+    Params:
+        match_ids (list of int) - matches to rebuild, defaults to everything in the store
+        store_root (str)
+        max_workers (int) - processes to parse with, defaults to the number of cores
+    returns:
+        results (list of ScrapeResult)
+    """
+    if match_ids is None:
+        match_ids = ResponseStore(store_root).match_ids()
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        return list(pool.map(_rebuild_match, [(store_root, match_id) for match_id in match_ids], chunksize=8))
+
 
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Scrape CDL match data into data/")
+    parser.add_argument('--force', action='store_true', help="re-scrape matches the manifest says are up to date")
+    parser.add_argument('--offline', action='store_true', help="rebuild the csvs from stored raw responses only")
+    parser.add_argument('--workers', type=int, default=8)
+    args = parser.parse_args()
+    if args.offline:
+        results = rebuild_from_store(max_workers=args.workers)
+    else:
+        results = scrape_all(read_major_ids(), max_workers=args.workers, force=args.force)
+    print_report(results)
+    if any(result.status == 'failed' for result in results):
+        sys.exit(1)
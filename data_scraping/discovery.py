@@ -0,0 +1,161 @@
+"""
+Polls the CDL score strip for newly completed matches and scrapes them as soon as they appear.
+
+The poll interval adapts: it drops to FAST_INTERVAL while a match is live or new results have
+just come in, and doubles after every quiet poll up to SLOW_INTERVAL. Completed matches that
+are not yet in major_ids.json, the discovered list or the scrape manifest (as complete) are passed straight
+to scrape_all and then filed under the given major and stage (or in data/discovered_ids.json).
+
+Run from the repository root:
+    python data_scraping/discovery.py --major major4 --stage event
+"""
+import argparse
+import json
+import os
+import time
+from typing import List, Optional, Set, Tuple
+
+from cdl_scraper import cdl_headers, read_major_ids, scrape_all
+from manifest import ScrapeManifest
+from scrape_engine import ScrapeClient, print_report
+from scrape_errors import ResponseParseError, ScrapeRequestError
+
+SCORE_STRIP_URL = 'https://cdl-other-services.abe-arsfutura.com/production/v2/content-types/score-strip-list/blt458f482d8abb09e4?locale=en-us&options={"siteOrigin":"callofdutyleague.com"}'
+
+FAST_INTERVAL = 60
+SLOW_INTERVAL = 30 * 60
+LIVE_STATUSES = {'LIVE', 'IN_PROGRESS'}
+
+
+def format_major_ids(majors: dict) -> str:
+    """
+    Lays major_ids.json out the way it is kept in the repo, one stage per line
+    """
+    blocks = []
+    for major, stages in majors.items():
+        indent = ' ' * (len(json.dumps(major)) + 4)
+        lines = [f"{json.dumps(stage)}: {json.dumps(ids)}" for stage, ids in stages.items()]
+        blocks.append(f"{json.dumps(major)}: {{" + f",\n{indent}".join(lines) + "}")
+    return "{" + ",\n ".join(blocks) + "}"
+
+
+def parse_score_strip(response: dict) -> Tuple[List[int], bool]:
+    """
+    Desc: Reads the completed match IDs from a score-strip response
+    Params:
+        response (dict)
+    returns:
+        completed (list of int)
+        live (bool) - whether any match in the strip is being played right now
+    """
+    completed = []
+    live = False
+    for match in response['data']['scoreStrip']['matches']:
+        if match['status'] == 'COMPLETED':
+            completed.append(int(match['link'].split('/')[-1]))
+        elif match['status'] in LIVE_STATUSES:
+            live = True
+    return completed, live
+
+
+class MatchDiscovery:
+    """
+    Desc: Finds completed matches that have not been scraped and scrapes them
+    Params:
+        ids_path (str) - the major_ids.json catalog
+        manifest_path (str) - the scrape manifest written by cdl_scraper.py
+        discovered_path (str) - where new IDs are listed when no major/stage is given
+        major, stage (str) - file new IDs in major_ids.json under these keys, e.g. 'major4', 'event'
+    """
+    def __init__(self, ids_path: str = 'major_ids.json', manifest_path: str = 'data/scrape_manifest.json',
+                 discovered_path: str = 'data/discovered_ids.json', major: Optional[str] = None,
+                 stage: Optional[str] = None, client: Optional[ScrapeClient] = None) -> None:
+        self.ids_path = ids_path
+        self.manifest_path = manifest_path
+        self.discovered_path = discovered_path
+        self.major = major
+        self.stage = stage
+        self.client = client or ScrapeClient(max_connections=1, rate_per_host=1.0)
+
+    def _read_discovered(self) -> List[int]:
+        if not os.path.exists(self.discovered_path):
+            return []
+        with open(self.discovered_path) as file:
+            return json.load(file)
+
+    def known_ids(self) -> Set[int]:
+        manifest = ScrapeManifest(self.manifest_path)
+        scraped = {int(match_id) for match_id, entry in manifest.entries.items() if entry.get('complete')}
+        return set(read_major_ids(self.ids_path)) | scraped | set(self._read_discovered())
+
+    def file_new_ids(self, match_ids: List[int]) -> None:
+        """
+        Adds scraped IDs to major_ids.json under major/stage, or to the discovered list
+        """
+        if self.major and self.stage:
+            with open(self.ids_path) as file:
+                majors = json.load(file)
+            majors.setdefault(self.major, {'qualifying': [], 'event': []}).setdefault(self.stage, []).extend(match_ids)
+            path, content = self.ids_path, format_major_ids(majors)
+        else:
+            path, content = self.discovered_path, json.dumps(self._read_discovered() + match_ids)
+        temp_path = f"{path}.tmp"
+        with open(temp_path, 'w') as file:
+            file.write(content)
+        os.replace(temp_path, path)
+
+    def poll(self) -> Tuple[List[int], bool]:
+        """
+        Desc: Checks the score strip once and scrapes any new completed matches. Raises ResponseParseError
+              if the score strip is not in the expected shape
+        returns:
+            scraped (list of int) - IDs that were scraped successfully
+            live (bool)
+        """
+        try:
+            completed, live = parse_score_strip(self.client.get_json(SCORE_STRIP_URL, headers=cdl_headers))
+        except (KeyError, IndexError, TypeError, AttributeError, ValueError) as error:
+            # ValueError covers a body that is not JSON
+            raise ResponseParseError(SCORE_STRIP_URL, repr(error)) from error
+        known = self.known_ids()
+        new_ids = [match_id for match_id in dict.fromkeys(completed) if match_id not in known]
+        if not new_ids:
+            return [], live
+        results = scrape_all(new_ids, max_workers=min(8, len(new_ids)), manifest_path=self.manifest_path)
+        print_report(results)
+        scraped = [result.match_id for result in results if result.status == 'ok']
+        if scraped:
+            self.file_new_ids(scraped)
+        return scraped, live
+
+    def run(self, fast: float = FAST_INTERVAL, slow: float = SLOW_INTERVAL, once: bool = False) -> None:
+        """
+        Polls forever (or once), adapting the interval between fast and slow
+        """
+        interval = fast
+        while True:
+            try:
+                scraped, live = self.poll()
+            except ScrapeRequestError as error:
+                print(f"Score strip request failed: {error}")
+                scraped, live = [], False
+            except ResponseParseError as error:
+                # Usually a changed or truncated payload, keep polling at a slower pace rather than exit
+                print(f"Score strip could not be parsed: {error}")
+                scraped, live = [], False
+            interval = fast if live or scraped else min(interval * 2, slow)
+            if once:
+                return
+            print(f"{time.strftime('%H:%M:%S')} scraped {len(scraped)} new, live={live}, next poll in {interval:.0f}s")
+            time.sleep(interval)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Poll the CDL score strip and scrape newly completed matches")
+    parser.add_argument('--major', help="major_ids.json key to file new matches under, e.g. major4")
+    parser.add_argument('--stage', choices=['qualifying', 'event'])
+    parser.add_argument('--once', action='store_true', help="poll a single time and exit")
+    parser.add_argument('--fast', type=float, default=FAST_INTERVAL, help="seconds between polls while matches are live")
+    parser.add_argument('--slow', type=float, default=SLOW_INTERVAL, help="longest wait between quiet polls")
+    args = parser.parse_args()
+    MatchDiscovery(major=args.major, stage=args.stage).run(fast=args.fast, slow=args.slow, once=args.once)
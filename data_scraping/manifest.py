@@ -0,0 +1,73 @@
+"""
+A persistent record of what the scraper has already downloaded, so that re-runs
+only fetch matches that are new or were still in progress last time.
+"""
+import json
+import os
+import threading
+import time
+from typing import Optional
+
+from response_store import content_hash
+
+
+def is_match_complete(response: dict) -> bool:
+    """
+    A match is complete once the API has assigned it a winner
+    """
+    result = response['data']['matchData']['matchExtended'].get('result') or {}
+    return result.get('winnerTeamId') is not None
+
+
+class ScrapeManifest:
+    """
+    Desc: A json file keyed by match ID recording updatedAt, content hash, output path and completion
+    Params:
+        path (str) - where the manifest is stored
+    """
+    def __init__(self, path: str = 'data/scrape_manifest.json') -> None:
+        self.path = path
+        self._lock = threading.Lock()
+        if os.path.exists(path):
+            with open(path) as file:
+                self.entries = json.load(file)
+        else:
+            self.entries = {}
+
+    def get(self, match_id: int) -> Optional[dict]:
+        return self.entries.get(str(match_id))
+
+    def should_skip(self, match_id: int) -> bool:
+        """
+        True if the match finished when it was last scraped and its output still exists
+        """
+        entry = self.get(match_id)
+        return bool(entry and entry['complete'] and os.path.exists(entry['path']))
+
+    def is_unchanged(self, match_id: int, response: dict) -> bool:
+        """
+        True if a freshly fetched response is identical to the one last written
+        """
+        entry = self.get(match_id)
+        return bool(entry and entry['hash'] == content_hash(response) and os.path.exists(entry['path']))
+
+    def record(self, match_id: int, response: dict, path: str) -> None:
+        with self._lock:
+            self.entries[str(match_id)] = {'updatedAt': response['data'].get('updatedAt'),
+                                           'hash': content_hash(response),
+                                           'path': path,
+                                           'complete': is_match_complete(response),
+                                           'scrapedAt': int(time.time())}
+
+    def save(self) -> None:
+        """
+        Writes the manifest atomically so an interrupted run cannot corrupt it
+        """
+        with self._lock:
+            folder = os.path.dirname(self.path)
+            if folder:
+                os.makedirs(folder, exist_ok=True)
+            temp_path = f"{self.path}.tmp"
+            with open(temp_path, 'w') as file:
+                json.dump(self.entries, file, indent=1, sort_keys=True)
+            os.replace(temp_path, self.path)
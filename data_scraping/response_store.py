@@ -0,0 +1,93 @@
+"""
+A compressed, content-addressed store of raw match-detail responses.
+
+Each response is saved once as gzipped canonical json under objects/<hash[:2]>/<hash>.json.gz
+and index.json maps match IDs to the hash of their latest response. This lets the
+data/ csvs be rebuilt from the saved payloads without going back to the CDL API.
+"""
+import gzip
+import hashlib
+import json
+import os
+import threading
+from typing import List
+
+from scrape_errors import ResponseNotStoredError
+
+
+def canonical_bytes(response: dict) -> bytes:
+    """
+    The response serialised with sorted keys, so equal payloads give equal bytes
+    """
+    return json.dumps(response, sort_keys=True, separators=(',', ':')).encode('utf-8')
+
+
+def content_hash(response: dict) -> str:
+    return hashlib.sha256(canonical_bytes(response)).hexdigest()
+
+
+class ResponseStore:
+    """
+    Desc: Saves and loads raw match-detail responses by match ID
+    Params:
+        root (str) - folder holding index.json and the objects folder
+    """
+    def __init__(self, root: str = 'data/raw') -> None:
+        self.root = root
+        self.index_path = os.path.join(root, 'index.json')
+        self._lock = threading.Lock()
+        if os.path.exists(self.index_path):
+            with open(self.index_path) as file:
+                self.index = json.load(file)
+        else:
+            self.index = {}
+
+    def _object_path(self, digest: str) -> str:
+        return os.path.join(self.root, 'objects', digest[:2], f"{digest}.json.gz")
+
+    def __contains__(self, match_id) -> bool:
+        return str(match_id) in self.index
+
+    def match_ids(self) -> List[int]:
+        return sorted(int(match_id) for match_id in self.index)
+
+    def put(self, match_id, response: dict) -> str:
+        """
+        Desc: Saves a response, only writing the object if its content is new
+        returns:
+            digest (str) - the sha256 the response is stored under
+        """
+        data = canonical_bytes(response)
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._object_path(digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            temp_path = f"{path}.{threading.get_ident()}.tmp"
+            with gzip.open(temp_path, 'wb') as file:
+                file.write(data)
+            os.replace(temp_path, path)
+        with self._lock:
+            self.index[str(match_id)] = digest
+        return digest
+
+    def get(self, match_id) -> dict:
+        """
+        Raises:
+            ResponseNotStoredError if the match has never been stored
+        """
+        digest = self.index.get(str(match_id))
+        if digest is None:
+            raise ResponseNotStoredError(match_id)
+        with gzip.open(self._object_path(digest), 'rb') as file:
+            return json.loads(file.read())
+
+    def save(self) -> None:
+        """
+        Writes the index atomically
+        """
+        with self._lock:
+            os.makedirs(self.root, exist_ok=True)
+            temp_path = f"{self.index_path}.tmp"
+            with open(temp_path, 'w') as file:
+                json.dump(self.index, file, indent=1, sort_keys=True)
+            os.replace(temp_path, self.index_path)
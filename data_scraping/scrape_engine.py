@@ -0,0 +1,160 @@
+"""
+A small concurrent scraping engine used by cdl_scraper.py.
+
+Every request goes through one pooled requests.Session, a per-host rate limiter
+and a retry loop with exponential backoff and jitter. scrape_matches runs a worker
+over a list of match IDs on a bounded thread pool and reports the outcome of every ID.
+"""
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, List, Optional
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from scrape_errors import ScrapeRequestError
+
+# Status codes that are worth trying again, anything else is raised straight away
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class RateLimiter:
+    """
+    A token bucket for each host, shared between all worker threads
+    """
+    def __init__(self, rate: float = 8.0, burst: int = 8) -> None:
+        self.rate = rate
+        self.burst = burst
+        self._buckets: Dict[str, List[float]] = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, host: str) -> None:
+        """
+        Blocks until a request to host is allowed
+        """
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                tokens, last = self._buckets.get(host, [float(self.burst), now])
+                tokens = min(self.burst, tokens + (now - last) * self.rate)
+                if tokens >= 1:
+                    self._buckets[host] = [tokens - 1, now]
+                    return
+                self._buckets[host] = [tokens, now]
+                wait = (1 - tokens) / self.rate
+            time.sleep(wait)
+
+
+class ScrapeClient:
+    """
+    Desc: A pooled HTTP session with rate limiting and retries
+    Params:
+        max_connections (int) - size of the connection pool (and so the useful number of threads)
+        rate_per_host (float) - requests per second allowed to each host
+        retries (int) - number of retries after the first attempt
+        backoff (float) - base delay in seconds, doubled on every retry
+        timeout (float) - seconds to wait for a response
+    """
+    def __init__(self, max_connections: int = 8, rate_per_host: float = 8.0, retries: int = 4,
+                 backoff: float = 0.5, timeout: float = 20.0) -> None:
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=max_connections, pool_maxsize=max_connections)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.limiter = RateLimiter(rate=rate_per_host, burst=max_connections)
+        self.max_connections = max_connections
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+
+    def _sleep_before_retry(self, attempt: int, retry_after: Optional[str] = None) -> None:
+        delay = self.backoff * (2 ** attempt) + random.uniform(0, self.backoff)
+        if retry_after and retry_after.isdigit():
+            delay = max(delay, float(retry_after))
+        time.sleep(delay)
+
+    def get(self, url: str, headers: Optional[dict] = None) -> requests.Response:
+        """
+        Desc: GET a url, retrying on connection errors and retryable status codes
+        Raises:
+            ScrapeRequestError once every attempt has failed
+        """
+        host = urlparse(url).netloc
+        last_error = ""
+        for attempt in range(self.retries + 1):
+            self.limiter.acquire(host)
+            try:
+                response = self.session.get(url, headers=headers, timeout=self.timeout)
+            except (requests.ConnectionError, requests.Timeout) as error:
+                last_error = repr(error)
+                if attempt < self.retries:
+                    self._sleep_before_retry(attempt)
+                continue
+            if response.status_code in RETRY_STATUSES:
+                last_error = f"HTTP {response.status_code}"
+                if attempt < self.retries:
+                    self._sleep_before_retry(attempt, response.headers.get('Retry-After'))
+                continue
+            if not response.ok:
+                raise ScrapeRequestError(url, f"HTTP {response.status_code}", attempt + 1)
+            return response
+        raise ScrapeRequestError(url, last_error, self.retries + 1)
+
+    def get_json(self, url: str, headers: Optional[dict] = None) -> dict:
+        return self.get(url, headers=headers).json()
+
+
+@dataclass
+class ScrapeResult:
+    """
+    The outcome of scraping a single match ID
+    """
+    match_id: int
+    status: str
+    seconds: float
+    rows: int = 0
+    error: str = ""
+
+
+def scrape_matches(match_ids: Iterable[int], worker: Callable[[int], int], max_workers: int = 8) -> List[ScrapeResult]:
+    """
+    Desc: Runs worker over every match ID on a bounded thread pool
+    Params:
+        match_ids (iterable of int)
+        worker (callable) - takes a match ID and returns the number of rows it saved,
+                            or None if the match was skipped
+        max_workers (int) - number of threads, should not exceed the client's pool size
+    returns:
+        results (list of ScrapeResult) - one per ID, in the same order as match_ids
+    """
+    def run(match_id: int) -> ScrapeResult:
+        start = time.perf_counter()
+        try:
+            rows = worker(match_id)
+        except Exception as error:
+            return ScrapeResult(match_id, 'failed', time.perf_counter() - start, error=f"{type(error).__name__}: {error}")
+        if rows is None:
+            return ScrapeResult(match_id, 'skipped', time.perf_counter() - start)
+        return ScrapeResult(match_id, 'ok', time.perf_counter() - start, rows=rows)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        return list(pool.map(run, match_ids))
+
+
+def print_report(results: List[ScrapeResult]) -> None:
+    """
+    Prints one line per match ID followed by a summary
+    """
+    for result in results:
+        line = f"{result.match_id:>6}  {result.status:<8} {result.seconds:6.2f}s"
+        if result.status == 'ok':
+            line += f"  {result.rows} rows"
+        elif result.error:
+            line += f"  {result.error}"
+        print(line)
+    counts = {status: sum(r.status == status for r in results) for status in ('ok', 'skipped', 'failed')}
+    print(f"{len(results)} matches: {counts['ok']} ok, {counts['skipped']} skipped, {counts['failed']} failed")
@@ -0,0 +1,28 @@
+class ScrapeRequestError(Exception):
+    """
+    An error for when a request still fails after every retry
+    """
+    def __init__(self, url: str, reason: str, attempts: int) -> None:
+        self.url = url
+        self.reason = reason
+        self.attempts = attempts
+        super().__init__(f"{reason} after {attempts} attempt(s): {url}")
+
+
+class ResponseParseError(Exception):
+    """
+    An error for when a response arrives but does not have the expected shape
+    """
+    def __init__(self, url: str, reason: str) -> None:
+        self.url = url
+        self.reason = reason
+        super().__init__(f"Unexpected response ({reason}): {url}")
+
+
+class ResponseNotStoredError(Exception):
+    """
+    An error for when an offline parse asks for a match that was never stored
+    """
+    def __init__(self, match_id) -> None:
+        self.match_id = match_id
+        super().__init__(f"No stored response for match {match_id}, scrape it online first")
@@ -1,15 +1,201 @@
-import requests
+"""
+Downloads every player's headshot to images/{alias}_headshot.png and rebuilds the sprite atlas.
+
+Each unique headshot URL is fetched once, concurrently, over the scraper's pooled and rate-limited
+ScrapeClient. images/headshots.json remembers every URL's ETag, Last-Modified and content hash,
+so re-runs send conditional requests. Images the server reports as not modified, or whose bytes
+hash the same as the file on disk, are left untouched. The atlas is rebuilt only when a headshot
+was written.
+
+Run from the repository root:
+    python images/downloader.py --workers 8
+"""
+import argparse
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
 import pandas as pd
 
-from helper_copy import read_in_all_matches
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data_scraping'))
+from cdl_common.headshots import HEADSHOT_DIR, atlas_is_current, atlas_paths, build_atlas, headshot_path
+from cdl_common.loader import read_in_all_matches
+from scrape_engine import ScrapeClient
+
+MANIFEST_FILE = 'headshots.json'
+
+
+@dataclass
+class HeadshotResult:
+    """
+    The outcome of downloading one headshot URL
+    """
+    url: str
+    aliases: List[str]
+    status: str
+    seconds: float
+    error: str = ""
+
+
+class HeadshotManifest:
+    """
+    Desc: A json file keyed by headshot URL recording its ETag, Last-Modified and sha256
+    Params:
+        path (str) - where the manifest is stored
+    """
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+        if os.path.exists(path):
+            with open(path) as file:
+                self.entries = json.load(file)
+        else:
+            self.entries = {}
+
+    def get(self, url: str) -> Optional[dict]:
+        return self.entries.get(url)
+
+    def record(self, url: str, response, digest: str) -> None:
+        with self._lock:
+            self.entries[url] = {'etag': response.headers.get('ETag'),
+                                 'lastModified': response.headers.get('Last-Modified'),
+                                 'hash': digest}
+
+    def save(self) -> None:
+        with self._lock:
+            temp_path = f"{self.path}.tmp"
+            with open(temp_path, 'w') as file:
+                json.dump(self.entries, file, indent=1, sort_keys=True)
+            os.replace(temp_path, self.path)
+
+
+def file_hash(path: str) -> Optional[str]:
+    if not os.path.exists(path):
+        return None
+    with open(path, 'rb') as file:
+        return hashlib.sha256(file.read()).hexdigest()
+
+
+def headshot_urls(df: pd.DataFrame) -> Dict[str, List[str]]:
+    """
+    Desc: Each player's latest headshot URL, grouped so players sharing an image download it once
+    Params:
+        df (pandas df) - rows with 'alias' and 'headshot' columns
+    returns:
+        urls (dict) - headshot URL to the aliases that use it
+    """
+    latest = df[['alias', 'headshot']].dropna().drop_duplicates('alias', keep='last')
+    return latest.groupby('headshot')['alias'].apply(sorted).to_dict()
+
+
+def download_headshot(url: str, aliases: List[str], client: ScrapeClient, manifest: HeadshotManifest,
+                      folder: str = HEADSHOT_DIR) -> str:
+    """
+    Desc: Fetches one headshot and writes it for every alias whose file differs
+    returns:
+        status (str) - 'new', 'updated' or 'unchanged'
+    """
+    entry = manifest.get(url)
+    paths = [headshot_path(alias, folder) for alias in aliases]
+    on_disk = [file_hash(path) for path in paths]
+    headers = {}
+    # Only ask for a 304 when every file still holds the image the validators describe
+    if entry and all(digest == entry['hash'] for digest in on_disk):
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('lastModified'):
+            headers['If-Modified-Since'] = entry['lastModified']
+    response = client.get(url, headers=headers or None)
+    if response.status_code == 304:
+        return 'unchanged'
+
+    digest = hashlib.sha256(response.content).hexdigest()
+    manifest.record(url, response, digest)
+    written = False
+    for path, existing in zip(paths, on_disk):
+        if existing == digest:
+            continue
+        temp_path = f"{path}.tmp"
+        with open(temp_path, 'wb') as file:
+            file.write(response.content)
+        os.replace(temp_path, path)
+        written = True
+    if not written:
+        return 'unchanged'
+    return 'updated' if any(on_disk) else 'new'
+
+
+def download_headshots(df: Optional[pd.DataFrame] = None, folder: str = HEADSHOT_DIR,
+                       manifest_path: Optional[str] = None, max_workers: int = 8,
+                       client: Optional[ScrapeClient] = None, atlas: bool = True) -> List[HeadshotResult]:
+    """
+    Desc: Downloads every new or changed headshot concurrently, then rebuilds the atlas if any were written
+    Params:
+        df (pandas df) - rows with 'alias' and 'headshot', defaults to every loaded match
+        folder (str) - where to write {alias}_headshot.png and the atlas
+        manifest_path (str) - defaults to headshots.json in folder
+        max_workers (int) - number of threads, should not exceed the client's pool size
+        client (ScrapeClient) - shared session, a new one is made if not given
+        atlas (bool) - rebuild the sprite atlas when a headshot was written or the atlas is missing or out of date
+    returns:
+        results (list of HeadshotResult) - one per unique URL
+    """
+    if df is None:
+        df = read_in_all_matches(columns=['alias', 'headshot'])
+    client = client or ScrapeClient(max_connections=max_workers)
+    manifest = HeadshotManifest(manifest_path or os.path.join(folder, MANIFEST_FILE))
+
+    def run(item) -> HeadshotResult:
+        url, aliases = item
+        start = time.perf_counter()
+        try:
+            status = download_headshot(url, aliases, client, manifest, folder)
+        except Exception as error:
+            return HeadshotResult(url, aliases, 'failed', time.perf_counter() - start, error=f"{type(error).__name__}: {error}")
+        return HeadshotResult(url, aliases, status, time.perf_counter() - start)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        results = list(pool.map(run, headshot_urls(df).items()))
+    manifest.save()
+
+    written = any(result.status in ('new', 'updated') for result in results)
+    if atlas and (written or not atlas_is_current(folder)):
+        build_atlas(folder)
+    return results
+
+
+def print_headshot_report(results: List[HeadshotResult]) -> None:
+    """
+    Prints one line per headshot that was written or failed, followed by a summary
+    """
+    for result in results:
+        if result.status in ('new', 'updated', 'failed'):
+            line = f"{', '.join(result.aliases):<24} {result.status:<9} {result.seconds:6.2f}s"
+            if result.error:
+                line += f"  {result.error}"
+            print(line)
+    counts = {status: sum(result.status == status for result in results)
+              for status in ('new', 'updated', 'unchanged', 'failed')}
+    print(f"{len(results)} headshots: {counts['new']} new, {counts['updated']} updated, "
+          f"{counts['unchanged']} unchanged, {counts['failed']} failed")
 
-df = read_in_all_matches()
 
-heads = df['headshot'].unique()
-test_df = pd.DataFrame({'headshot':heads})
-heads_df = pd.merge(test_df, df[['headshot', 'alias']], how='left', on='headshot').drop_duplicates()
-for headshot, alias in zip(heads_df['headshot'], heads_df['alias']):
-    with open(f"images/{alias}_headshot.png", 'wb') as file:
-        response = requests.get(headshot)
-        file.write(response.content)
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Download new or changed player headshots and rebuild the atlas")
+    parser.add_argument('--workers', type=int, default=8, help="concurrent downloads")
+    parser.add_argument('--atlas-only', action='store_true', help="rebuild the atlas from the images already on disk")
+    args = parser.parse_args()
 
+    if args.atlas_only:
+        print(f"Packed {build_atlas()} headshots into {atlas_paths()[0]}")
+        sys.exit(0)
+    results = download_headshots(max_workers=args.workers)
+    print_headshot_report(results)
+    sys.exit(1 if any(result.status == 'failed' for result in results) else 0)